@@ -0,0 +1,92 @@
+import json
+from typing import Dict
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def format_size(num_bytes: int) -> str:
+    if num_bytes >= 1024 * 1024 and num_bytes % (1024 * 1024) == 0:
+        return f"{num_bytes // (1024 * 1024)}MB"
+    if num_bytes >= 1024 and num_bytes % 1024 == 0:
+        return f"{num_bytes // 1024}KB"
+    return f"{num_bytes} bytes"
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware that caps request body size per path.
+
+    A request whose `Content-Length` already exceeds the limit is answered
+    with 413 before any of its body is read. Otherwise the body is counted as
+    it streams in, and the chunk that crosses the limit raises a 413
+    `HTTPException` to whatever is reading it (FastAPI's form parser re-raises
+    it), so an oversized upload is never received in full. This also covers
+    chunked uploads without a `Content-Length`.
+
+    `path_limits` maps a path to the largest upload it accepts;
+    `overhead_bytes` is allowed on top for multipart framing.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_limits: Dict[str, int],
+        overhead_bytes: int = MULTIPART_OVERHEAD_BYTES,
+    ):
+        self.app = app
+        self.path_limits = path_limits
+        self.overhead_bytes = overhead_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.path_limits:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits[scope["path"]]
+        max_body = limit + self.overhead_bytes
+        detail = f"Upload too large (max {format_size(limit)})."
+
+        content_length = None
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    content_length = None
+                break
+        if content_length is not None and content_length > max_body:
+            await self._reject(send, detail)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send: Send, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightCache:
+    """
+    Async LRU + TTL cache whose misses are computed once per key.
+
+    Entries expire `ttl_s` after they are stored and the least recently used
+    ones are evicted once there are more than `max_entries` of them or their
+    combined `sizeof` exceeds `max_bytes`. Concurrent callers that miss on
+    the same key share one in-flight computation instead of each starting
+    their own; failures are never cached.
+
+    The computation runs as its own task, so a caller being cancelled does
+    not cancel the work other callers are waiting on.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_s: float = 3600.0,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0 or value is None:
+            return
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl_s, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, joining or starting the computation on a miss."""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_computed(key, t))
+        return await asyncio.shield(task)
+
+    def _on_computed(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is None:
+            self.set(key, task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
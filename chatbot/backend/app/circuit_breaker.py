@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.concurrency import LimiterSaturatedError
+from app.config import get_settings
+from app.executors import ExecutorSaturatedError
+from app.metrics import CIRCUIT_BREAKER_REJECTED, CIRCUIT_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Value of the circuit_breaker_state gauge for each state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Raised by this process when it sheds its own load before the dependency is
+# called; they say nothing about the dependency's health
+LOCAL_REJECTIONS = (ExecutorSaturatedError, LimiterSaturatedError)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to one external dependency.
+
+    Closed: calls go through and their outcomes are kept for `window_s`.
+    Once the window holds at least `min_calls` outcomes and the share of
+    failures reaches `error_rate`, the breaker opens. Open: calls fail
+    immediately with `CircuitOpenError` for `open_s`. Half-open: up to
+    `half_open_max_calls` probe calls go through; a successful probe closes
+    the breaker and a failed one opens it again.
+
+    Exceptions count as failures, as do results for which `is_failure`
+    returns True. Cancelled calls (hedged losers, deadlines) and local load
+    shedding (`LOCAL_REJECTIONS`: a saturated executor or limiter) are not
+    counted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        min_calls: int = 5,
+        window_s: float = 60.0,
+        open_s: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = max(1, min_calls)
+        self.window_s = window_s
+        self.open_s = open_s
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+
+        # Metrics
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+        self._state_gauge = CIRCUIT_BREAKER_STATE.labels(breaker=name)
+        self._state_gauge.set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_s:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        previous, self._state = self._state, state
+        self._state_gauge.set(STATE_VALUES[state])
+        if state == OPEN and previous == HALF_OPEN:
+            self._opened_at = time.monotonic()
+            logger.warning(
+                "Circuit breaker %s probe failed; open for another %.0fs (%s)",
+                self.name,
+                self.open_s,
+                self.last_error,
+            )
+        elif state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(
+                "Circuit breaker %s %s -> open for %.0fs (%d/%d calls failed; last error: %s)",
+                self.name,
+                previous,
+                self.open_s,
+                self._failures,
+                len(self._outcomes),
+                self.last_error,
+            )
+        elif state == HALF_OPEN:
+            self._probes = 0
+            logger.info("Circuit breaker %s open -> half_open; probing", self.name)
+        else:
+            logger.info("Circuit breaker %s %s -> closed", self.name, previous)
+        if state != HALF_OPEN:
+            self._outcomes.clear()
+            self._failures = 0
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_s:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _acquire(self) -> bool:
+        """Admit a call or raise `CircuitOpenError`. Returns True for a half-open probe."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        CIRCUIT_BREAKER_REJECTED.labels(breaker=self.name).inc()
+        raise CircuitOpenError(f"{self.name} circuit breaker is open (last error: {self.last_error})")
+
+    def _record(self, failed: bool, probe: bool) -> None:
+        if probe:
+            self._probes -= 1
+            if self._state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED)
+            return
+        if self._state != CLOSED:
+            return
+        now = time.monotonic()
+        self._prune(now)
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        if len(self._outcomes) >= self.min_calls and self._failures / len(self._outcomes) >= self.error_rate:
+            self._transition(OPEN)
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        is_failure: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """Await `fn()` through the breaker, recording its outcome."""
+        probe = self._acquire()
+        try:
+            result = await fn()
+        except LOCAL_REJECTIONS:
+            # Shed before reaching the dependency: release the probe slot
+            # without judging the dependency
+            if probe:
+                self._probes -= 1
+            raise
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"[:200]
+            self._record(True, probe)
+            raise
+        except BaseException:
+            # Cancelled: release the probe slot without judging the dependency
+            if probe:
+                self._probes -= 1
+            raise
+        failed = bool(is_failure and is_failure(result))
+        if failed:
+            self.last_error = "call reported failure"
+        self._record(failed, probe)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        self._prune(time.monotonic())
+        calls = len(self._outcomes)
+        return {
+            "state": state,
+            "window_calls": calls,
+            "window_failures": self._failures,
+            "error_rate": (self._failures / calls) if calls else 0.0,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+            "open_for_s": max(0.0, self.open_s - (time.monotonic() - self._opened_at)) if state == OPEN else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+# Breaker registry (one per external dependency)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the named breaker, creating it from settings on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                settings = get_settings()
+                breaker = CircuitBreaker(
+                    name,
+                    error_rate=settings.circuit_breaker_error_rate,
+                    min_calls=settings.circuit_breaker_min_calls,
+                    window_s=settings.circuit_breaker_window_s,
+                    open_s=settings.circuit_breaker_open_s,
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
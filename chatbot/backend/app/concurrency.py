@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.metrics import CONCURRENCY_IN_FLIGHT, CONCURRENCY_LIMIT, CONCURRENCY_QUEUED, CONCURRENCY_REJECTED, CONCURRENCY_WAIT
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Queue priorities (lower is served first)
+PRIORITY_LEAD = 0
+PRIORITY_TRANSCRIPTION = 1
+
+PRIORITY_NAMES = {PRIORITY_LEAD: "lead", PRIORITY_TRANSCRIPTION: "transcription"}
+
+
+class LimiterSaturatedError(RuntimeError):
+    """Raised when a call cannot be queued because the limiter's queue is full."""
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to one rate-limited dependency.
+
+    At most `limit` calls run at once. While calls succeed without slowing
+    down, and demand actually reaches the limit, it grows by one per `limit`
+    successful calls (additive increase); a call that fails with an overload
+    error (`is_overload`, e.g. HTTP 429 or a timeout) multiplies it by
+    `backoff` (multiplicative decrease). Failures of calls that started
+    before the last decrease do not cut it again, so one burst of 429s
+    halves the limit once rather than once per call. A success slower than
+    `latency_tolerance` times the running average latency holds the limit
+    where it is.
+
+    Calls over the limit wait in a priority queue of at most `max_queue`
+    calls (lower priority numbers first, FIFO within a priority). When it
+    is full, a new call either displaces the newest waiting call of a lower
+    priority or fails with `LimiterSaturatedError`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        max_queue: int = 100,
+        latency_tolerance: float = 2.0,
+        is_overload: Callable[[BaseException], bool] = lambda e: isinstance(e, TimeoutError),
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.backoff = backoff
+        self.max_queue = max(0, max_queue)
+        self.latency_tolerance = latency_tolerance
+        self.is_overload = is_overload
+
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._latency_avg: Optional[float] = None
+        self._decreased_at = 0.0
+
+        self._limit_gauge = CONCURRENCY_LIMIT.labels(limiter=name)
+        self._in_flight_gauge = CONCURRENCY_IN_FLIGHT.labels(limiter=name)
+        self._queued_gauge = CONCURRENCY_QUEUED.labels(limiter=name)
+        self._wait_histogram = CONCURRENCY_WAIT.labels(limiter=name)
+        self._limit_gauge.set(self.limit)
+
+        # Metrics
+        self.completed = 0
+        self.overloads = 0
+        self.decreases = 0
+        self.rejected = 0
+        self.max_wait_s = 0.0
+        self.total_wait_s = 0.0
+        self.waited = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _grant(self) -> None:
+        self._in_flight += 1
+        self._in_flight_gauge.set(self._in_flight)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._in_flight_gauge.set(self._in_flight)
+        while self._waiters and self._in_flight < self.limit:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._grant()
+                future.set_result(None)
+        self._queued_gauge.set(len(self._waiters))
+
+    def _reject(self, priority: int) -> None:
+        self.rejected += 1
+        CONCURRENCY_REJECTED.labels(limiter=self.name, priority=PRIORITY_NAMES.get(priority, str(priority))).inc()
+
+    async def _acquire(self, priority: int) -> None:
+        if not self._waiters and self._in_flight < self.limit:
+            self._grant()
+            self._record_wait(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            # Make room by dropping the newest waiter of the lowest priority, if it ranks below us
+            worst = max(self._waiters) if self._waiters else None
+            if worst is None or worst[0] <= priority:
+                self._reject(priority)
+                raise LimiterSaturatedError(f"{self.name} queue full ({self._in_flight} running, {len(self._waiters)} queued)")
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            self._reject(worst[0])
+            worst[2].set_exception(LimiterSaturatedError(f"{self.name} queue full; displaced by a higher-priority call"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        self._queued_gauge.set(len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._queued_gauge.set(len(self._waiters))
+            elif future.exception() is None:
+                # Granted a slot in the same instant we were cancelled: pass it on
+                self._release()
+            raise
+        finally:
+            self._record_wait(time.perf_counter() - started)
+
+    def _record_wait(self, waited: float) -> None:
+        self._wait_histogram.observe(waited)
+        self.waited += 1
+        self.total_wait_s += waited
+        self.max_wait_s = max(self.max_wait_s, waited)
+
+    def _on_success(self, latency_s: float, demand: int) -> None:
+        average = self._latency_avg
+        self._latency_avg = latency_s if average is None else average + 0.05 * (latency_s - average)
+        if average is not None and latency_s > self.latency_tolerance * average:
+            return
+        if demand >= self.limit and self._limit < self.max_limit:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._limit_gauge.set(self.limit)
+
+    def _on_overload(self, started_at: float, error: BaseException) -> None:
+        self.overloads += 1
+        if started_at < self._decreased_at:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self._decreased_at = time.monotonic()
+        self.decreases += 1
+        self._limit_gauge.set(self.limit)
+        logger.warning(
+            "%s concurrency limit %d -> %d after %s",
+            self.name,
+            previous,
+            self.limit,
+            type(error).__name__,
+        )
+
+    async def run(self, call: Callable[[], Awaitable[T]], priority: int = PRIORITY_LEAD) -> T:
+        """Await `call()` once a slot is free, adjusting the limit by its outcome."""
+        await self._acquire(priority)
+        started_at = time.monotonic()
+        try:
+            result = await call()
+        except Exception as e:
+            if self.is_overload(e):
+                self._on_overload(started_at, e)
+            raise
+        else:
+            self.completed += 1
+            self._on_success(time.monotonic() - started_at, self._in_flight + len(self._waiters))
+            return result
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        queued: Dict[str, int] = {}
+        for priority, _, _ in self._waiters:
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            queued[name] = queued.get(name, 0) + 1
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "rejected": self.rejected,
+            "avg_wait_s": (self.total_wait_s / self.waited) if self.waited else 0.0,
+            "max_wait_s": self.max_wait_s,
+            "avg_latency_s": self._latency_avg,
+        }
@@ -12,7 +12,41 @@ class Settings(BaseSettings):
     # OpenAI
     openai_api_key: str = ""
     openai_model: str = "gpt-5.1"
+    # Cap on each OpenAI request (a stage's remaining deadline may cut it shorter)
     openai_timeout_s: float = 30.0
+    # Retries inside the OpenAI client (each may take openai_timeout_s again)
+    openai_max_retries: int = 0
+    # Race a second extraction request against one slower than the recent p95
+    openai_hedge_requests: bool = False
+    openai_hedge_percentile: float = 95.0
+    openai_hedge_min_delay_s: float = 0.5
+    # Adaptive cap on concurrent OpenAI requests: grows by one per `limit`
+    # healthy calls, is multiplied by the backoff on a 429 or timeout; calls
+    # over the cap queue (lead extraction first, then transcription) and are
+    # rejected once max_queue are waiting
+    openai_concurrency_initial: int = 8
+    openai_concurrency_min: int = 1
+    openai_concurrency_max: int = 64
+    openai_concurrency_backoff: float = 0.5
+    openai_concurrency_max_queue: int = 100
+    # Cache of lead extractions keyed by note/role/model (0 entries disables it)
+    openai_extraction_cache_size: int = 512
+    openai_extraction_cache_ttl_s: float = 3600.0
+    # Skip the LLM for short notes the local rule-based extractor reads unambiguously
+    openai_local_fast_path: bool = False
+    openai_local_fast_path_max_chars: int = 280
+    # Cache of transcripts keyed by audio hash/model (0 entries disables it)
+    openai_transcription_cache_size: int = 256
+    openai_transcription_cache_ttl_s: float = 3600.0
+    # Largest audio upload accepted by /transcribe (enforced while the body streams in)
+    transcribe_max_upload_bytes: int = 10 * 1024 * 1024
+    # PCM WAV uploads: trim silence, downmix to 16 kHz mono and split long
+    # clips at pauses into segments transcribed concurrently
+    transcribe_preprocess_wav: bool = True
+    transcribe_segment_max_s: float = 30.0
+    transcribe_segment_concurrency: int = 4
+    # Preprocessing decodes the whole clip in memory; larger WAVs are sent as-is
+    transcribe_preprocess_max_bytes: int = 4 * 1024 * 1024
     
     # Google Service Account (JSON string)
     google_service_account_json: str = ""
@@ -21,21 +55,91 @@ class Settings(BaseSettings):
     # Alternative: path to a JSON file (recommended for Cloud Run secret mounts)
     google_service_account_json_path: str = ""
     google_sheet_id: str = ""
+    # Coalesce concurrent appends into one append_rows request
+    sheets_batch_window_ms: int = 50
+    sheets_batch_max_rows: int = 50
+    # How long the cached header row is trusted before re-reading (0 = until a write fails)
+    sheets_header_ttl_s: float = 3600.0
+    # lead_id -> row index: rebuild interval and optional SQLite snapshot file
+    sheets_index_reconcile_s: float = 300.0
+    sheets_index_snapshot_path: str = ""
     
     # Email notifications
     notification_email: str = "sales@ebottles.com"
     notification_from_email: str = "noreply@ebottles.com"
     # Comma-separated list of admin emails to notify (optional)
     admin_notification_emails: str = ""
+    # Maximum Gmail API sends in flight at once
+    gmail_max_concurrency: int = 4
+    # Send one notification to all internal recipients (sales in To, admins in Bcc)
+    gmail_single_notification: bool = False
+    # Send a lead's notification + confirmation in one Gmail batch HTTP request
+    gmail_batch_requests: bool = False
     
     # CORS
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
     
     # App settings
     debug: bool = False
+    # Send per-stage durations to clients in a Server-Timing header
+    # (the JSON timing log line is written either way)
+    server_timing_header: bool = True
+
+    # Build the Sheets/Gmail/OpenAI clients in the background at startup;
+    # /health answers 503 until that finishes or this many seconds pass (0 = off)
+    startup_warmup_timeout_s: float = 20.0
 
     # Optional shared secret for backend endpoints (leave empty to disable)
     api_key: str = ""
+
+    # Per-client (IP + API key) token buckets in front of the endpoints that
+    # call OpenAI: a client may send `burst` requests at once, refilled at
+    # `per_min` a minute (/transcribe/stream shares the /transcribe budget)
+    rate_limit_enabled: bool = True
+    rate_limit_lead_intake_per_min: float = 10.0
+    rate_limit_lead_intake_burst: int = 5
+    rate_limit_transcribe_per_min: float = 30.0
+    rate_limit_transcribe_burst: int = 10
+    # Clients tracked per route before the least recently seen are forgotten
+    rate_limit_max_clients: int = 10000
+    # Proxies that append to X-Forwarded-For (1 on Cloud Run; 0 = use the peer address)
+    rate_limit_forwarded_hops: int = 1
+
+    # Dedicated thread pools for blocking Google API calls (calls beyond
+    # workers + max_queue are rejected immediately)
+    sheets_executor_workers: int = 4
+    sheets_executor_max_queue: int = 50
+    gmail_executor_workers: int = 4
+    gmail_executor_max_queue: int = 50
+
+    # Circuit breakers for OpenAI, Sheets and Gmail: open once at least
+    # min_calls calls in the last window_s seconds failed at error_rate or more,
+    # then fail fast for open_s seconds before letting a probe call through
+    circuit_breaker_error_rate: float = 0.5
+    circuit_breaker_min_calls: int = 5
+    circuit_breaker_window_s: float = 60.0
+    circuit_breaker_open_s: float = 30.0
+
+    # Idempotency-Key replay window for POST /lead-intake
+    idempotency_ttl_s: float = 24 * 3600.0
+    idempotency_max_keys: int = 10000
+
+    # Deadlines: the intake request's raw Sheets append and each
+    # background delivery attempt (AI, Sheets update, Gmail); the AI stage
+    # leaves lead_delivery_reserve_s of the budget for Sheets and Gmail
+    lead_intake_deadline_s: float = 15.0
+    lead_delivery_deadline_s: float = 60.0
+    lead_delivery_reserve_s: float = 15.0
+
+    # Durable lead journal (leave empty to write to Sheets/Gmail inside the request)
+    lead_journal_dir: str = ""
+    lead_journal_segment_max_bytes: int = 1024 * 1024
+
+    # Budget for the app's shutdown steps (stopping the drainer, finishing
+    # background enrichment, flushing buffered rows). Cloud Run kills the
+    # container 10 s after SIGTERM, and uvicorn first spends up to 3 s
+    # (--timeout-graceful-shutdown) on open requests
+    shutdown_timeout_s: float = 6.0
     
     @property
     def allowed_origins_list(self) -> list[str]:
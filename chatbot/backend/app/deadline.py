@@ -0,0 +1,48 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a stage is started or still running after its deadline."""
+
+
+class Deadline:
+    """
+    Time budget for one unit of work (a request or a lead delivery attempt).
+
+    Created once at the start and handed down to each stage, which gets
+    whatever budget is left rather than a fixed timeout of its own, so the
+    stages together never run past the budget.
+    """
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+
+    def remaining(self, reserve_s: float = 0.0) -> float:
+        """Seconds left, minus `reserve_s` kept back for later stages (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic() - reserve_s)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    async def run(self, awaitable: Awaitable[T], stage: str, reserve_s: float = 0.0) -> T:
+        """
+        Await `awaitable` within the remaining budget (less `reserve_s`).
+
+        Raises `DeadlineExceeded` naming `stage` if the budget is already
+        spent or runs out first; the awaitable is cancelled in that case.
+        """
+        timeout = self.remaining(reserve_s)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(f"No time left for {stage} ({self.budget_s:.1f}s budget)")
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f"{stage} did not finish within {timeout:.1f}s ({self.budget_s:.1f}s budget)") from e
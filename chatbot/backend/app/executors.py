@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config import get_settings
+from app.metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUED, EXECUTOR_REJECTED, EXECUTOR_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when an executor's queue is full and new work is rejected."""
+
+
+class BoundedExecutor:
+    """
+    Named thread pool for blocking calls to one external dependency.
+
+    Unlike the default executor behind `asyncio.to_thread`, the queue of
+    calls waiting for a worker is bounded: once `max_queue` calls are
+    waiting, `run` fails immediately with `ExecutorSaturatedError` instead of
+    queueing behind a slow API. Queue depth, active workers and queue wait
+    time are tracked for monitoring.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._queued_gauge = EXECUTOR_QUEUED.labels(executor=name)
+        self._active_gauge = EXECUTOR_ACTIVE.labels(executor=name)
+        self._wait_histogram = EXECUTOR_WAIT.labels(executor=name)
+
+        # Metrics
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.last_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.total_wait_s = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn(*args, **kwargs)` on this pool and await its result."""
+        with self._lock:
+            if self.active + self.queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                EXECUTOR_REJECTED.labels(executor=self.name).inc()
+                raise ExecutorSaturatedError(
+                    f"{self.name} executor saturated ({self.active} active, {self.queued} queued)"
+                )
+            self.queued += 1
+        self._queued_gauge.inc()
+
+        submitted_at = time.perf_counter()
+
+        def _call() -> Any:
+            waited = time.perf_counter() - submitted_at
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.last_wait_s = waited
+                self.max_wait_s = max(self.max_wait_s, waited)
+                self.total_wait_s += waited
+            self._queued_gauge.dec()
+            self._active_gauge.inc()
+            self._wait_histogram.observe(waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._active_gauge.dec()
+
+        def _on_done(future: Future) -> None:
+            # A call cancelled before a worker picked it up never ran `_call`
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+                self._queued_gauge.dec()
+
+        # Carry context variables into the worker, as asyncio.to_thread does
+        ctx = contextvars.copy_context()
+        future = self._pool.submit(functools.partial(ctx.run, _call))
+        future.add_done_callback(_on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "last_wait_s": self.last_wait_s,
+                "max_wait_s": self.max_wait_s,
+                "avg_wait_s": (self.total_wait_s / started) if started else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Executor registry (one pool per external dependency)
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _executor_config(name: str) -> Dict[str, int]:
+    settings = get_settings()
+    return {
+        "max_workers": getattr(settings, f"{name}_executor_workers"),
+        "max_queue": getattr(settings, f"{name}_executor_max_queue"),
+    }
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Get the named executor, creating it from settings if it was not started yet."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = BoundedExecutor(name, **_executor_config(name))
+                _executors[name] = executor
+    return executor
+
+
+async def run_blocking(name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call on the named dependency's executor."""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def start_executors(*names: str) -> None:
+    """Create the named executors up front (called from the app lifespan)."""
+    for name in names:
+        executor = get_executor(name)
+        logger.info(
+            "Started %s executor (%d workers, queue %d)",
+            name,
+            executor.max_workers,
+            executor.max_queue,
+        )
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: executor.stats() for name, executor in _executors.items()}
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Shut down every executor (called from the app lifespan)."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
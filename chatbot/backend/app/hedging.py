@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """
+    Hedged requests for one kind of call, with a delay learned from its latency.
+
+    `run` starts the call and, if it has not answered after the current
+    hedge delay, starts a second identical call and returns whichever
+    succeeds first (the other is cancelled). The delay is the `percentile`
+    of recent successful call latencies, so only the slowest few percent of
+    calls are duplicated; until `min_samples` latencies have been seen no
+    call is hedged. If one attempt fails, the other is still awaited.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 95.0,
+        min_delay_s: float = 0.5,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+        # Metrics
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        """Current hedge delay in seconds, or None while there are too few samples."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return max(self.min_delay_s, ordered[max(index, 0)])
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        delay = self.delay()
+        started = time.perf_counter()
+
+        # Latency is recorded end to end, hedge included: a hedged call counts
+        # as at least `delay`, which keeps the share of hedged calls near
+        # 100 - percentile instead of the delay drifting down to the winners
+        first = asyncio.ensure_future(call())
+        if delay is None:
+            result = await first
+            self._latencies.append(time.perf_counter() - started)
+            return result
+
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                logger.debug("%s call still running after %.2fs; sending a hedged request", self.name, delay)
+                tasks.add(asyncio.ensure_future(call()))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        self._latencies.append(time.perf_counter() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "delay_s": self.delay(),
+            "samples": len(self._latencies),
+        }
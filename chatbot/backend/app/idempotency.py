@@ -0,0 +1,48 @@
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.cache import SingleFlightCache
+from app.config import get_settings
+
+# Longest Idempotency-Key value we accept
+MAX_KEY_LENGTH = 255
+
+_idempotency_cache: Optional[SingleFlightCache] = None
+
+
+def get_idempotency_cache() -> SingleFlightCache:
+    """Get or create the store mapping idempotency keys to responses."""
+    global _idempotency_cache
+    if _idempotency_cache is None:
+        settings = get_settings()
+        _idempotency_cache = SingleFlightCache(
+            "idempotency",
+            max_entries=settings.idempotency_max_keys,
+            ttl_s=settings.idempotency_ttl_s,
+        )
+    return _idempotency_cache
+
+
+def scoped_idempotency_key(route: str, key: str, api_key: Optional[str] = None) -> str:
+    """Namespace a client-supplied key by route and API key, rejecting malformed keys."""
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key header.")
+    return f"{route}\x1f{(api_key or '').strip()}\x1f{key}"
+
+
+def request_fingerprint(body: BaseModel) -> str:
+    """Hash of a validated request body, stored with the response to its idempotency key."""
+    return hashlib.sha256(body.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def check_fingerprint(stored: str, fingerprint: str) -> None:
+    """Reject reuse of an idempotency key with a different request body."""
+    if stored != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body.",
+        )
@@ -1,10 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
+from app.body_limit import BodySizeLimitMiddleware
 from app.config import get_settings
-from app.routes import lead_intake_router, transcribe_router
+from app.deadline import Deadline, DeadlineExceeded
+from app.executors import start_executors, shutdown_executors
+from app.metrics import MetricsMiddleware, mark_process_dead
+from app.rate_limit import RateLimitMiddleware, get_rate_limiter
+from app.timing import ServerTimingMiddleware
+from app.routes import lead_intake_router, transcribe_router, status_router
+from app.services.lead_journal import get_lead_journal
+from app.services.lead_delivery import start_lead_drainer, stop_lead_drainer, wait_for_lead_enrichment
+from app.services.sheets_service import flush_sheets_service
+from app.warmup import is_warm, start_warm_up, stop_warm_up
+
+# Part of the shutdown budget kept for flushing buffered Sheets rows
+SHUTDOWN_FLUSH_SHARE = 0.25
 
 
 @asynccontextmanager
@@ -16,12 +31,39 @@ async def lifespan(app: FastAPI):
         level=logging.DEBUG if settings.debug else logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
-    logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.WARNING)
     logging.info("eBottles AI Intake starting...")
     logging.info("Allowed origins: %s", settings.allowed_origins_list)
+    start_executors("sheets", "gmail")
+    # Build the Sheets/Gmail/OpenAI clients (credentials, tokens, client libraries,
+    # spreadsheet) now instead of in the first request; /health answers 503
+    # until this finishes
+    start_warm_up()
+    journal = get_lead_journal()
+    if journal is not None:
+        logging.info("Lead journal enabled at %s", journal.directory)
+        start_lead_drainer(journal)
     yield
-    # Shutdown
+    # Shutdown, within shutdown_timeout_s: the drainer stops and background
+    # enrichment finishes side by side (unfinished enrichment is journaled),
+    # keeping part of the budget back to flush buffered Sheets rows
     logging.info("eBottles AI Intake shutting down...")
+    deadline = Deadline(settings.shutdown_timeout_s)
+    await stop_warm_up()
+    wait_s = deadline.remaining(reserve_s=deadline.budget_s * SHUTDOWN_FLUSH_SHARE)
+    await asyncio.gather(
+        stop_lead_drainer(timeout=wait_s),
+        wait_for_lead_enrichment(timeout=wait_s, journal=journal),
+    )
+    try:
+        await deadline.run(flush_sheets_service(), "Sheets flush on shutdown")
+    except DeadlineExceeded as e:
+        logging.error("Buffered Sheets rows may not have been written: %s", e)
+    if journal is not None:
+        journal.close()
+    # Everything that used the executors has finished or been abandoned by
+    # now; don't block on a call still stuck in a worker thread
+    shutdown_executors(wait=False)
+    mark_process_dead()
 
 
 app = FastAPI(
@@ -31,24 +73,66 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Configure CORS
 settings = get_settings()
+
+# Cap upload sizes while the body streams in (added before CORS so that
+# early 413 responses still carry CORS headers)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    path_limits={"/transcribe": settings.transcribe_max_upload_bytes},
+)
+
+# Shed excess traffic per client before it reaches OpenAI or uploads are
+# read (also inside CORS, so 429 responses carry CORS headers)
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        path_limiters={
+            "/lead-intake": get_rate_limiter("lead_intake"),
+            "/transcribe": get_rate_limiter("transcribe"),
+            "/transcribe/stream": get_rate_limiter("transcribe"),
+        },
+        forwarded_hops=settings.rate_limit_forwarded_hops,
+    )
+
+# Per-stage Server-Timing header + one JSON timing log line per request
+app.add_middleware(
+    ServerTimingMiddleware,
+    paths={"/lead-intake", "/transcribe"},
+    header=settings.server_timing_header,
+)
+
+# Configure CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins_list,
     allow_credentials=False,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    # Lets the widget read the stage breakdown of its own requests
+    expose_headers=["Server-Timing"],
 )
 
+# Request counts/latency per route (added last so it is outermost and also
+# times responses produced by the middleware above)
+app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(lead_intake_router, tags=["Lead Intake"])
 app.include_router(transcribe_router, tags=["Transcription"])
+app.include_router(status_router, tags=["Status"])
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for Cloud Run."""
+    """
+    Health check endpoint for Cloud Run.
+
+    Answers 503 while the startup warm-up is still running, so a startup
+    probe on this path keeps traffic off the instance until it is warm.
+    """
+    if not is_warm():
+        return JSONResponse(status_code=503, content={"status": "starting", "service": "ebottles-ai-intake"})
     return {"status": "healthy", "service": "ebottles-ai-intake"}
 
 
@@ -62,6 +146,8 @@ async def root():
             "lead_intake": "POST /lead-intake",
             "transcribe": "POST /transcribe",
             "health": "GET /health",
+            "status": "GET /status",
+            "metrics": "GET /metrics",
         }
     }
 
@@ -0,0 +1,278 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import ContextManager, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.routing import BaseRoute, Match
+
+from app.timing import record_timing
+
+# With several uvicorn workers, each process writes its samples to files in
+# PROMETHEUS_MULTIPROC_DIR and /metrics merges them. The variable must be set
+# in the environment (not .env) before the app is imported.
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Latency buckets (seconds): sub-ms cache hits up to the 60 s delivery deadline
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, by route template.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    multiprocess_mode="livesum",
+)
+
+LEAD_STAGE_DURATION = Histogram(
+    "lead_stage_duration_seconds",
+    "Time spent in each lead intake/delivery stage, by outcome.",
+    ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LEAD_ENRICHMENT_IN_FLIGHT = Gauge(
+    "lead_enrichment_in_flight",
+    "Background lead enrichment tasks currently running.",
+    multiprocess_mode="livesum",
+)
+
+DEPENDENCY_CALL_DURATION = Histogram(
+    "dependency_call_duration_seconds",
+    "Latency of calls to OpenAI, Sheets and Gmail, by operation and outcome.",
+    ["service", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    "dependency_calls_in_flight",
+    "Calls to an external dependency currently in flight.",
+    ["service"],
+    multiprocess_mode="livesum",
+)
+
+EXECUTOR_QUEUED = Gauge(
+    "executor_queued_calls",
+    "Blocking calls waiting for a worker thread.",
+    ["executor"],
+    multiprocess_mode="livesum",
+)
+EXECUTOR_ACTIVE = Gauge(
+    "executor_active_calls",
+    "Blocking calls running on a worker thread.",
+    ["executor"],
+    multiprocess_mode="livesum",
+)
+EXECUTOR_REJECTED = Counter(
+    "executor_rejected_total",
+    "Calls rejected because the executor queue was full.",
+    ["executor"],
+)
+EXECUTOR_WAIT = Histogram(
+    "executor_queue_wait_seconds",
+    "Time blocking calls waited for a worker thread.",
+    ["executor"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0),
+)
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 = closed, 1 = half-open, 2 = open).",
+    ["breaker"],
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Calls failed fast by an open circuit breaker.",
+    ["breaker"],
+)
+
+CONCURRENCY_LIMIT = Gauge(
+    "concurrency_limit",
+    "Current adaptive concurrency limit.",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_IN_FLIGHT = Gauge(
+    "concurrency_limiter_in_flight",
+    "Calls holding a slot of the adaptive concurrency limiter.",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_QUEUED = Gauge(
+    "concurrency_limiter_queued_calls",
+    "Calls waiting for a slot of the adaptive concurrency limiter.",
+    ["limiter"],
+    multiprocess_mode="livesum",
+)
+CONCURRENCY_WAIT = Histogram(
+    "concurrency_limiter_wait_seconds",
+    "Time calls waited for a slot of the adaptive concurrency limiter.",
+    ["limiter"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+CONCURRENCY_REJECTED = Counter(
+    "concurrency_limiter_rejected_total",
+    "Calls rejected or displaced because the limiter queue was full, by priority.",
+    ["limiter", "priority"],
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests refused by the per-client rate limiter.",
+    ["route"],
+)
+
+
+class CallOutcome:
+    """Outcome of a timed block; defaults to "ok", or "error" if the block raises."""
+
+    def __init__(self) -> None:
+        self.outcome: Optional[str] = None
+
+
+def _exception_outcome(e: BaseException) -> str:
+    # Imported lazily: these modules import this one for their own metrics
+    from app.circuit_breaker import CircuitOpenError
+
+    if isinstance(e, CircuitOpenError):
+        return "rejected"
+    if isinstance(e, TimeoutError):
+        return "timeout"
+    if not isinstance(e, Exception):
+        return "cancelled"
+    return "error"
+
+
+@contextmanager
+def _timed(
+    histogram: Histogram,
+    labels: dict,
+    in_flight: Optional[Gauge] = None,
+    timing: Optional[str] = None,
+) -> Iterator[CallOutcome]:
+    call = CallOutcome()
+    if in_flight is not None:
+        in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        call.outcome = call.outcome or _exception_outcome(e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if in_flight is not None:
+            in_flight.dec()
+        histogram.labels(outcome=call.outcome or "ok", **labels).observe(elapsed)
+        if timing is not None:
+            record_timing(timing, elapsed)
+
+
+def track_stage(stage: str, timing: Optional[str] = None) -> ContextManager[CallOutcome]:
+    """
+    Time one lead stage; set `.outcome` on the yielded object to override "ok".
+
+    With `timing`, the duration is also added under that name to the
+    current request's Server-Timing / timing log line.
+    """
+    return _timed(LEAD_STAGE_DURATION, {"stage": stage}, timing=timing)
+
+
+def observe_stage(stage: str, outcome: str, seconds: float) -> None:
+    """Record a stage timed elsewhere (e.g. two stages finished by one call)."""
+    LEAD_STAGE_DURATION.labels(stage=stage, outcome=outcome).observe(seconds)
+
+
+def track_call(service: str, operation: str) -> ContextManager[CallOutcome]:
+    """Time one call to an external dependency; set `.outcome` to override "ok"."""
+    return _timed(
+        DEPENDENCY_CALL_DURATION,
+        {"service": service, "operation": operation},
+        in_flight=DEPENDENCY_IN_FLIGHT.labels(service=service),
+    )
+
+
+def _match_route(scope) -> Optional[BaseRoute]:
+    """The route a request that never reached the router would have gone to."""
+    app = scope.get("app")
+    partial = None
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+        if match == Match.PARTIAL and partial is None:
+            # Path matches but the method doesn't (405)
+            partial = route
+    return partial
+
+
+class MetricsMiddleware:
+    """
+    Count and time HTTP requests by route template (e.g. "/lead-intake").
+
+    Paths that match no route are grouped under "unmatched" so scanners
+    cannot blow up the label cardinality. Responses sent by middleware before
+    routing (429 from the rate limiter, 413 from the body size limit) are
+    matched against the app's routes afterwards. WebSockets are not timed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route") or _match_route(scope)
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method=method, route=template).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method=method, route=template, status=str(status_code)).inc()
+
+
+def render_metrics() -> tuple:
+    """Exposition text and content type for /metrics (merged across workers)."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared files (called on shutdown)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
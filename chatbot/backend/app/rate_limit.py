@@ -0,0 +1,212 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from starlette import status
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import get_settings
+from app.metrics import RATE_LIMITED
+from app.security import constant_time_equals
+
+
+class RateLimiter:
+    """
+    Token bucket per client for one route.
+
+    Each client starts with `burst` tokens, refilled at `per_min` tokens a
+    minute; a request takes one token or is refused with the time until the
+    next one. Buckets are kept in last-used order, so a bucket that has been
+    idle long enough to refill completely (and is therefore the same as a
+    new one) is dropped from the front on later checks, and the least
+    recently used bucket is evicted beyond `max_clients`. Each check is O(1)
+    amortized and memory stays bounded.
+    """
+
+    def __init__(self, name: str, per_min: float, burst: int, max_clients: int = 10000):
+        self.name = name
+        self.rate = per_min / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max(1, max_clients)
+        # Seconds for an empty bucket to fill up again
+        self.refill_s = self.burst / self.rate if self.rate > 0 else math.inf
+
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def _sweep(self, now: float) -> None:
+        while self._buckets:
+            _, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.refill_s:
+                break
+            self._buckets.popitem(last=False)
+
+    def acquire(self, client: str) -> float:
+        """Take a token for `client`: 0 if admitted, else seconds until one is available."""
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._buckets.pop(client, None)
+        if entry is None:
+            tokens = float(self.burst)
+        else:
+            tokens, updated = entry
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+
+        if tokens >= 1.0:
+            tokens -= 1.0
+            retry_after = 0.0
+            self.admitted += 1
+        else:
+            retry_after = (1.0 - tokens) / self.rate if self.rate > 0 else math.inf
+            self.rejected += 1
+            RATE_LIMITED.labels(route=self.name).inc()
+
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+            self.evicted += 1
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        self._sweep(time.monotonic())
+        return {
+            "per_min": self.rate * 60.0,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+
+# Limiter registry (one per rate-limited route group)
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Get the named limiter ("lead_intake" or "transcribe"), creating it from settings."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                settings = get_settings()
+                limiter = RateLimiter(
+                    name,
+                    per_min=getattr(settings, f"rate_limit_{name}_per_min"),
+                    burst=getattr(settings, f"rate_limit_{name}_burst"),
+                    max_clients=settings.rate_limit_max_clients,
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def client_address(scope: Scope, forwarded_hops: int) -> str:
+    """
+    The client's IP address.
+
+    Proxies in front of the app (Cloud Run's front end) append the address
+    they saw to X-Forwarded-For, so with `forwarded_hops` trusted proxies the
+    client is that many entries from the right; anything further left is
+    whatever the client chose to send. 0 uses the socket peer address.
+    """
+    if forwarded_hops > 0:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                entries = [entry.strip() for entry in value.decode("latin-1").split(",") if entry.strip()]
+                if len(entries) >= forwarded_hops:
+                    return entries[-forwarded_hops]
+                break
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _api_key(scope: Scope) -> str:
+    for name, value in scope.get("headers", []):
+        if name == b"x-api-key":
+            return value.decode("latin-1").strip()
+    # WebSocket handshakes from browsers pass it as a query parameter
+    # (decoded the way the route's `Query` parameter is)
+    for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True):
+        if name == "api_key":
+            return value.strip()
+    return ""
+
+
+def client_key(scope: Scope, forwarded_hops: int) -> str:
+    """
+    The bucket key for a request: its IP address, plus the API key only if it
+    is the configured one. Unchecked keys are left out, or a client could
+    send a new made-up key with each request to get a fresh bucket.
+    """
+    address = client_address(scope, forwarded_hops)
+    expected = (get_settings().api_key or "").strip()
+    provided = _api_key(scope)
+    if expected and provided and constant_time_equals(provided, expected):
+        return f"{address}\x1f{provided}"
+    return address
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware that sheds excess traffic per client before it reaches
+    the route (and so before any OpenAI call or upload is read).
+
+    `path_limiters` maps a path to its limiter; clients are keyed by IP
+    address, plus the API key when it is the configured one (`client_key`).
+    A refused HTTP request gets 429 with a `Retry-After` header; a refused
+    WebSocket handshake is closed with 1013 (try again later). CORS
+    preflights are not counted.
+    """
+
+    def __init__(self, app: ASGIApp, path_limiters: Dict[str, RateLimiter], forwarded_hops: int = 1):
+        self.app = app
+        self.path_limiters = path_limiters
+        self.forwarded_hops = forwarded_hops
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter: Optional[RateLimiter] = None
+        if scope["type"] in ("http", "websocket") and scope.get("method") != "OPTIONS":
+            limiter = self.path_limiters.get(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = limiter.acquire(client_key(scope, self.forwarded_hops))
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": status.WS_1013_TRY_AGAIN_LATER})
+            return
+        await self._reject(send, retry_after)
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too many requests. Please try again shortly."}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(max(1, math.ceil(min(retry_after, 86400)))).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
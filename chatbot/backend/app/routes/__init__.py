@@ -1,5 +1,6 @@
 from .lead_intake import router as lead_intake_router
 from .transcribe import router as transcribe_router
+from .status import router as status_router
 
-__all__ = ["lead_intake_router", "transcribe_router"]
+__all__ = ["lead_intake_router", "transcribe_router", "status_router"]
 
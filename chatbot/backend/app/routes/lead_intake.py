@@ -1,23 +1,25 @@
+import asyncio
 import uuid
 import logging
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException, Depends
-
-from app.models.schemas import (
-    LeadIntakeRequest,
-    LeadIntakeResponse,
-    AIExtraction,
-    BudgetSensitivity,
-    CompanyType,
-    PriorityBand,
-)
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+
+from app.circuit_breaker import CircuitOpenError
+from app.config import get_settings
+from app.deadline import Deadline
+from app.metrics import track_stage
+from app.timing import annotate
+from app.models.schemas import LeadIntakeRequest, LeadIntakeResponse
 from app.security import require_api_key
+from app.idempotency import check_fingerprint, get_idempotency_cache, request_fingerprint, scoped_idempotency_key
 
 logger = logging.getLogger(__name__)
 from app.services.openai_service import OpenAIService, get_openai_service
 from app.services.sheets_service import SheetsService, get_sheets_service
 from app.services.gmail_service import GmailService, get_gmail_service
-from app.config import get_settings
+from app.services.lead_journal import LeadJournal, get_lead_journal
+from app.services.lead_delivery import STAGE_SHEETS, STATUS_ENRICHING, get_lead_drainer, start_lead_enrichment
 
 router = APIRouter()
 
@@ -26,48 +28,77 @@ router = APIRouter()
 async def submit_lead(
     request: LeadIntakeRequest,
     _: None = Depends(require_api_key),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-KEY"),
     openai_service: OpenAIService = Depends(get_openai_service),
     sheets_service: SheetsService = Depends(get_sheets_service),
     gmail_service: GmailService = Depends(get_gmail_service),
+    journal: Optional[LeadJournal] = Depends(get_lead_journal),
 ):
     """
     Process a lead intake submission.
     
-    1. Extract structured data from the freeform note using AI
-    2. Append the lead to Google Sheets
-    3. Send email notification to sales team
-    4. Return confirmation with lead ID
+    1. Append the raw lead (contact + note, status "enriching") to Google Sheets
+    2. Return confirmation with lead ID
+    3. In the background: extract structured data using AI, write it into
+       the lead's row in place (status "new") and email the sales team
+
+    The response therefore waits for one Sheets round trip, not for the AI.
+    When the lead journal is enabled, step 1 is handed to the background
+    drainer too and the response is returned as soon as the journal write is
+    durable.
+
+    With an `Idempotency-Key` header, a repeat of a successful submission
+    returns the original response without redoing any work, and a repeat
+    that arrives while the original is still running waits for it. Reusing
+    a key with a different body is rejected with 422.
+
+    Without the journal, the raw append must finish within
+    `lead_intake_deadline_s` (504 otherwise); the background steps get a
+    budget of their own (`lead_delivery_deadline_s`).
     """
+    deadline = Deadline(get_settings().lead_intake_deadline_s)
+
+    async def _process() -> LeadIntakeResponse:
+        return await _process_lead(
+            request,
+            deadline=deadline,
+            openai_service=openai_service,
+            sheets_service=sheets_service,
+            gmail_service=gmail_service,
+            journal=journal,
+        )
+
+    if idempotency_key is None:
+        response = await _process()
+    else:
+        key = scoped_idempotency_key("lead-intake", idempotency_key, x_api_key)
+        fingerprint = request_fingerprint(request)
+
+        async def _process_keyed():
+            return fingerprint, await _process()
+
+        stored_fingerprint, response = await get_idempotency_cache().get_or_compute(key, _process_keyed)
+        check_fingerprint(stored_fingerprint, fingerprint)
+    annotate(lead_id=response.lead_id)
+    return response
+
+
+async def _process_lead(
+    request: LeadIntakeRequest,
+    *,
+    deadline: Deadline,
+    openai_service: OpenAIService,
+    sheets_service: SheetsService,
+    gmail_service: GmailService,
+    journal: Optional[LeadJournal],
+) -> LeadIntakeResponse:
+    """Run the intake pipeline for one submission (see `submit_lead`)."""
     lead_id = f"LEAD-{uuid.uuid4().hex[:8].upper()}"
     timestamp = datetime.now(timezone.utc).isoformat()
     
     try:
-        # Step 1: Extract structured data using AI (non-fatal; fall back if it fails)
-        try:
-            extraction = await openai_service.extract_lead_data(
-                freeform_note=request.freeform_note,
-                role=request.role,
-            )
-        except Exception as e:
-            logger.exception(f"AI extraction failed for {lead_id}: {e}")
-            extraction = AIExtraction(
-                product_types=[],
-                intended_use=None,
-                markets=[],
-                regulatory_needs=None,
-                estimated_monthly_volume=None,
-                timeline=None,
-                budget_sensitivity=BudgetSensitivity.UNKNOWN,
-                sustainability_interest=None,
-                factory_direct_interest=None,
-                company_type=CompanyType.UNKNOWN,
-                priority_band=PriorityBand.MEDIUM,
-                ai_summary=(request.freeform_note[:240] + "…") if len(request.freeform_note) > 240 else request.freeform_note,
-                misc_notes="AI extraction unavailable (fallback summary used).",
-                confidence_flags=["ai_unavailable"],
-            )
-        
-        # Step 2: Append to Google Sheets
+        # Step 1: Build the raw row; the AI columns are filled in after extraction
         row_data = {
             "timestamp": timestamp,
             "lead_id": lead_id,
@@ -75,61 +106,62 @@ async def submit_lead(
             "page_url": request.metadata.page_url,
             "contact_name": request.contact.name,
             "company": request.contact.company,
-            "email": request.contact.email,
+            "email": str(request.contact.email),
             "phone": request.contact.phone or "",
             "role": request.role or "",
             "raw_freeform_note": request.freeform_note,
-            "ai_summary": extraction.ai_summary,
-            "product_types": ", ".join(extraction.product_types),
-            "intended_use": extraction.intended_use or "",
-            "markets": ", ".join(extraction.markets),
-            "estimated_monthly_volume": str(extraction.estimated_monthly_volume) if extraction.estimated_monthly_volume else "",
-            "timeline": extraction.timeline or "",
-            "sustainability_interest": str(extraction.sustainability_interest) if extraction.sustainability_interest is not None else "",
-            "factory_direct_interest": str(extraction.factory_direct_interest) if extraction.factory_direct_interest is not None else "",
-            "budget_sensitivity": extraction.budget_sensitivity.value,
-            "compliance_needs": extraction.regulatory_needs or "",
-            "priority_band": extraction.priority_band.value,
-            "misc_notes": extraction.misc_notes,
-            "status": "new",
+            "status": STATUS_ENRICHING,
         }
-        
-        # Step 2: Append to Sheets (fatal if it fails — otherwise we lose the lead)
-        try:
-            await sheets_service.append_lead(row_data)
-        except Exception as e:
-            logger.exception(f"Sheets append failed for {lead_id}: {e}")
-            raise HTTPException(status_code=500, detail="Unable to save your request. Please try again.")
-        
-        # Step 3: Email notification (non-fatal; lead is already in Sheets)
-        try:
-            settings = get_settings()
-            await gmail_service.send_notification(
-                lead_id=lead_id,
-                company=request.contact.company,
-                contact_name=request.contact.name,
-                email=request.contact.email,
-                product_types=extraction.product_types,
-                ai_summary=extraction.ai_summary,
-                priority_band=extraction.priority_band.value,
-                admin_emails=settings.admin_notification_emails_list,
-            )
-        except Exception as e:
-            logger.exception(f"Email notification failed for {lead_id}: {e}")
-
-        # Step 4: Confirmation email to the submitter (non-fatal)
-        try:
-            # Use sales notification email as the reply-to for the lead
-            await gmail_service.send_lead_confirmation(
-                to_email=str(request.contact.email),
-                contact_name=request.contact.name,
-                company=request.contact.company,
-                ai_summary=extraction.ai_summary,
-                lead_id=lead_id,
-                sales_email=settings.notification_email,
+        record = {
+            "lead_id": lead_id,
+            "row": row_data,
+            "lead": {
+                "freeform_note": request.freeform_note,
+                "role": request.role,
+            },
+        }
+
+        # Step 2: Journal the lead and let the drainer deliver it
+        journaled = False
+        if journal is not None:
+            try:
+                # No deadline: a write that is slow but lands would otherwise
+                # be delivered twice (by the drainer and inline)
+                with track_stage("journal", timing="journal"):
+                    await journal.append(record)
+                journaled = True
+                drainer = get_lead_drainer()
+                if drainer is not None:
+                    drainer.wake()
+            except Exception as e:
+                # Fall back to inline delivery rather than dropping the lead
+                logger.exception(f"Lead journal write failed for {lead_id}; delivering inline: {e}")
+
+        # Step 2 (no journal): append the raw row now (fatal), then run
+        # extraction, the AI column backfill and the emails in the background
+        if not journaled:
+            try:
+                # The deadline only bounds the wait for a batch flush to take
+                # the row: a row still queued is withdrawn (504, nothing
+                # written), one already being written is waited for, so a 504
+                # never leaves an orphaned "enriching" row behind
+                with track_stage(STAGE_SHEETS, timing="sheets"):
+                    await deadline.run(sheets_service.append_lead(row_data), "Sheets append")
+            except asyncio.TimeoutError as e:
+                logger.error(f"Sheets append timed out for {lead_id}: {e}")
+                raise HTTPException(status_code=504, detail="Saving your request took too long. Please try again.")
+            except CircuitOpenError as e:
+                logger.error(f"Sheets append skipped for {lead_id}: {e}")
+                raise HTTPException(status_code=503, detail="Unable to save your request right now. Please try again shortly.")
+            except Exception as e:
+                logger.exception(f"Sheets append failed for {lead_id}: {e}")
+                raise HTTPException(status_code=500, detail="Unable to save your request. Please try again.")
+            start_lead_enrichment(
+                record,
+                openai_service=openai_service,
+                sheets_service=sheets_service,
+                gmail_service=gmail_service,
             )
-        except Exception as e:
-            logger.exception(f"Lead confirmation email failed for {lead_id}: {e}")
         
         return LeadIntakeResponse(
             status="ok",
@@ -0,0 +1,47 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, Response
+
+from app.circuit_breaker import circuit_breaker_stats
+from app.executors import executor_stats
+from app.metrics import render_metrics
+from app.rate_limit import rate_limiter_stats
+from app.security import require_api_key
+from app.services.openai_service import openai_service_stats
+from app.services.sheets_service import sheets_service_stats
+from app.warmup import warm_up_stats
+
+router = APIRouter()
+
+
+@router.get("/status")
+async def service_status(_: None = Depends(require_api_key)) -> Dict[str, Any]:
+    """
+    Operational status for on-call: circuit breaker states, executor queues,
+    OpenAI cache/hedging/concurrency counters, the Sheets batch writer, rate limiters and the startup warm-up.
+
+    A breaker in "open" state means that dependency is currently failing
+    fast (see `last_error`). Counters are per instance and reset on restart.
+    `openai` and `sheets` are null until those services have been created
+    (by the warm-up or a first request); reading them never creates one, so
+    this handler does no blocking client setup on the event loop.
+    """
+    return {
+        "circuit_breakers": circuit_breaker_stats(),
+        "executors": executor_stats(),
+        "openai": openai_service_stats(),
+        "sheets": sheets_service_stats(),
+        "rate_limits": rate_limiter_stats(),
+        "warm_up": warm_up_stats(),
+    }
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(_: None = Depends(require_api_key)) -> Response:
+    """
+    Prometheus metrics: per-route request counts and latency, per-stage and
+    per-dependency-call latency by outcome, in-flight gauges, executor queue
+    depth and circuit breaker state.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+import asyncio
+import json
+import logging
+from typing import Dict, List
 
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, WebSocket, WebSocketDisconnect, status
+
+from app.body_limit import format_size
+from app.circuit_breaker import CircuitOpenError
+from app.concurrency import LimiterSaturatedError
+from app.config import get_settings
 from app.models.schemas import TranscribeResponse
 from app.services.openai_service import OpenAIService, get_openai_service
-from app.security import require_api_key
+from app.security import require_api_key, require_websocket_api_key
+from app.timing import timed
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Streaming transcription: a client that sends nothing for this long is dropped
+STREAM_IDLE_TIMEOUT_S = 30.0
+
 
 @router.post("/transcribe", response_model=TranscribeResponse)
 async def transcribe_audio(
@@ -41,23 +56,27 @@ async def transcribe_audio(
             )
     
     try:
-        # Read the audio file
-        audio_bytes = await audio.read()
-        
-        if len(audio_bytes) == 0:
+        # The body was size-capped by BodySizeLimitMiddleware while it streamed
+        # in and spooled to a temp file; this is the exact check on the file
+        max_bytes = get_settings().transcribe_max_upload_bytes
+        if not audio.size:
             raise HTTPException(
                 status_code=400,
                 detail="Empty audio file received.",
             )
-        # 10MB cap to prevent abuse
-        if len(audio_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="Audio file too large (max 10MB).")
+        if audio.size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Audio file too large (max {format_size(max_bytes)}).",
+            )
         
-        # Transcribe using Whisper
-        text = await openai_service.transcribe_audio(
-            audio_bytes=audio_bytes,
-            filename=audio.filename or "audio.webm",
-        )
+        # Transcribe using Whisper, streaming the spooled file to the API
+        await audio.seek(0)
+        with timed("whisper"):
+            text = await openai_service.transcribe_audio(
+                audio_file=audio.file,
+                filename=audio.filename or "audio.webm",
+            )
         
         return TranscribeResponse(
             status="ok",
@@ -67,10 +86,142 @@ async def transcribe_audio(
         
     except HTTPException:
         raise
+    except (CircuitOpenError, LimiterSaturatedError) as e:
+        logger.warning(f"Transcription skipped: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription is temporarily unavailable. Please type your message instead.",
+        )
     except Exception as e:
-        print(f"Transcription error: {e}")
+        logger.exception(f"Transcription error: {e}")
         raise HTTPException(
             status_code=500,
             detail="Failed to transcribe audio. Please try again.",
         )
 
+
+def _extension_for(mime_type: str) -> str:
+    """File extension Whisper should see for a recorder MIME type."""
+    mime_type = (mime_type or "").lower()
+    for marker, extension in (("webm", "webm"), ("mp4", "mp4"), ("mpeg", "mp3"), ("mp3", "mp3"), ("wav", "wav"), ("ogg", "ogg")):
+        if marker in mime_type:
+            return extension
+    return "webm"
+
+
+@router.websocket("/transcribe/stream")
+async def transcribe_stream(
+    websocket: WebSocket,
+    _: None = Depends(require_websocket_api_key),
+    openai_service: OpenAIService = Depends(get_openai_service),
+):
+    """
+    Transcribe audio incrementally while the user is still recording.
+
+    Protocol (JSON text frames unless noted):
+
+    - client `{"type": "start", "mime_type": "audio/webm"}` (optional; sets the file type)
+    - client binary frames: audio chunks of the current segment
+    - client `{"type": "segment"}`: the current segment is complete. Every
+      segment must be independently decodable (the widget restarts its
+      MediaRecorder per segment).
+    - client `{"type": "stop"}`: no more audio; the last segment is flushed
+    - server `{"type": "partial", "segment": n, "text": ..., "transcript": ...}`
+      as segments finish, in order (`transcript` is everything so far)
+    - server `{"type": "error", "segment": n, "detail": ...}` when a segment fails
+    - server `{"type": "final", "text": ...}`, then the socket is closed
+
+    Segments are transcribed in the background as soon as they end, so
+    after "stop" only the last segment is still outstanding. The total audio
+    per connection is capped at `transcribe_max_upload_bytes`.
+    """
+    await websocket.accept()
+    max_bytes = get_settings().transcribe_max_upload_bytes
+    extension = "webm"
+    segment = bytearray()
+    received = 0
+    tasks: List[asyncio.Task] = []
+    texts: Dict[int, str] = {}
+    next_partial = 0
+    send_lock = asyncio.Lock()
+
+    async def _send(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def _send_partials() -> None:
+        # Report finished segments in order, so `transcript` only ever grows
+        nonlocal next_partial
+        while next_partial in texts:
+            index = next_partial
+            next_partial += 1
+            transcript = " ".join(t for t in (texts[i] for i in range(next_partial)) if t)
+            await _send({"type": "partial", "segment": index, "text": texts[index], "transcript": transcript})
+
+    async def _transcribe_segment(index: int, data: bytes) -> None:
+        error = None
+        try:
+            texts[index] = await openai_service.transcribe_audio(
+                audio_file=data,
+                filename=f"segment-{index}.{extension}",
+            )
+        except Exception as e:
+            logger.exception(f"Transcription error (stream segment {index}): {e}")
+            texts[index] = ""
+            error = {"type": "error", "segment": index, "detail": "Failed to transcribe part of the audio."}
+        try:
+            if error is not None:
+                await _send(error)
+            await _send_partials()
+        except Exception:
+            # The client went away; the receive loop notices and cleans up
+            pass
+
+    def _end_segment() -> None:
+        nonlocal segment
+        if segment:
+            tasks.append(asyncio.create_task(_transcribe_segment(len(tasks), bytes(segment))))
+            segment = bytearray()
+
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=STREAM_IDLE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                await _send({"type": "error", "detail": "No audio received; closing."})
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                received += len(message["bytes"])
+                if received > max_bytes:
+                    await _send({"type": "error", "detail": f"Recording too large (max {format_size(max_bytes)})."})
+                    await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                    return
+                segment.extend(message["bytes"])
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "")
+            except ValueError:
+                control = {}
+            kind = control.get("type") if isinstance(control, dict) else None
+            if kind == "start":
+                extension = _extension_for(str(control.get("mime_type", "")))
+            elif kind == "segment":
+                _end_segment()
+            elif kind == "stop":
+                break
+
+        _end_segment()
+        await asyncio.gather(*tasks)
+        final = " ".join(t for t in (texts[i] for i in range(len(tasks))) if t)
+        await _send({"type": "final", "text": final})
+        await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,7 +1,7 @@
 import hmac
 from typing import Optional
 
-from fastapi import Header, HTTPException
+from fastapi import Header, HTTPException, Query, WebSocket, WebSocketException, status
 
 from app.config import get_settings
 
@@ -24,3 +24,25 @@ def require_api_key(x_api_key: Optional[str] = Header(default=None, alias="X-API
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
+def require_websocket_api_key(
+    websocket: WebSocket,
+    api_key: Optional[str] = Query(default=None),
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-KEY"),
+) -> None:
+    """WebSocket variant of `require_api_key`.
+
+    Browsers cannot set headers on a WebSocket handshake, so the key may also
+    be passed as the `api_key` query parameter. CORS does not apply to
+    WebSockets, so a browser handshake's Origin must be an allowed origin.
+    """
+    settings = get_settings()
+    origin = websocket.headers.get("origin")
+    allowed = settings.allowed_origins_list
+    if origin and "*" not in allowed and origin not in allowed:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Origin not allowed")
+    expected = (settings.api_key or "").strip()
+    if not expected:
+        return
+    provided = (x_api_key or api_key or "").strip()
+    if not provided or not constant_time_equals(provided, expected):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Unauthorized")
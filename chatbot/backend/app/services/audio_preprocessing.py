@@ -0,0 +1,192 @@
+import io
+import logging
+import wave
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper works on 16 kHz mono; sending more is billed and uploaded for nothing
+TARGET_SAMPLE_RATE = 16000
+
+# Energy-based VAD: 30 ms frames; a frame is speech when its RMS level is
+# SPEECH_MARGIN_DB above the clip's noise floor (10th percentile frame level)
+# and above SILENCE_FLOOR_DBFS
+FRAME_MS = 30
+SPEECH_MARGIN_DB = 12.0
+SILENCE_FLOOR_DBFS = -50.0
+NOISE_FLOOR_PERCENTILE = 10
+
+# Speech kept around trimmed edges and split points, and the shortest pause
+# a long clip may be split at
+PADDING_MS = 200
+MIN_SPLIT_SILENCE_MS = 400
+
+
+@dataclass
+class PreprocessedAudio:
+    """Result of `preprocess_wav`: mono 16 kHz WAV segments, in order."""
+
+    segments: List[bytes] = field(default_factory=list)
+    input_duration_s: float = 0.0
+    output_duration_s: float = 0.0
+
+
+def is_pcm_wav(data: bytes) -> bool:
+    """True if `data` starts with a RIFF/WAVE header (format checked on decode)."""
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def _decode_wav(data: bytes) -> Optional[tuple]:
+    """Decode integer PCM WAV into (float32 samples [n, channels], sample rate)."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        logger.debug("Not a PCM WAV file (%s); skipping preprocessing", e)
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels), rate
+
+
+def _to_mono_16k(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Downmix to mono and resample to `TARGET_SAMPLE_RATE`."""
+    mono = samples.mean(axis=1)
+    if rate == TARGET_SAMPLE_RATE or len(mono) == 0:
+        return mono
+    if rate > TARGET_SAMPLE_RATE:
+        # Box low-pass over one output sample period before decimating
+        width = int(round(rate / TARGET_SAMPLE_RATE))
+        if width > 1:
+            mono = np.convolve(mono, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    n_out = int(len(mono) * TARGET_SAMPLE_RATE / rate)
+    positions = np.arange(n_out, dtype=np.float64) * (rate / TARGET_SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+
+
+def _speech_frames(mono: np.ndarray, frame_len: int) -> np.ndarray:
+    """Boolean speech mask, one entry per `frame_len` samples."""
+    n_frames = len(mono) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = mono[: n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    level_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    threshold = float(np.percentile(level_db, NOISE_FLOOR_PERCENTILE)) + SPEECH_MARGIN_DB
+    # A clip that is speech throughout has no quiet frames to measure the
+    # noise floor from; never require more than the loudest frame minus the margin
+    threshold = min(threshold, float(level_db.max()) - SPEECH_MARGIN_DB)
+    return level_db > max(threshold, SILENCE_FLOOR_DBFS)
+
+
+def _split_points(speech: np.ndarray, start: int, end: int, max_frames: int, min_gap: int) -> List[tuple]:
+    """
+    Split frames [start, end) into spans of at most `max_frames`, cutting
+    inside pauses of at least `min_gap` frames where possible.
+
+    Returns (first_frame, last_frame_exclusive) spans; the pause a span was
+    cut at is left out of both neighbours.
+    """
+    # Pause runs inside the trimmed range, as (run_start, run_end)
+    quiet = ~speech[start:end]
+    edges = np.diff(np.concatenate(([0], quiet.astype(np.int8), [0])))
+    runs = [
+        (start + s, start + e)
+        for s, e in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+        if e - s >= min_gap
+    ]
+
+    spans = []
+    span_start = start
+    while end - span_start > max_frames:
+        limit = span_start + max_frames
+        candidates = [run for run in runs if span_start < run[0] and run[0] < limit]
+        if candidates:
+            run_start, run_end = candidates[-1]
+            spans.append((span_start, run_start))
+            span_start = run_end
+        else:
+            spans.append((span_start, limit))
+            span_start = limit
+    if end > span_start:
+        spans.append((span_start, end))
+    return spans
+
+
+def _encode_wav(mono: np.ndarray) -> bytes:
+    pcm = (np.clip(mono, -1.0, 1.0) * 32767.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TARGET_SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def preprocess_wav(data: bytes, max_segment_s: float = 30.0) -> Optional[PreprocessedAudio]:
+    """
+    Prepare a PCM WAV recording for Whisper (CPU-bound; run it off the event loop).
+
+    The audio is downmixed to mono, resampled to 16 kHz and trimmed of
+    leading/trailing silence with an energy-based VAD. Clips longer than
+    `max_segment_s` are split inside pauses so the segments can be
+    transcribed concurrently and joined in order.
+
+    Returns None when `data` is not integer PCM WAV (send it unchanged).
+    An empty `segments` list means no speech was detected.
+    """
+    decoded = _decode_wav(data)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    if rate <= 0:
+        return None
+    input_duration_s = len(samples) / rate
+
+    mono = _to_mono_16k(samples, rate)
+    frame_len = TARGET_SAMPLE_RATE * FRAME_MS // 1000
+    speech = _speech_frames(mono, frame_len)
+    voiced = np.flatnonzero(speech)
+    if len(voiced) == 0:
+        return PreprocessedAudio(segments=[], input_duration_s=input_duration_s)
+
+    pad = PADDING_MS // FRAME_MS
+    first = max(int(voiced[0]) - pad, 0)
+    last = min(int(voiced[-1]) + 1 + pad, len(speech))
+    max_frames = max(1, int(max_segment_s * 1000 / FRAME_MS))
+    min_gap = max(1, MIN_SPLIT_SILENCE_MS // FRAME_MS)
+
+    segments = []
+    output_samples = 0
+    for span_start, span_end in _split_points(speech, first, last, max_frames, min_gap):
+        lo = max(span_start - pad, first) * frame_len
+        hi = min(span_end + pad, last) * frame_len
+        segments.append(_encode_wav(mono[lo:hi]))
+        output_samples += hi - lo
+
+    return PreprocessedAudio(
+        segments=segments,
+        input_duration_s=input_duration_s,
+        output_duration_s=output_samples / TARGET_SAMPLE_RATE,
+    )
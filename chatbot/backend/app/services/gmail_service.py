@@ -1,17 +1,33 @@
 import asyncio
 import base64
 import logging
+import os
+import threading
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional, List, Union
-
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+from typing import Any, Optional, List, Dict, Tuple, Union
 
+from app.circuit_breaker import CircuitOpenError, get_circuit_breaker
 from app.config import get_settings
+from app.executors import run_blocking
+from app.metrics import track_call
 
 logger = logging.getLogger(__name__)
 
+# Socket timeout for Gmail API connections
+HTTP_TIMEOUT_S = 30
+
+# Gmail API discovery document, trimmed to users.messages.send and the
+# schemas it references (from google-api-python-client's bundled copy)
+DISCOVERY_DOCUMENT_PATH = os.path.join(os.path.dirname(__file__), "gmail.v1.json")
+
+
+@lru_cache
+def _discovery_document() -> str:
+    with open(DISCOVERY_DOCUMENT_PATH, encoding="utf-8") as f:
+        return f.read()
+
 
 class GmailService:
     """Service for sending email notifications via Gmail API."""
@@ -21,6 +37,9 @@ class GmailService:
         credentials_dict: dict,
         notification_email: str,
         from_email: str,
+        max_concurrency: int = 4,
+        single_notification: bool = False,
+        batch_requests: bool = False,
     ):
         """
         Initialize the Gmail service with credentials.
@@ -33,9 +52,24 @@ class GmailService:
             credentials_dict: Parsed Google service account JSON
             notification_email: Email address to send notifications to
             from_email: Email address to send from (must be in the domain)
+            max_concurrency: Maximum Gmail API sends in flight at once
+            single_notification: Send one notification to all internal recipients
+                (sales in To, admins in Bcc) instead of one message each
+            batch_requests: Send all of a lead's emails in one Gmail batch HTTP request
         """
+        # google-auth is imported here rather than with the app, to keep it
+        # out of process start-up
+        from google.oauth2.service_account import Credentials
+
         self.notification_email = notification_email
         self.from_email = from_email
+        self.single_notification = single_notification
+        self.batch_requests = batch_requests
+        # Shared by every send (notification fan-out and confirmations)
+        self._send_semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        # Sends that return False count as failures; while open, sends are
+        # skipped (reported as not sent) instead of waiting on a broken API
+        self.breaker = get_circuit_breaker("gmail")
         
         # Set up credentials with Gmail scope
         scopes = ["https://www.googleapis.com/auth/gmail.send"]
@@ -48,14 +82,37 @@ class GmailService:
         # For domain-wide delegation, we need to impersonate the from_email user
         self.delegated_credentials = self.credentials.with_subject(from_email)
         
-        self._service = None
+        # httplib2 transports are not thread-safe, so every executor thread
+        # gets its own authorized client (and keeps its connection alive)
+        self._local = threading.local()
     
     @property
     def service(self):
-        """Get the Gmail API service, building it if needed."""
-        if self._service is None:
-            self._service = build("gmail", "v1", credentials=self.delegated_credentials)
-        return self._service
+        """Get this thread's Gmail API service, building it if needed."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.discovery import build_from_document
+
+            http = AuthorizedHttp(self.delegated_credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT_S))
+            # The small bundled document avoids parsing the library's full
+            # 130 KB copy (or fetching one) for every thread's client
+            service = build_from_document(_discovery_document(), http=http)
+            self._local.service = service
+        return service
+
+    def warm_up(self) -> None:
+        """
+        Do the first-send work up front (sync operation): fetch the delegated
+        OAuth token (shared by every thread's client) and build this thread's
+        Gmail API client.
+        """
+        import httplib2
+        from google_auth_httplib2 import Request
+
+        self.delegated_credentials.refresh(Request(httplib2.Http(timeout=HTTP_TIMEOUT_S)))
+        self.service
     
     def _create_email(
         self,
@@ -64,6 +121,7 @@ class GmailService:
         body_html: str,
         body_text: str,
         reply_to: Optional[str] = None,
+        bcc: Optional[List[str]] = None,
     ) -> dict:
         """Create an email message in the format required by Gmail API."""
         message = MIMEMultipart("alternative")
@@ -72,6 +130,8 @@ class GmailService:
         message["subject"] = subject
         if reply_to:
             message["reply-to"] = reply_to
+        if bcc:
+            message["bcc"] = ", ".join(bcc)
         
         # Add plain text and HTML parts
         part1 = MIMEText(body_text, "plain")
@@ -92,6 +152,7 @@ class GmailService:
         body_html: str,
         body_text: str,
         reply_to: Optional[str] = None,
+        bcc: Optional[List[str]] = None,
     ) -> bool:
         """Synchronous email sending operation."""
         
@@ -102,6 +163,7 @@ class GmailService:
                 body_html=body_html,
                 body_text=body_text,
                 reply_to=reply_to,
+                bcc=bcc,
             )
             
             self.service.users().messages().send(
@@ -124,6 +186,39 @@ class GmailService:
             )
             return False
 
+    def _send_batch_sync(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """Send several emails in a single Gmail batch HTTP request (sync operation)."""
+        results = [False] * len(emails)
+
+        def _on_response(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+            index = int(request_id)
+            if exception is None:
+                results[index] = True
+            else:
+                logger.error(
+                    "Gmail batch send failed (from=%s to=%s). Error=%s",
+                    self.from_email,
+                    emails[index]["to"],
+                    exception,
+                )
+
+        try:
+            batch = self.service.new_batch_http_request(callback=_on_response)
+            for index, email in enumerate(emails):
+                batch.add(
+                    self.service.users().messages().send(userId="me", body=self._create_email(**email)),
+                    request_id=str(index),
+                )
+            batch.execute()
+        except Exception as e:
+            logger.exception(
+                "Gmail batch request failed (from=%s, %d message(s)). Error=%s",
+                self.from_email,
+                len(emails),
+                e,
+            )
+        return results
+
     async def _send_email(
         self,
         *,
@@ -132,19 +227,68 @@ class GmailService:
         body_html: str,
         body_text: str,
         reply_to: Optional[str] = None,
+        bcc: Optional[List[str]] = None,
     ) -> bool:
         """Async wrapper to send an email without blocking the event loop."""
-        return await asyncio.to_thread(
-            self._send_email_sync,
-            to=to,
-            subject=subject,
-            body_html=body_html,
-            body_text=body_text,
-            reply_to=reply_to,
+
+        async def _send() -> bool:
+            async with self._send_semaphore:
+                return await run_blocking(
+                    "gmail",
+                    self._send_email_sync,
+                    to=to,
+                    subject=subject,
+                    body_html=body_html,
+                    body_text=body_text,
+                    reply_to=reply_to,
+                    bcc=bcc,
+                )
+
+        with track_call("gmail", "send") as call:
+            try:
+                sent = await self.breaker.call(_send, is_failure=lambda sent: not sent)
+            except CircuitOpenError as e:
+                logger.warning("Email to %s not sent: %s", to, e)
+                call.outcome = "rejected"
+                return False
+            if not sent:
+                call.outcome = "error"
+            return sent
+
+    async def _send_all(self, emails: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Send a set of emails and return one result per email.
+
+        In batch mode they go out in one batch HTTP request; otherwise each is
+        sent individually and concurrently, bounded by the shared semaphore.
+        """
+        if not emails:
+            return []
+        if self.batch_requests:
+
+            async def _send_batch() -> List[bool]:
+                async with self._send_semaphore:
+                    return await run_blocking("gmail", self._send_batch_sync, emails)
+
+            with track_call("gmail", "send_batch") as call:
+                try:
+                    results = await self.breaker.call(_send_batch, is_failure=lambda results: not any(results))
+                except CircuitOpenError as e:
+                    logger.warning("%d email(s) not sent: %s", len(emails), e)
+                    call.outcome = "rejected"
+                    return [False] * len(emails)
+                if not all(results):
+                    call.outcome = "error" if not any(results) else "partial"
+                return results
+        results = await asyncio.gather(
+            *(self._send_email(**email) for email in emails),
+            return_exceptions=True,
         )
-    
-    async def send_notification(
+        return [result is True for result in results]
+
+    def _notification_emails(
         self,
+        *,
         lead_id: str,
         company: str,
         contact_name: str,
@@ -153,15 +297,8 @@ class GmailService:
         ai_summary: str,
         priority_band: str,
         admin_emails: Optional[List[str]] = None,
-    ) -> bool:
-        """
-        Send a lead notification email to the sales team.
-        
-        Uses asyncio.to_thread to run the sync Gmail API operation
-        without blocking the event loop.
-        
-        Returns True if successful, False otherwise.
-        """
+    ) -> List[Dict[str, Any]]:
+        """Build the sales notification: one email per recipient, or one addressed to all."""
         products_str = ", ".join(product_types) if product_types else "General Inquiry"
 
         subject = f"[New AI Lead] {company} - {products_str}"
@@ -244,20 +381,76 @@ DETAILS
         # Add optional admin recipients
         if admin_emails:
             recipients.extend([e for e in admin_emails if e and e not in recipients])
-
-        ok = True
-        for to in recipients:
-            sent = await self._send_email(
-                to=to,
-                subject=subject,
-                body_html=body_html,
-                body_text=body_text,
-                reply_to=email,
+        if not recipients:
+            return []
+
+        content = {
+            "subject": subject,
+            "body_html": body_html,
+            "body_text": body_text,
+            "reply_to": email,
+        }
+        if self.single_notification:
+            return [{"to": recipients[0], "bcc": recipients[1:], **content}]
+        return [{"to": to, **content} for to in recipients]
+
+    @staticmethod
+    def _report_notification(lead_id: str, emails: List[Dict[str, Any]], results: List[bool]) -> bool:
+        """Log per-recipient notification results; True if every email went out."""
+        failed = [email["to"] for email, sent in zip(emails, results) if not sent]
+        recipients = sum(1 + len(email.get("bcc") or []) for email in emails)
+        if failed:
+            logger.warning(
+                "Lead notification %s: %d/%d message(s) sent to %d recipient(s) (failed: %s)",
+                lead_id,
+                len(emails) - len(failed),
+                len(emails),
+                recipients,
+                ", ".join(failed),
             )
-            ok = ok and sent
-        return ok
+        else:
+            logger.info(
+                "Lead notification %s: %d message(s) sent to %d recipient(s)",
+                lead_id,
+                len(emails),
+                recipients,
+            )
+        return not failed
 
-    async def send_lead_confirmation(
+    async def send_notification(
+        self,
+        lead_id: str,
+        company: str,
+        contact_name: str,
+        email: str,
+        product_types: List[str],
+        ai_summary: str,
+        priority_band: str,
+        admin_emails: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        Send a lead notification email to the sales team.
+        
+        By default each recipient gets its own send; the sends run
+        concurrently (bounded by `max_concurrency`) on the Gmail executor. With
+        `single_notification` one message goes to all recipients.
+        
+        Returns True if every recipient was sent to, False otherwise.
+        """
+        emails = self._notification_emails(
+            lead_id=lead_id,
+            company=company,
+            contact_name=contact_name,
+            email=email,
+            product_types=product_types,
+            ai_summary=ai_summary,
+            priority_band=priority_band,
+            admin_emails=admin_emails,
+        )
+        results = await self._send_all(emails)
+        return self._report_notification(lead_id, emails, results)
+
+    def _confirmation_email(
         self,
         *,
         to_email: str,
@@ -266,8 +459,8 @@ DETAILS
         ai_summary: str,
         lead_id: str,
         sales_email: str,
-    ) -> bool:
-        """Send a confirmation email to the person who submitted the form."""
+    ) -> Dict[str, Any]:
+        """Build the confirmation email for the person who submitted the form."""
         subject = f"We received your packaging request — {company}"
 
         greeting_name = contact_name.strip().split(" ")[0] if contact_name.strip() else "there"
@@ -308,13 +501,59 @@ Reference ID: {lead_id}
 Reply to this email or contact {sales_email}.
         """.strip()
 
-        return await self._send_email(
-            to=to_email,
-            subject=subject,
-            body_html=body_html,
-            body_text=body_text,
-            reply_to=sales_email,
+        return {
+            "to": to_email,
+            "subject": subject,
+            "body_html": body_html,
+            "body_text": body_text,
+            "reply_to": sales_email,
+        }
+
+    async def send_lead_confirmation(
+        self,
+        *,
+        to_email: str,
+        contact_name: str,
+        company: str,
+        ai_summary: str,
+        lead_id: str,
+        sales_email: str,
+    ) -> bool:
+        """Send a confirmation email to the person who submitted the form."""
+        email = self._confirmation_email(
+            to_email=to_email,
+            contact_name=contact_name,
+            company=company,
+            ai_summary=ai_summary,
+            lead_id=lead_id,
+            sales_email=sales_email,
         )
+        return await self._send_email(**email)
+
+    async def send_lead_emails(
+        self,
+        notification: Dict[str, Any],
+        confirmation: Dict[str, Any],
+    ) -> Tuple[bool, bool]:
+        """
+        Send the sales notification and the submitter confirmation together.
+
+        `notification` and `confirmation` are the keyword arguments of
+        `send_notification` and `send_lead_confirmation`. In batch mode every
+        message goes out in one Gmail batch HTTP request; otherwise the two
+        are sent concurrently. Returns (notification_ok, confirmation_ok).
+        """
+        if not self.batch_requests:
+            notified, confirmed = await asyncio.gather(
+                self.send_notification(**notification),
+                self.send_lead_confirmation(**confirmation),
+            )
+            return notified, confirmed
+
+        emails = self._notification_emails(**notification)
+        results = await self._send_all(emails + [self._confirmation_email(**confirmation)])
+        notified = self._report_notification(notification["lead_id"], emails, results[:-1])
+        return notified, results[-1]
 
 
 class MockGmailService:
@@ -360,15 +599,34 @@ class MockGmailService:
         logger.debug("   Summary: %s...", ai_summary[:100])
         return True
 
+    async def send_lead_emails(
+        self,
+        notification: Dict[str, Any],
+        confirmation: Dict[str, Any],
+    ) -> Tuple[bool, bool]:
+        notified = await self.send_notification(**notification)
+        confirmed = await self.send_lead_confirmation(**confirmation)
+        return notified, confirmed
+
+    def warm_up(self) -> None:
+        """Nothing to prepare in the mock."""
+        return None
+
 
 # Dependency injection helper
 _gmail_service: Optional[Union[GmailService, MockGmailService]] = None
+# Startup warm-up creates the service on a worker thread while requests may arrive
+_gmail_service_lock = threading.Lock()
 
 
 def get_gmail_service() -> Union[GmailService, MockGmailService]:
     """Get or create the Gmail service singleton."""
     global _gmail_service
-    if _gmail_service is None:
+    if _gmail_service is not None:
+        return _gmail_service
+    with _gmail_service_lock:
+        if _gmail_service is not None:
+            return _gmail_service
         settings = get_settings()
         credentials = settings.google_credentials_dict
         
@@ -381,5 +639,8 @@ def get_gmail_service() -> Union[GmailService, MockGmailService]:
             credentials_dict=credentials,
             notification_email=settings.notification_email,
             from_email=settings.notification_from_email,
+            max_concurrency=settings.gmail_max_concurrency,
+            single_notification=settings.gmail_single_notification,
+            batch_requests=settings.gmail_batch_requests,
         )
     return _gmail_service
@@ -0,0 +1,565 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.circuit_breaker import CircuitOpenError
+from app.concurrency import LimiterSaturatedError
+from app.config import get_settings
+from app.deadline import Deadline
+from app.metrics import LEAD_ENRICHMENT_IN_FLIGHT, observe_stage, track_stage
+from app.timing import record_timing, start_timings
+from app.models.schemas import AIExtraction
+from app.services.lead_journal import LeadJournal
+from app.services.local_extractor import extract_locally
+from app.services.openai_service import get_openai_service
+from app.services.sheets_service import get_sheets_service
+from app.services.gmail_service import get_gmail_service
+
+logger = logging.getLogger(__name__)
+
+# Delivery stages, in the order they run for each lead
+STAGE_SHEETS = "sheets"
+STAGE_EXTRACTION = "extraction"
+STAGE_ENRICHMENT = "enrichment"
+STAGE_NOTIFICATION = "notification"
+STAGE_CONFIRMATION = "confirmation"
+
+# Row status while the AI columns are still being filled in
+STATUS_ENRICHING = "enriching"
+STATUS_NEW = "new"
+
+# Google API answers that reject the request itself, so repeating it cannot
+# succeed. Auth and not-found errors (401/403/404) are left out: they come
+# from the deployment's configuration and hit every lead alike.
+PERMANENT_HTTP_STATUSES = {400, 413, 422}
+
+
+def fallback_extraction(freeform_note: str, role: Optional[str] = None) -> AIExtraction:
+    """
+    Extraction used when the AI step fails.
+
+    Fields come from the local rule-based extractor so sales still has
+    products, markets and volume to route on; the summary is prefixed with
+    the truncated note.
+    """
+    extraction = extract_locally(freeform_note, role).extraction
+    note = (freeform_note[:240] + "…") if len(freeform_note) > 240 else freeform_note
+    extraction.ai_summary = f"{extraction.ai_summary} Note: {note}"
+    extraction.misc_notes = " ".join(
+        part for part in ("AI extraction unavailable (rule-based extraction used).", extraction.misc_notes) if part
+    )
+    extraction.confidence_flags = ["ai_unavailable"] + extraction.confidence_flags
+    return extraction
+
+
+def enrichment_columns(extraction: AIExtraction) -> Dict[str, str]:
+    """Sheet cells filled in from the extraction (phase 2 of the row write)."""
+    return {
+        "ai_summary": extraction.ai_summary,
+        "product_types": ", ".join(extraction.product_types),
+        "intended_use": extraction.intended_use or "",
+        "markets": ", ".join(extraction.markets),
+        "estimated_monthly_volume": str(extraction.estimated_monthly_volume) if extraction.estimated_monthly_volume else "",
+        "timeline": extraction.timeline or "",
+        "sustainability_interest": str(extraction.sustainability_interest) if extraction.sustainability_interest is not None else "",
+        "factory_direct_interest": str(extraction.factory_direct_interest) if extraction.factory_direct_interest is not None else "",
+        "budget_sensitivity": extraction.budget_sensitivity.value,
+        "compliance_needs": extraction.regulatory_needs or "",
+        "priority_band": extraction.priority_band.value,
+        "misc_notes": extraction.misc_notes,
+        "status": STATUS_NEW,
+    }
+
+
+def lead_emails(record: Dict[str, Any], extraction: AIExtraction) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Keyword arguments for the notification and confirmation emails."""
+    settings = get_settings()
+    row = record["row"]
+    notification = {
+        "lead_id": record["lead_id"],
+        "company": row["company"],
+        "contact_name": row["contact_name"],
+        "email": row["email"],
+        "product_types": extraction.product_types,
+        "ai_summary": extraction.ai_summary,
+        "priority_band": extraction.priority_band.value,
+        "admin_emails": settings.admin_notification_emails_list,
+    }
+    # Use sales notification email as the reply-to for the lead
+    confirmation = {
+        "to_email": row["email"],
+        "contact_name": row["contact_name"],
+        "company": row["company"],
+        "ai_summary": extraction.ai_summary,
+        "lead_id": record["lead_id"],
+        "sales_email": settings.notification_email,
+    }
+    return notification, confirmation
+
+
+async def extract_lead(record: Dict[str, Any], openai_service, deadline: Deadline) -> AIExtraction:
+    """
+    Run AI extraction for a lead record (non-fatal; falls back if it fails).
+
+    The AI gets what is left of `deadline` less the delivery reserve kept
+    for the Sheets update and the emails.
+    """
+    lead = record["lead"]
+    if openai_service is not None:
+        reserve_s = get_settings().lead_delivery_reserve_s
+        try:
+            return await deadline.run(
+                openai_service.extract_lead_data(
+                    freeform_note=lead["freeform_note"],
+                    role=lead.get("role"),
+                    timeout_s=deadline.remaining(reserve_s),
+                ),
+                "AI extraction",
+                reserve_s=reserve_s,
+            )
+        except asyncio.TimeoutError as e:
+            logger.warning(f"AI extraction timed out for {record['lead_id']}; using fallback: {e}")
+        except (CircuitOpenError, LimiterSaturatedError) as e:
+            logger.warning(f"AI extraction skipped for {record['lead_id']}; using fallback: {e}")
+        except Exception as e:
+            logger.exception(f"AI extraction failed for {record['lead_id']}: {e}")
+    return fallback_extraction(lead["freeform_note"], lead.get("role"))
+
+
+async def deliver_lead(
+    record: Dict[str, Any],
+    openai_service,
+    sheets_service,
+    gmail_service,
+    completed: Iterable[str] = (),
+    results: Optional[Dict[str, Any]] = None,
+    on_stage_done: Optional[Callable[..., Any]] = None,
+    deadline: Optional[Deadline] = None,
+) -> None:
+    """
+    Deliver a lead record to Sheets and Gmail.
+
+    `record` holds the lead's raw sheet row (status "enriching") and the
+    inputs for AI extraction. The row is appended first; the extraction is
+    then written into its AI columns in place and the emails are sent.
+    Stages listed in `completed` are skipped, and `results` carries the
+    output of a completed extraction stage so it is not re-run.
+
+    The raw append and the in-place update are raised to the caller when
+    they fail; email failures are logged and treated as delivered. Emails
+    are still attempted when the update fails.
+
+    Every stage runs within `deadline` (by default a fresh
+    `lead_delivery_deadline_s` budget) and gets whatever is left of it; a
+    stage that runs out counts as failed.
+    """
+    lead_id = record["lead_id"]
+    if deadline is None:
+        deadline = Deadline(get_settings().lead_delivery_deadline_s)
+
+    # One "lead_delivery" JSON log line per attempt with the stage breakdown
+    timings = start_timings()
+    timings.fields["lead_id"] = lead_id
+    try:
+        await _deliver_stages(
+            record,
+            openai_service=openai_service,
+            sheets_service=sheets_service,
+            gmail_service=gmail_service,
+            completed=completed,
+            results=results,
+            on_stage_done=on_stage_done,
+            deadline=deadline,
+        )
+    except BaseException as e:
+        timings.log("lead_delivery", outcome="error", error=f"{type(e).__name__}: {e}"[:200])
+        raise
+    timings.log("lead_delivery", outcome="ok")
+
+
+async def _deliver_stages(
+    record: Dict[str, Any],
+    openai_service,
+    sheets_service,
+    gmail_service,
+    completed: Iterable[str],
+    results: Optional[Dict[str, Any]],
+    on_stage_done: Optional[Callable[..., Any]],
+    deadline: Deadline,
+) -> None:
+    """The stages of `deliver_lead`, in order."""
+    lead_id = record["lead_id"]
+    completed = set(completed)
+    results = dict(results or {})
+
+    async def _done(stage: str, result: Any = None) -> None:
+        if on_stage_done is not None:
+            await on_stage_done(stage, result)
+
+    # Step 1: Append the raw row (fatal if it fails — otherwise we lose the lead).
+    # Running out of time here never leaves a written row behind a failure:
+    # the batch writer withdraws a queued row and waits out one in flight
+    if STAGE_SHEETS not in completed:
+        with track_stage(STAGE_SHEETS, timing="sheets"):
+            await deadline.run(sheets_service.append_lead(record["row"]), "Sheets append")
+        await _done(STAGE_SHEETS)
+
+    # Step 2: AI extraction (non-fatal; falls back to a truncated summary)
+    if STAGE_EXTRACTION in completed and STAGE_EXTRACTION in results:
+        extraction = AIExtraction.model_validate(results[STAGE_EXTRACTION])
+    else:
+        with track_stage(STAGE_EXTRACTION, timing="ai") as stage:
+            extraction = await extract_lead(record, openai_service, deadline)
+            if "ai_unavailable" in extraction.confidence_flags:
+                stage.outcome = "fallback"
+            elif "local_extraction" in extraction.confidence_flags:
+                stage.outcome = "local"
+        await _done(STAGE_EXTRACTION, extraction.model_dump(mode="json"))
+
+    # Step 3: Backfill the AI columns of the row appended in step 1
+    update_error: Optional[Exception] = None
+    if STAGE_ENRICHMENT not in completed:
+        try:
+            with track_stage(STAGE_ENRICHMENT, timing="sheets-update") as stage:
+                updated = await deadline.run(
+                    sheets_service.update_lead(lead_id, enrichment_columns(extraction)),
+                    "Sheets update",
+                )
+                if not updated:
+                    stage.outcome = "not_found"
+            if not updated:
+                logger.warning(f"Lead {lead_id} not found in Sheets; AI columns not written")
+            await _done(STAGE_ENRICHMENT)
+        except Exception as e:
+            update_error = e
+
+    # Step 4: Notification + confirmation emails, sent concurrently (non-fatal;
+    # the lead is already in Sheets)
+    notification, confirmation = lead_emails(record, extraction)
+
+    async def _notify() -> None:
+        with track_stage(STAGE_NOTIFICATION, timing="gmail-notify") as stage:
+            try:
+                if not await deadline.run(gmail_service.send_notification(**notification), "notification email"):
+                    stage.outcome = "error"
+            except Exception as e:
+                stage.outcome = "error"
+                logger.exception(f"Email notification failed for {lead_id}: {e}")
+        await _done(STAGE_NOTIFICATION)
+
+    async def _confirm() -> None:
+        with track_stage(STAGE_CONFIRMATION, timing="gmail-confirm") as stage:
+            try:
+                if not await deadline.run(gmail_service.send_lead_confirmation(**confirmation), "confirmation email"):
+                    stage.outcome = "error"
+            except Exception as e:
+                stage.outcome = "error"
+                logger.exception(f"Lead confirmation email failed for {lead_id}: {e}")
+        await _done(STAGE_CONFIRMATION)
+
+    if STAGE_NOTIFICATION not in completed and STAGE_CONFIRMATION not in completed:
+        # Both pending: let the Gmail service send them together (one batch
+        # request or two concurrent sends)
+        start = time.perf_counter()
+        notified = confirmed = False
+        try:
+            notified, confirmed = await deadline.run(
+                gmail_service.send_lead_emails(notification, confirmation),
+                "lead emails",
+            )
+        except Exception as e:
+            logger.exception(f"Lead emails failed for {lead_id}: {e}")
+        elapsed = time.perf_counter() - start
+        observe_stage(STAGE_NOTIFICATION, "ok" if notified else "error", elapsed)
+        observe_stage(STAGE_CONFIRMATION, "ok" if confirmed else "error", elapsed)
+        record_timing("gmail-notify", elapsed)
+        record_timing("gmail-confirm", elapsed)
+        await _done(STAGE_NOTIFICATION)
+        await _done(STAGE_CONFIRMATION)
+    elif STAGE_NOTIFICATION not in completed:
+        await _notify()
+    elif STAGE_CONFIRMATION not in completed:
+        await _confirm()
+
+    if update_error is not None:
+        raise update_error
+
+
+# Enrichment tasks started by the request path (no journal), each with its
+# record and the stages it has completed so far
+_background_tasks: Dict[asyncio.Task, Dict[str, Any]] = {}
+
+
+def start_lead_enrichment(record: Dict[str, Any], openai_service, sheets_service, gmail_service) -> asyncio.Task:
+    """
+    Finish delivering a lead whose raw row is already in Sheets.
+
+    Runs extraction, the in-place row update and the emails as a background
+    task so the request can return after the raw append.
+    """
+    progress: Dict[str, Any] = {"record": record, "completed": [STAGE_SHEETS], "results": {}}
+
+    async def _on_stage_done(stage: str, result: Any = None) -> None:
+        progress["completed"].append(stage)
+        if result is not None:
+            progress["results"][stage] = result
+
+    async def _run() -> None:
+        LEAD_ENRICHMENT_IN_FLIGHT.inc()
+        try:
+            await deliver_lead(
+                record,
+                openai_service=openai_service,
+                sheets_service=sheets_service,
+                gmail_service=gmail_service,
+                completed=[STAGE_SHEETS],
+                on_stage_done=_on_stage_done,
+            )
+        except Exception as e:
+            logger.exception(f"Enrichment failed for {record['lead_id']}; row left as '{STATUS_ENRICHING}': {e}")
+        finally:
+            LEAD_ENRICHMENT_IN_FLIGHT.dec()
+
+    task = asyncio.create_task(_run(), name=f"lead-enrichment-{record['lead_id']}")
+    _background_tasks[task] = progress
+    task.add_done_callback(lambda t: _background_tasks.pop(t, None))
+    return task
+
+
+async def wait_for_lead_enrichment(timeout: float = 20.0, journal: Optional[LeadJournal] = None) -> None:
+    """
+    Wait for background enrichment tasks to finish (called on shutdown).
+
+    Tasks still running after `timeout` are cancelled and their remaining
+    stages are handed to `journal`, so the drainer finishes them after the
+    restart without appending the row again. Without a journal, each
+    unfinished lead is logged with its record.
+    """
+    if not _background_tasks:
+        return
+    _, pending = await asyncio.wait(list(_background_tasks), timeout=max(0.0, timeout))
+    if not pending:
+        return
+    logger.warning("%d lead enrichment task(s) still running after %.1fs; cancelling", len(pending), timeout)
+    unfinished = [_background_tasks[task] for task in pending if task in _background_tasks]
+    for task in pending:
+        task.cancel()
+    await asyncio.wait(pending, timeout=1.0)
+    for progress in unfinished:
+        await _journal_unfinished(progress, journal)
+
+
+async def _journal_unfinished(progress: Dict[str, Any], journal: Optional[LeadJournal]) -> None:
+    """Record an interrupted enrichment so its remaining stages are not lost."""
+    record = {**progress["record"], "completed": list(progress["completed"]), "results": dict(progress["results"])}
+    lead_id = record["lead_id"]
+    if journal is not None:
+        try:
+            await journal.append(record)
+            logger.warning(
+                f"Enrichment of {lead_id} interrupted by shutdown; journaled for the drainer "
+                f"(done: {', '.join(record['completed'])})"
+            )
+            return
+        except Exception as e:
+            logger.exception(f"Unable to journal interrupted enrichment of {lead_id}: {e}")
+    logger.error(
+        f"Enrichment of {lead_id} interrupted by shutdown; row left as '{STATUS_ENRICHING}'. "
+        f"Record: {json.dumps(record, default=str)}"
+    )
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    """HTTP status of a gspread `APIError` or googleapiclient `HttpError`, if any."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_permanent_failure(error: BaseException) -> bool:
+    """
+    True if delivering the same journal entry again cannot succeed: the
+    entry is malformed (missing or invalid fields) or the API rejected its
+    content. Timeouts, open breakers, saturation, 429s and 5xx are transient.
+    """
+    if isinstance(error, (KeyError, TypeError, ValidationError)):
+        return True
+    return _http_status(error) in PERMANENT_HTTP_STATUSES
+
+
+class LeadJournalDrainer:
+    """
+    Background task that replays journaled leads into Sheets and Gmail.
+
+    Each entry goes through every `deliver_lead` stage: raw append, AI
+    extraction, in-place update of the AI columns, then the emails.
+
+    Entries are delivered strictly in journal order with at-least-once
+    semantics: a stage is checkpointed only after it succeeds (the extraction
+    together with its result), and a Sheets failure is retried with
+    exponential backoff until it goes through. A failure that retrying
+    cannot fix (`is_permanent_failure`) moves the entry to the journal's
+    dead-letter file instead, so one bad entry does not block the rest.
+    Fully drained segments are compacted after each pass.
+    """
+
+    def __init__(
+        self,
+        journal: LeadJournal,
+        idle_interval_s: float = 30.0,
+        retry_initial_s: float = 1.0,
+        retry_max_s: float = 60.0,
+    ):
+        self.journal = journal
+        self.idle_interval_s = idle_interval_s
+        self.retry_initial_s = retry_initial_s
+        self.retry_max_s = retry_max_s
+
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.dead_lettered = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="lead-journal-drainer")
+
+    def wake(self) -> None:
+        """Signal that new entries were appended."""
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop after the in-flight stage, waiting at most `timeout` seconds."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        # Not wait_for: it would also wait for the cancelled task to unwind
+        done, _ = await asyncio.wait({self._task}, timeout=max(0.0, timeout))
+        if not done:
+            logger.warning("Lead journal drainer did not stop within %.1fs; cancelling", timeout)
+            self._task.cancel()
+        self._task = None
+
+    async def _sleep(self, seconds: float) -> None:
+        """Sleep until `seconds` pass, new entries arrive, or we are stopping."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _backoff(self, seconds: float) -> None:
+        """Sleep between retries; only interrupted by shutdown."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        logger.info("Lead journal drainer started (%s)", self.journal.directory)
+        while not self._stopping.is_set():
+            try:
+                entries = await asyncio.to_thread(self.journal.pending)
+            except Exception as e:
+                logger.exception(f"Unable to read lead journal: {e}")
+                entries = []
+
+            if not entries:
+                await self._sleep(self.idle_interval_s)
+                continue
+
+            for entry in entries:
+                if not await self._drain_entry(entry):
+                    break
+
+            try:
+                removed = await asyncio.to_thread(self.journal.compact)
+                if removed:
+                    logger.debug("Compacted %d drained journal segment(s)", removed)
+            except Exception as e:
+                logger.exception(f"Lead journal compaction failed: {e}")
+        logger.info("Lead journal drainer stopped")
+
+    async def _drain_entry(self, entry: Dict[str, Any]) -> bool:
+        """Deliver one entry, retrying until it succeeds. Returns False if stopping."""
+        seq = int(entry["seq"])
+        delay = self.retry_initial_s
+
+        async def _checkpoint(stage: str, result: Any = None) -> None:
+            await asyncio.to_thread(self.journal.mark_stage_done, seq, stage, result)
+
+        while not self._stopping.is_set():
+            try:
+                await deliver_lead(
+                    entry,
+                    openai_service=_optional_openai_service(),
+                    sheets_service=get_sheets_service(),
+                    gmail_service=get_gmail_service(),
+                    # Entries journaled by an interrupted enrichment carry the
+                    # stages it had already completed
+                    completed=[*entry.get("completed", []), *self.journal.completed_stages(seq)],
+                    results={**entry.get("results", {}), **self.journal.stage_results(seq)},
+                    on_stage_done=_checkpoint,
+                )
+                await asyncio.to_thread(self.journal.mark_drained, seq)
+                return True
+            except Exception as e:
+                if is_permanent_failure(e):
+                    logger.exception(
+                        f"Journaled lead {entry.get('lead_id')} (seq {seq}) cannot be delivered; moved to dead letters: {e}"
+                    )
+                    await asyncio.to_thread(self.journal.dead_letter, entry, f"{type(e).__name__}: {e}"[:500])
+                    self.dead_lettered += 1
+                    return True
+                logger.exception(
+                    f"Delivery of journaled lead {entry.get('lead_id')} failed; retrying in {delay:.0f}s: {e}"
+                )
+                await self._backoff(delay)
+                delay = min(delay * 2, self.retry_max_s)
+        return False
+
+
+def _optional_openai_service():
+    """The OpenAI service, or None when it is not configured (fallback extraction)."""
+    try:
+        return get_openai_service()
+    except Exception as e:
+        logger.warning(f"OpenAI service unavailable for journaled leads: {e}")
+        return None
+
+
+# Dependency injection helper
+_lead_drainer: Optional[LeadJournalDrainer] = None
+
+
+def get_lead_drainer() -> Optional[LeadJournalDrainer]:
+    """Get the running drainer, or None when the journal is disabled or not started."""
+    return _lead_drainer
+
+
+def start_lead_drainer(journal: LeadJournal) -> LeadJournalDrainer:
+    """Create and start the drainer singleton (called from the app lifespan)."""
+    global _lead_drainer
+    if _lead_drainer is None:
+        _lead_drainer = LeadJournalDrainer(journal)
+        _lead_drainer.start()
+    return _lead_drainer
+
+
+async def stop_lead_drainer(timeout: float = 10.0) -> None:
+    global _lead_drainer
+    if _lead_drainer is not None:
+        await _lead_drainer.stop(timeout=timeout)
+        _lead_drainer = None
@@ -0,0 +1,169 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LeadIndex:
+    """
+    Local lead_id -> sheet row index for O(1) lead lookups.
+
+    The index is rebuilt from a single bulk read of the lead_id column
+    (`rebuild`), kept current as rows are appended (`record_appends`) and
+    considered stale after `reconcile_interval_s`, at which point the owner
+    rebuilds it again. Row values of recently written or read leads are kept
+    in a small LRU so repeat lookups need no Sheets read at all.
+
+    When `snapshot_path` is set the mapping is mirrored to SQLite, so a
+    restarted process can serve lookups before its first bulk read.
+    """
+
+    def __init__(
+        self,
+        sheet_id: str,
+        reconcile_interval_s: float = 300.0,
+        row_cache_size: int = 1000,
+        snapshot_path: str = "",
+    ):
+        self.sheet_id = sheet_id
+        self.reconcile_interval_s = reconcile_interval_s
+        self.row_cache_size = row_cache_size
+        self.snapshot_path = snapshot_path
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._row_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._built_at: Optional[float] = None
+
+        if self.snapshot_path:
+            self._load_snapshot()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    @property
+    def is_stale(self) -> bool:
+        if self._built_at is None:
+            return True
+        return time.monotonic() - self._built_at >= self.reconcile_interval_s
+
+    @property
+    def age_s(self) -> float:
+        """Seconds since the index was last rebuilt (infinite if never)."""
+        if self._built_at is None:
+            return float("inf")
+        return time.monotonic() - self._built_at
+
+    def invalidate(self) -> None:
+        """Mark the index stale (e.g. after rows shifted) so it is rebuilt."""
+        with self._lock:
+            self._built_at = None
+            self._row_cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def rebuild(self, lead_id_column: List[str], header_rows: int = 1) -> None:
+        """Replace the mapping from the full lead_id column (header included)."""
+        rows: Dict[str, int] = {}
+        for offset, lead_id in enumerate(lead_id_column[header_rows:], start=header_rows + 1):
+            if lead_id:
+                rows[lead_id] = offset
+        with self._lock:
+            self._rows = rows
+            self._row_cache.clear()
+            self._built_at = time.monotonic()
+        logger.debug("Lead index rebuilt with %d lead(s)", len(rows))
+        if self.snapshot_path:
+            self._save_snapshot(replace=True, items=rows.items())
+
+    def record_appends(self, first_row: int, rows_data: List[Dict[str, Any]]) -> None:
+        """Index rows just appended starting at sheet row `first_row`."""
+        added: Dict[str, int] = {}
+        with self._lock:
+            for offset, row_data in enumerate(rows_data):
+                lead_id = str(row_data.get("lead_id") or "")
+                if not lead_id:
+                    continue
+                added[lead_id] = first_row + offset
+                self._rows[lead_id] = first_row + offset
+                self._cache_locked(lead_id, row_data)
+        if self.snapshot_path and added:
+            self._save_snapshot(replace=False, items=added.items())
+
+    def cache_row(self, lead_id: str, row_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache_locked(lead_id, row_data)
+
+    def _cache_locked(self, lead_id: str, row_data: Dict[str, Any]) -> None:
+        self._row_cache[lead_id] = {k: str(v) for k, v in row_data.items()}
+        self._row_cache.move_to_end(lead_id)
+        while len(self._row_cache) > self.row_cache_size:
+            self._row_cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_row(self, lead_id: str) -> Optional[int]:
+        return self._rows.get(lead_id)
+
+    def get_cached(self, lead_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row_data = self._row_cache.get(lead_id)
+            if row_data is not None:
+                self._row_cache.move_to_end(lead_id)
+                return dict(row_data)
+            return None
+
+    # ------------------------------------------------------------------
+    # SQLite snapshot
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.snapshot_path, timeout=5.0)
+        conn.execute("CREATE TABLE IF NOT EXISTS lead_rows (lead_id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        return conn
+
+    def _load_snapshot(self) -> None:
+        try:
+            conn = self._connect()
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+                if meta.get("sheet_id") != self.sheet_id:
+                    return
+                rows = dict(conn.execute("SELECT lead_id, row FROM lead_rows").fetchall())
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning("Unable to load lead index snapshot %s: %s", self.snapshot_path, e)
+            return
+        with self._lock:
+            self._rows = rows
+            # Trusted until the next reconcile; lookups still verify the row they read
+            self._built_at = time.monotonic()
+        logger.info("Loaded %d lead(s) from index snapshot", len(rows))
+
+    def _save_snapshot(self, replace: bool, items: Iterable) -> None:
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    if replace:
+                        conn.execute("DELETE FROM lead_rows")
+                    conn.executemany("INSERT OR REPLACE INTO lead_rows (lead_id, row) VALUES (?, ?)", list(items))
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sheet_id', ?)", (self.sheet_id,))
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning("Unable to save lead index snapshot %s: %s", self.snapshot_path, e)
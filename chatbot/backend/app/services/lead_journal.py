@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+
+def _fsync_dir(path: Path) -> None:
+    """Flush a directory entry so renames/creates survive a crash."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class LeadJournal:
+    """
+    Append-only, fsync'd on-disk journal of accepted leads.
+
+    Every entry is a single JSON line in a segment file named after the
+    sequence number of its first entry. A new segment is started on every
+    process start (so a torn tail from a crash is never appended to) and
+    whenever the active segment grows past `segment_max_bytes`.
+
+    Drain progress is kept in `checkpoint.json`, which is replaced atomically:
+    `drained_seq` is the highest entry that has been fully delivered, and
+    `current` records the stages already completed for the entry after it
+    (and any results they produced), so a restart resumes without redoing
+    them.
+
+    Entries that can never be delivered are copied to `dead-letter.jsonl`
+    (with the error) and then counted as drained, so they do not hold up the
+    entries behind them.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+
+        self._lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+        self._next_seq = max(self._last_journaled_seq(), self.drained_seq) + 1
+        self._active_file = None
+        self._active_size = 0
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def _segment_paths(self) -> List[Path]:
+        """Return segment files ordered by their first sequence number."""
+        return sorted(
+            p for p in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}") if p.is_file()
+        )
+
+    @staticmethod
+    def _read_segment(path: Path) -> List[Dict[str, Any]]:
+        """Read all intact entries from a segment, skipping a torn final line."""
+        entries: List[Dict[str, Any]] = []
+        with path.open("r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping unreadable journal line %s:%d", path.name, line_no)
+        return entries
+
+    def _last_journaled_seq(self) -> int:
+        for path in reversed(self._segment_paths()):
+            entries = self._read_segment(path)
+            if entries:
+                return int(entries[-1]["seq"])
+        return 0
+
+    def _open_segment(self, first_seq: int) -> None:
+        if self._active_file is not None:
+            self._active_file.close()
+        path = self.directory / f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}"
+        self._active_file = path.open("ab")
+        self._active_size = 0
+        _fsync_dir(self.directory)
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        path = self.directory / CHECKPOINT_FILE
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return {
+                "drained_seq": int(data.get("drained_seq", 0)),
+                "current": data.get("current") or {},
+            }
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Unreadable journal checkpoint %s (%s); replaying all entries", path, e)
+        return {"drained_seq": 0, "current": {}}
+
+    def _write_checkpoint(self) -> None:
+        path = self.directory / CHECKPOINT_FILE
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self._checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+    @property
+    def drained_seq(self) -> int:
+        return self._checkpoint["drained_seq"]
+
+    def completed_stages(self, seq: int) -> List[str]:
+        """Stages already delivered for `seq` (only tracked for the head entry)."""
+        current = self._checkpoint.get("current") or {}
+        if current.get("seq") == seq:
+            return list(current.get("stages", []))
+        return []
+
+    def stage_results(self, seq: int) -> Dict[str, Any]:
+        """Results recorded with completed stages of `seq` (e.g. the AI extraction)."""
+        current = self._checkpoint.get("current") or {}
+        if current.get("seq") == seq:
+            return dict(current.get("results", {}))
+        return {}
+
+    def mark_stage_done(self, seq: int, stage: str, result: Any = None) -> None:
+        with self._lock:
+            stages = self.completed_stages(seq)
+            if stage not in stages:
+                stages.append(stage)
+            results = self.stage_results(seq)
+            if result is not None:
+                results[stage] = result
+            self._checkpoint["current"] = {"seq": seq, "stages": stages, "results": results}
+            self._write_checkpoint()
+
+    def mark_drained(self, seq: int) -> None:
+        with self._lock:
+            if seq <= self._checkpoint["drained_seq"]:
+                return
+            self._checkpoint = {"drained_seq": seq, "current": {}}
+            self._write_checkpoint()
+
+    def dead_letter(self, entry: Dict[str, Any], error: str) -> None:
+        """
+        Set an undeliverable entry aside and advance the checkpoint past it.
+
+        The entry is fsync'd to the dead-letter file before the checkpoint
+        moves, so a crash in between only dead-letters it twice.
+        """
+        with self._lock:
+            record = {
+                **entry,
+                "error": error,
+                "dead_lettered_at": datetime.now(timezone.utc).isoformat(),
+            }
+            path = self.directory / DEAD_LETTER_FILE
+            with path.open("ab") as f:
+                f.write((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_dir(self.directory)
+
+            seq = int(entry["seq"])
+            if seq > self._checkpoint["drained_seq"]:
+                self._checkpoint = {"drained_seq": seq, "current": {}}
+                self._write_checkpoint()
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """Entries set aside by `dead_letter`, oldest first."""
+        path = self.directory / DEAD_LETTER_FILE
+        if not path.exists():
+            return []
+        return self._read_segment(path)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _append_sync(self, record: Dict[str, Any]) -> int:
+        """Durably append a record; returns its sequence number."""
+        with self._lock:
+            seq = self._next_seq
+            line = (json.dumps({**record, "seq": seq}, separators=(",", ":")) + "\n").encode("utf-8")
+
+            if self._active_file is None or (
+                self._active_size and self._active_size + len(line) > self.segment_max_bytes
+            ):
+                self._open_segment(seq)
+
+            self._active_file.write(line)
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+
+            self._active_size += len(line)
+            self._next_seq = seq + 1
+            return seq
+
+    async def append(self, record: Dict[str, Any]) -> int:
+        """
+        Append a lead record to the journal.
+
+        Returns only after the entry has been fsync'd to disk.
+        """
+        return await asyncio.to_thread(self._append_sync, record)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Return every journaled entry that has not been drained yet, in order."""
+        with self._lock:
+            drained = self.drained_seq
+            entries: List[Dict[str, Any]] = []
+            for path in self._segment_paths():
+                entries.extend(e for e in self._read_segment(path) if int(e["seq"]) > drained)
+            return entries
+
+    def compact(self) -> int:
+        """Delete segments whose entries have all been drained; returns how many."""
+        with self._lock:
+            drained = self.drained_seq
+            active_name = Path(self._active_file.name).name if self._active_file else None
+            removed = 0
+            for path in self._segment_paths():
+                if path.name == active_name:
+                    continue
+                entries = self._read_segment(path)
+                if entries and int(entries[-1]["seq"]) > drained:
+                    continue
+                path.unlink(missing_ok=True)
+                removed += 1
+            if removed:
+                _fsync_dir(self.directory)
+            return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.close()
+                self._active_file = None
+
+
+# Dependency injection helper
+_lead_journal: Optional[LeadJournal] = None
+
+
+def get_lead_journal() -> Optional[LeadJournal]:
+    """Get or create the lead journal singleton (None when LEAD_JOURNAL_DIR is unset)."""
+    global _lead_journal
+    if _lead_journal is None:
+        settings = get_settings()
+        directory = (settings.lead_journal_dir or "").strip()
+        if not directory:
+            return None
+        _lead_journal = LeadJournal(
+            directory=directory,
+            segment_max_bytes=settings.lead_journal_segment_max_bytes,
+        )
+    return _lead_journal
@@ -0,0 +1,418 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from app.models.schemas import AIExtraction, BudgetSensitivity, CompanyType, PriorityBand
+
+# ----------------------------------------------------------------------
+# Vocabulary
+# ----------------------------------------------------------------------
+
+US_STATES: Dict[str, str] = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "FL": "Florida", "GA": "Georgia",
+    "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois", "IN": "Indiana", "IA": "Iowa",
+    "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana", "ME": "Maine", "MD": "Maryland",
+    "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota", "MS": "Mississippi", "MO": "Missouri",
+    "MT": "Montana", "NE": "Nebraska", "NV": "Nevada", "NH": "New Hampshire", "NJ": "New Jersey",
+    "NM": "New Mexico", "NY": "New York", "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio",
+    "OK": "Oklahoma", "OR": "Oregon", "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina",
+    "SD": "South Dakota", "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont",
+    "VA": "Virginia", "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+    "DC": "District of Columbia",
+}
+
+# Abbreviations that are also common English words or other abbreviations
+# ("IN", "OR", "LA" = Los Angeles, "CO" = company); only counted when an
+# unambiguous state is mentioned too
+AMBIGUOUS_STATE_CODES = {"AL", "CO", "DE", "HI", "ID", "IN", "LA", "ME", "OH", "OK", "OR"}
+
+# Case-sensitive where an acronym would otherwise match an ordinary word
+# ("CR", "EU"); (?i:...) marks the parts that are not.
+
+# (label, pattern, family). A generic label is dropped when a more specific
+# label of the same family matched ("jars" vs "child resistant jars").
+PRODUCT_PATTERNS: List[Tuple[str, str, str]] = [
+    ("child resistant jars", r"(?:child[\s-]*resistant|\bCR)\s+(?:glass\s+|plastic\s+|screw[\s-]*top\s+)?jars?\b", "jar"),
+    ("glass jars", r"\bglass\s+jars?\b", "jar"),
+    ("jars", r"\bjars?\b", "jar*"),
+    ("dropper bottles", r"\bdroppers?(?:\s+bottles?)?\b", "bottle"),
+    ("tincture bottles", r"\btincture\s+bottles?\b", "bottle"),
+    ("pump bottles", r"\b(?:airless\s+)?pump\s+bottles?\b|\bairless\s+pumps?\b", "bottle"),
+    ("spray bottles", r"\b(?:spray|mist(?:er)?)\s+bottles?\b", "bottle"),
+    ("pill bottles", r"\b(?:pill|capsule|supplement|vitamin)\s+bottles?\b", "bottle"),
+    ("bottles", r"\bbottles?\b", "bottle*"),
+    ("mylar bags", r"\bmylar(?:\s+bags?|\s+pouch(?:es)?)?\b", "pouch"),
+    ("pouches", r"\bpouch(?:es)?\b|\b(?:stand[\s-]*up|zip(?:per|lock)?|smell[\s-]*proof|exit)\s+bags?\b", "pouch*"),
+    ("pre-roll tubes", r"\b(?:pre[\s-]*roll|doob|joint)\s+tubes?\b", "tube"),
+    ("tubes", r"\btubes?\b", "tube*"),
+    ("vape cartridges", r"\b(?:vape\s+)?cart(?:ridge)?s?\b|\bvape\s+(?:pens?|packaging)\b", "vape"),
+    ("concentrate containers", r"\b(?:concentrate|wax|dab)\s+(?:containers?|jars?)\b", "concentrate"),
+    ("tins", r"\btins?\b", "tin"),
+    ("vials", r"\bvials?\b", "vial"),
+    ("tubs", r"\btubs?\b", "tub"),
+    ("closures", r"\b(?:caps?|closures?|lids?)\b", "closure"),
+    ("labels", r"\blabels?\b", "label"),
+    ("boxes", r"\b(?:boxes|cartons?|folding\s+cartons?)\b", "box"),
+    ("blister packs", r"\bblister(?:\s+packs?)?\b", "blister"),
+    ("stick packs", r"\bstick\s+packs?\b|\bsachets?\b", "sachet"),
+]
+
+USE_PATTERNS: List[Tuple[str, str]] = [
+    ("gummies", r"\bgumm(?:y|ies)\b"),
+    ("edibles", r"\bedibles?\b|\bchocolates?\b"),
+    ("flower", r"\bflower\b|\bbuds?\b"),
+    ("pre-rolls", r"\bpre[\s-]*rolls?\b"),
+    ("concentrates", r"\bconcentrates?\b|\bwax\b|\brosin\b|\bdabs?\b"),
+    ("vapes", r"\bvapes?\b|\bcart(?:ridge)?s\b"),
+    ("tinctures", r"\btinctures?\b|\boils?\b"),
+    ("capsules", r"\bcapsules?\b|\bsoftgels?\b|\btablets?\b|\bpills?\b"),
+    ("supplements", r"\bsupplements?\b|\bvitamins?\b|\bnutraceuticals?\b|\bprotein\s+powder\b"),
+    ("topicals", r"\btopicals?\b|\bbalms?\b|\bsalves?\b|\blotions?\b|\bcreams?\b"),
+    ("cosmetics", r"\bcosmetics?\b|\bskin\s*care\b|\bserums?\b|\bbeauty\b"),
+    ("beverages", r"\bbeverages?\b|\bdrinks?\b|\bshots?\b"),
+]
+
+DOMAIN_PATTERNS: List[Tuple[str, str]] = [
+    ("cannabis", r"\bcannabis\b|\bmarijuana\b|\bdispensar(?:y|ies)\b|\bTHC\b"),
+    ("CBD", r"\bCBD\b|\bhemp\b"),
+]
+
+REGULATORY_PATTERNS: List[Tuple[str, str]] = [
+    ("child resistant", r"(?i:\bchild[\s-]*resistant\b)|\bCR\b|\bPPPA\b|16\s*CFR\s*1700"),
+    ("ASTM certified", r"\bASTM\b"),
+    ("FDA compliant", r"\bFDA\b|(?i:\bfood[\s-]*(?:grade|safe)\b)"),
+    ("tamper evident", r"(?i:\btamper[\s-]*(?:evident|proof)\b)"),
+    ("state compliant", r"(?i:\b(?:state|METRC)[\s-]*compliant\b|\bcompliance\b|\bcompliant\b)"),
+    ("opaque", r"(?i:\bopaque\b|\bUV[\s-]*(?:protect\w*|resistant)\b)"),
+]
+
+NATIONWIDE = re.compile(
+    r"\bnation[\s-]*wide\b|\bnational(?:ly)?\b|\ball\s+50\s+states\b|\bacross\s+the\s+(?:US|U\.S\.|country)\b|\bcoast\s+to\s+coast\b",
+    re.IGNORECASE,
+)
+INTERNATIONAL_MARKETS: List[Tuple[str, str]] = [
+    ("Canada", r"(?i:\bcanad(?:a|ian)\b)"),
+    ("Europe", r"(?i:\beurope(?:an)?\b)|\bEU\b"),
+    ("international", r"(?i:\binternational(?:ly)?\b|\bworldwide\b|\bglobal(?:ly)?\b)"),
+]
+
+TIMELINE = re.compile(
+    r"\bASAP\b|\burgent(?:ly)?\b|\bright\s+away\b|\bimmediately\b|\bthis\s+(?:week|month|quarter)\b"
+    r"|\bnext\s+(?:week|month|quarter|year)\b"
+    r"|\b(?:within|in)\s+(?:the\s+next\s+)?(?:\d+|a\s+few|a\s+couple(?:\s+of)?|one|two|three|four|six)\s+(?:days?|weeks?|months?)\b"
+    r"|\bby\s+(?:the\s+end\s+of\s+)?(?:Q[1-4]|january|february|march|april|may|june|july|august|september|october|november|december|summer|fall|spring|winter|year[\s-]*end)\b"
+    r"|\bQ[1-4](?:\s+20\d\d)?\b",
+    re.IGNORECASE,
+)
+URGENT = re.compile(r"\bASAP\b|\burgent|\bright\s+away\b|\bimmediately\b|\bthis\s+week\b", re.IGNORECASE)
+EARLY_STAGE = re.compile(
+    r"\bjust\s+(?:researching|exploring|looking|browsing|curious)\b|\bearly\s+stages?\b"
+    r"|\bno\s+rush\b|\bsamples?\s+only\b|\bpricing\s+for\s+(?:the\s+)?future\b|\bnot\s+(?:sure|ready)\b",
+    re.IGNORECASE,
+)
+
+SUSTAINABILITY = re.compile(
+    r"\bsustainab\w*|\beco[\s-]*friendly\b|\brecycl\w*|\bcompostable\b|\bbiodegradable\b|\bPCR\b"
+    r"|\bocean[\s-]*(?:bound\s+)?plastic\b|\bplant[\s-]*based\b|\bhemp[\s-]*(?:based\s+)?plastic\b|\bgreen(?:er)?\s+(?:packaging|options?)\b",
+    re.IGNORECASE,
+)
+FACTORY_DIRECT = re.compile(
+    r"\bfactory[\s-]*direct\b|\bdirect\s+from\s+(?:the\s+)?factory\b|\bcustom\s+(?:molds?|moulds?|tooling|manufactur\w*)\b"
+    r"|\bprivate\s+molds?\b|\boverseas\s+(?:production|manufactur\w*)\b",
+    re.IGNORECASE,
+)
+BUDGET_LOW = re.compile(
+    r"\bcheap(?:est)?\b|\blowest\s+(?:price|cost)\b|\btight\s+budget\b|\bon\s+a\s+budget\b|\bcost[\s-]*effective\b"
+    r"|\baffordable\b|\bbest\s+price\b|\bprice\s+is\s+(?:key|important|the\s+main)\b",
+    re.IGNORECASE,
+)
+BUDGET_HIGH = re.compile(
+    r"\bpremium\b|\bluxury\b|\bhigh[\s-]*end\b|\bquality\s+(?:is|over)\b|\bprice\s+(?:isn'?t|is\s+not)\b|\bbudget\s+(?:isn'?t|is\s+not)\b",
+    re.IGNORECASE,
+)
+
+# "50k/month", "20,000 jars per month", "1.5 million units a year", "5k monthly"
+_NUMBER = r"(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)"
+_MULTIPLIER = r"\s*(k|m|mm|thousand|million)?\b"
+_ITEM = (
+    r"(?:\s+(?:\w+\s+){0,2}?(?:units?|pcs|pieces|jars?|bottles?|pouch(?:es)?|bags?|tubes?|containers?|items?"
+    r"|ct|count|packs?|vials?|tins?|cart(?:ridge)?s?|droppers?|boxes|labels?))?"
+)
+_PERIOD = r"\s*(?:/|per|a|an|each|every)\s*(month|mo|week|wk|year|yr|quarter|qtr)\b|\s+(monthly|weekly|annually|yearly|quarterly)\b"
+VOLUME = re.compile(_NUMBER + _MULTIPLIER + _ITEM + r"(?:" + _PERIOD + r")", re.IGNORECASE)
+VOLUME_LEADING = re.compile(
+    r"\b(?:monthly|per\s+month|a\s+month)\s+(?:volume|usage|need|order|run)s?\s*(?:of|is|are|:|around|about|~|roughly|approx\.?)?\s*"
+    + _NUMBER + _MULTIPLIER,
+    re.IGNORECASE,
+)
+_SIZE_UNIT = r"\s*(?:oz|ounces?|ml|mL|dram|dr|g|grams?|cc)\b"
+SIZE = re.compile(r"\b\d+(?:\.\d+)?" + _SIZE_UNIT, re.IGNORECASE)
+# A size unit right after a number: the number is a package size, not a count
+SIZE_UNIT = re.compile(_SIZE_UNIT, re.IGNORECASE)
+
+# Signs that a note needs a human-quality reading (the LLM) even if it is short
+HEDGES = re.compile(
+    r"\?|\bmaybe\b|\bnot\s+sure\b|\bunsure\b|\beither\b|\bor\s+(?:maybe|possibly)\b|\bdepend(?:s|ing)\b"
+    r"|\binstead\s+of\b|\bdon'?t\s+(?:need|want)\b|\bno\s+longer\b|\bswitch(?:ing)?\s+from\b|\bnot\s+\w+\s+but\b",
+    re.IGNORECASE,
+)
+
+ROLE_COMPANY_TYPES: List[Tuple[str, CompanyType]] = [
+    (r"\bMSO\b|multi[\s-]*state", CompanyType.MSO),
+    (r"single[\s-]*state|\bSSO\b", CompanyType.SINGLE_STATE_OPERATOR),
+    (r"distributor|wholesal", CompanyType.DISTRIBUTOR),
+    (r"\bbrand\b|\bCPG\b", CompanyType.BRAND_CPG),
+    (r"manufacturer|co[\s-]*packer|retailer|\bother\b", CompanyType.OTHER),
+]
+
+_PERIOD_TO_MONTHLY = {
+    "month": 1.0, "mo": 1.0, "monthly": 1.0,
+    "week": 52.0 / 12.0, "wk": 52.0 / 12.0, "weekly": 52.0 / 12.0,
+    "year": 1.0 / 12.0, "yr": 1.0 / 12.0, "annually": 1.0 / 12.0, "yearly": 1.0 / 12.0,
+    "quarter": 1.0 / 3.0, "qtr": 1.0 / 3.0, "quarterly": 1.0 / 3.0,
+}
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6}
+
+
+def _compile(patterns: List[Tuple[str, str]], flags: int = re.IGNORECASE) -> List[Tuple[str, Pattern]]:
+    return [(label, re.compile(pattern, flags)) for label, pattern in patterns]
+
+
+_PRODUCTS = [(label, re.compile(pattern, re.IGNORECASE), family) for label, pattern, family in PRODUCT_PATTERNS]
+_USES = _compile(USE_PATTERNS)
+_DOMAINS = _compile(DOMAIN_PATTERNS)
+_REGULATORY = _compile(REGULATORY_PATTERNS, flags=0)
+_INTERNATIONAL = _compile(INTERNATIONAL_MARKETS, flags=0)
+_ROLES = [(re.compile(pattern, re.IGNORECASE), company_type) for pattern, company_type in ROLE_COMPANY_TYPES]
+_STATE_NAMES = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(name) for name in US_STATES.values()), key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+_STATE_CODES = re.compile(r"(?<![A-Za-z0-9.])(" + "|".join(US_STATES) + r")(?![A-Za-z0-9])")
+_STATE_BY_NAME = {name.casefold(): name for name in US_STATES.values()}
+
+# Priority thresholds (monthly units)
+HIGH_PRIORITY_VOLUME = 25_000
+LOW_PRIORITY_VOLUME = 2_000
+
+
+# ----------------------------------------------------------------------
+# Field extractors
+# ----------------------------------------------------------------------
+
+
+def find_products(text: str) -> List[str]:
+    matched: List[Tuple[int, str, str]] = []
+    for label, pattern, family in _PRODUCTS:
+        match = pattern.search(text)
+        if match:
+            matched.append((match.start(), label, family))
+    specific_families = {family for _, _, family in matched if not family.endswith("*")}
+    matched = [m for m in matched if not (m[2].endswith("*") and m[2][:-1] in specific_families)]
+    return [label for _, label, _ in sorted(matched)]
+
+
+def find_markets(text: str) -> List[str]:
+    found: List[Tuple[int, str]] = []
+    seen = set()
+
+    def _add(position: int, name: str) -> None:
+        if name not in seen:
+            seen.add(name)
+            found.append((position, name))
+
+    for match in _STATE_NAMES.finditer(text):
+        _add(match.start(), _STATE_BY_NAME[match.group(1).casefold()])
+    ambiguous = []
+    for match in _STATE_CODES.finditer(text):
+        code = match.group(1)
+        if code in AMBIGUOUS_STATE_CODES:
+            ambiguous.append((match.start(), US_STATES[code]))
+        else:
+            _add(match.start(), US_STATES[code])
+    if found:
+        for position, name in ambiguous:
+            _add(position, name)
+
+    match = NATIONWIDE.search(text)
+    if match:
+        _add(match.start(), "nationwide")
+    for label, pattern in _INTERNATIONAL:
+        match = pattern.search(text)
+        if match:
+            _add(match.start(), label)
+    return [name for _, name in sorted(found)]
+
+
+def find_monthly_volumes(text: str) -> List[int]:
+    """
+    Every volume with a period, converted to units per month.
+
+    A number that is a package size ("10 oz jars a month") is not a volume;
+    the search resumes right after it.
+    """
+    volumes = []
+    position = 0
+    while True:
+        match = VOLUME.search(text, position)
+        if match is None:
+            break
+        if SIZE_UNIT.match(text, match.end(1)):
+            position = match.end(1)
+            continue
+        number, multiplier, period, period_word = match.groups()
+        volumes.append(_to_monthly(number, multiplier, period or period_word))
+        position = match.end()
+    for match in VOLUME_LEADING.finditer(text):
+        number, multiplier = match.groups()
+        volumes.append(_to_monthly(number, multiplier, "month"))
+    return [v for v in volumes if v > 0]
+
+
+def _to_monthly(number: str, multiplier: Optional[str], period: str) -> int:
+    value = float(number.replace(",", ""))
+    value *= _MULTIPLIERS.get((multiplier or "").lower(), 1.0)
+    value *= _PERIOD_TO_MONTHLY[period.lower()]
+    return int(round(value))
+
+
+def find_intended_use(text: str) -> Optional[str]:
+    uses = [label for label, pattern in _USES if pattern.search(text)]
+    domains = [label for label, pattern in _DOMAINS if pattern.search(text)]
+    if not uses:
+        return f"{domains[0]} products" if domains else None
+    prefix = f"{domains[0]} " if domains else ""
+    return prefix + ", ".join(uses)
+
+
+def find_company_type(text: str, role: Optional[str]) -> CompanyType:
+    for source in (role or "", text):
+        for pattern, company_type in _ROLES:
+            if pattern.search(source):
+                # Free text only counts for the unambiguous operator types
+                if source is text and company_type not in (CompanyType.MSO, CompanyType.SINGLE_STATE_OPERATOR):
+                    continue
+                return company_type
+    return CompanyType.UNKNOWN
+
+
+def find_budget_sensitivity(text: str) -> BudgetSensitivity:
+    low = bool(BUDGET_LOW.search(text))
+    high = bool(BUDGET_HIGH.search(text))
+    if low and high:
+        return BudgetSensitivity.MEDIUM
+    if low:
+        return BudgetSensitivity.LOW
+    if high:
+        return BudgetSensitivity.HIGH
+    return BudgetSensitivity.UNKNOWN
+
+
+# ----------------------------------------------------------------------
+# Public API
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class LocalExtractionResult:
+    """An `AIExtraction` built without the LLM, and whether it can stand in for one."""
+
+    extraction: AIExtraction
+    unambiguous: bool
+
+
+def _summary(extraction: AIExtraction, company_type_label: str) -> str:
+    subject = company_type_label or "Lead"
+    products = ", ".join(extraction.product_types) or "packaging"
+    parts = [f"{subject} looking for {products}"]
+    if extraction.intended_use:
+        parts.append(f"for {extraction.intended_use}")
+    states = [market for market in extraction.markets if market != "nationwide"]
+    if states:
+        parts.append(f"in {', '.join(states)}")
+    if "nationwide" in extraction.markets:
+        parts.append("nationwide")
+    sentence = " ".join(parts)
+    if extraction.estimated_monthly_volume:
+        sentence += f", about {extraction.estimated_monthly_volume:,} units/month"
+    sentences = [sentence + "."]
+    if extraction.timeline:
+        sentences.append(f"Timeline: {extraction.timeline}.")
+    if extraction.regulatory_needs:
+        sentences.append(f"Needs: {extraction.regulatory_needs}.")
+    return " ".join(sentences)
+
+
+_COMPANY_TYPE_LABELS = {
+    CompanyType.MSO: "Multi-state operator",
+    CompanyType.SINGLE_STATE_OPERATOR: "Single-state operator",
+    CompanyType.BRAND_CPG: "Brand",
+    CompanyType.DISTRIBUTOR: "Distributor",
+}
+
+
+def extract_locally(freeform_note: str, role: Optional[str] = None, max_unambiguous_chars: int = 280) -> LocalExtractionResult:
+    """
+    Fill `AIExtraction` fields from the note with compiled regexes and keyword lists.
+
+    Runs in well under a millisecond. The result is marked `unambiguous`
+    when the note is at most `max_unambiguous_chars` long, names at least one
+    product, one market and exactly one monthly volume, and contains no
+    hedging or negation ("maybe", "instead of", questions) that a keyword
+    match would misread.
+    """
+    text = freeform_note
+    products = find_products(text)
+    markets = find_markets(text)
+    volumes = find_monthly_volumes(text)
+    volume = max(volumes) if volumes else None
+    timeline_match = TIMELINE.search(text)
+    timeline = timeline_match.group(0) if timeline_match else None
+    regulatory = [label for label, pattern in _REGULATORY if pattern.search(text)]
+    company_type = find_company_type(text, role)
+
+    if (volume is not None and volume >= HIGH_PRIORITY_VOLUME) or (URGENT.search(text) and products):
+        priority = PriorityBand.HIGH
+    elif EARLY_STAGE.search(text) or (volume is not None and volume < LOW_PRIORITY_VOLUME):
+        priority = PriorityBand.LOW
+    else:
+        priority = PriorityBand.MEDIUM
+
+    flags = ["local_extraction"]
+    if not products:
+        flags.append("products_unclear")
+    if volume is None:
+        flags.append("volume_not_stated")
+    elif len(set(volumes)) > 1:
+        flags.append("multiple_volumes")
+    if not markets:
+        flags.append("markets_not_stated")
+
+    sizes = sorted({" ".join(m.group(0).split()) for m in SIZE.finditer(text)})
+    extraction = AIExtraction(
+        product_types=products,
+        intended_use=find_intended_use(text),
+        markets=markets,
+        regulatory_needs=", ".join(regulatory) or None,
+        estimated_monthly_volume=volume,
+        timeline=timeline,
+        budget_sensitivity=find_budget_sensitivity(text),
+        sustainability_interest=True if SUSTAINABILITY.search(text) else None,
+        factory_direct_interest=True if FACTORY_DIRECT.search(text) else None,
+        company_type=company_type,
+        priority_band=priority,
+        misc_notes=f"Sizes mentioned: {', '.join(sizes)}." if sizes else "",
+        confidence_flags=flags,
+    )
+    extraction.ai_summary = _summary(extraction, _COMPANY_TYPE_LABELS.get(company_type, ""))
+
+    unambiguous = (
+        len(text) <= max_unambiguous_chars
+        and bool(products)
+        and bool(markets)
+        and volume is not None
+        and len(set(volumes)) == 1
+        and not HEDGES.search(text)
+    )
+    return LocalExtractionResult(extraction=extraction, unambiguous=unambiguous)
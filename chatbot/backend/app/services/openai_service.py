@@ -1,11 +1,25 @@
+import asyncio
+import hashlib
+import io
 import json
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
+import tempfile
+import threading
+from typing import IO, TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
 
+from app.cache import SingleFlightCache
+from app.circuit_breaker import get_circuit_breaker
+from app.concurrency import PRIORITY_LEAD, PRIORITY_TRANSCRIPTION, AdaptiveLimiter
+from app.hedging import Hedger
+from app.metrics import track_call
+from app.services.local_extractor import extract_locally
 from app.config import get_settings
 from app.models.schemas import AIExtraction, BudgetSensitivity, CompanyType, PriorityBand
 
+if TYPE_CHECKING:
+    # Imported on first use instead: it pulls in numpy
+    from app.services.audio_preprocessing import PreprocessedAudio
+
 logger = logging.getLogger(__name__)
 
 # JSON schema for structured output
@@ -84,6 +98,17 @@ EXTRACTION_SCHEMA = {
     "additionalProperties": False
 }
 
+# Bump whenever EXTRACTION_PROMPT or EXTRACTION_SCHEMA changes so cached extractions are not reused
+EXTRACTION_PROMPT_VERSION = "1"
+
+TRANSCRIPTION_MODEL = "whisper-1"
+
+# Audio is hashed in chunks so spooled uploads are never read into memory whole
+HASH_CHUNK_BYTES = 64 * 1024
+# Uploads copied for a transcription stay in memory up to this size, then
+# move to disk (the same threshold Starlette spools uploads with)
+AUDIO_SPOOL_MAX_BYTES = 1024 * 1024
+
 EXTRACTION_PROMPT = """You are an AI assistant for eBottles, a packaging company specializing in bottles, jars, containers, and flexible packaging for regulated and wellness markets (cannabis, CBD, nutraceuticals, supplements, cosmetics, and consumer packaged goods).
 
 Analyze the following lead intake form submission and extract structured information. Be accurate and conservative - if something is not mentioned or unclear, use null or "unknown" rather than guessing.
@@ -101,17 +126,132 @@ Extract the structured data according to the schema. For the AI summary, write 2
 class OpenAIService:
     """Service for OpenAI API interactions."""
     
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        timeout_s: float = 30.0,
+        max_retries: int = 0,
+        extraction_cache_size: int = 512,
+        extraction_cache_ttl_s: float = 3600.0,
+        extraction_cache_max_bytes: int = 2 * 1024 * 1024,
+        preprocess_wav: bool = True,
+        preprocess_max_bytes: int = 4 * 1024 * 1024,
+        audio_segment_max_s: float = 30.0,
+        audio_segment_concurrency: int = 4,
+        transcription_cache_size: int = 256,
+        transcription_cache_ttl_s: float = 3600.0,
+        transcription_cache_max_bytes: int = 1024 * 1024,
+        local_fast_path: bool = False,
+        local_fast_path_max_chars: int = 280,
+        hedge_requests: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay_s: float = 0.5,
+        concurrency_initial: int = 8,
+        concurrency_min: int = 1,
+        concurrency_max: int = 64,
+        concurrency_backoff: float = 0.5,
+        concurrency_max_queue: int = 100,
+    ):
+        # The openai package is the single largest import in the app (about
+        # half of start-up), so it is only loaded once the service is built
+        from openai import AsyncOpenAI
+
+        # The SDK retries twice by default, so a timed-out call could take
+        # about three times timeout_s before deadlines, hedging or the
+        # breaker saw it
+        self.client = AsyncOpenAI(api_key=api_key, timeout=timeout_s, max_retries=max_retries)
         self.model = model
-    
+        self.timeout_s = timeout_s
+        self.local_fast_path = local_fast_path
+        self.local_fast_path_max_chars = local_fast_path_max_chars
+        self.preprocess_wav = preprocess_wav
+        self.preprocess_max_bytes = preprocess_max_bytes
+        self.audio_segment_max_s = audio_segment_max_s
+        self.audio_segment_concurrency = max(1, audio_segment_concurrency)
+        self.extraction_cache = SingleFlightCache(
+            "extraction",
+            max_entries=extraction_cache_size,
+            ttl_s=extraction_cache_ttl_s,
+            max_bytes=extraction_cache_max_bytes,
+            sizeof=lambda extraction: len(extraction.model_dump_json()),
+        )
+        self.transcription_cache = SingleFlightCache(
+            "transcription",
+            max_entries=transcription_cache_size,
+            ttl_s=transcription_cache_ttl_s,
+            max_bytes=transcription_cache_max_bytes,
+            sizeof=lambda text: len(text.encode("utf-8")),
+        )
+        # While open, extraction fails fast into the rule-based fallback
+        self.breaker = get_circuit_breaker("openai")
+        self.hedge_requests = hedge_requests
+        self.extraction_hedger = Hedger("extraction", percentile=hedge_percentile, min_delay_s=hedge_min_delay_s)
+        # Caps concurrent requests (completions and Whisper together), backing
+        # off on 429s/timeouts; queued lead extractions go before transcriptions
+        self.limiter = AdaptiveLimiter(
+            "openai",
+            initial_limit=concurrency_initial,
+            min_limit=concurrency_min,
+            max_limit=concurrency_max,
+            backoff=concurrency_backoff,
+            max_queue=concurrency_max_queue,
+            is_overload=_is_overload,
+        )
+
+    def _extraction_cache_key(self, freeform_note: str, role: Optional[str]) -> str:
+        """Hash of the normalized note, role, model and prompt version."""
+        normalized_note = " ".join(freeform_note.split()).casefold()
+        normalized_role = " ".join((role or "").split()).casefold()
+        material = "\x1f".join([normalized_note, normalized_role, self.model, EXTRACTION_PROMPT_VERSION])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
     async def extract_lead_data(
         self,
         freeform_note: str,
         role: Optional[str] = None,
+        timeout_s: Optional[float] = None,
     ) -> AIExtraction:
         """
-        Extract structured lead data from a freeform note using GPT-4o.
+        Extract structured lead data from a freeform note.
+
+        `timeout_s` is the caller's remaining budget; each completion is also
+        capped at the configured `timeout_s`. With `hedge_requests` on, a
+        completion that has not answered by the recent p95 latency is raced
+        against a second identical one.
+        
+        Results are cached by note/role/model/prompt version, and identical
+        requests that arrive while a completion is in flight share it, so
+        double-submits and retries don't trigger another LLM call.
+
+        With `local_fast_path` on, short notes the local rule-based extractor
+        reads unambiguously (products, markets and one monthly volume, no
+        hedging) are answered without calling the LLM at all.
+        """
+        if self.local_fast_path:
+            local = extract_locally(freeform_note, role, max_unambiguous_chars=self.local_fast_path_max_chars)
+            if local.unambiguous:
+                return local.extraction
+
+        timeout_s = self.timeout_s if timeout_s is None else min(timeout_s, self.timeout_s)
+        key = self._extraction_cache_key(freeform_note, role)
+        extraction = await asyncio.wait_for(
+            self.extraction_cache.get_or_compute(
+                key,
+                lambda: self._extract_lead_data_uncached(freeform_note, role, timeout_s),
+            ),
+            timeout=timeout_s,
+        )
+        return extraction.model_copy(deep=True)
+
+    async def _extract_lead_data_uncached(
+        self,
+        freeform_note: str,
+        role: Optional[str] = None,
+        timeout_s: Optional[float] = None,
+    ) -> AIExtraction:
+        """
+        Extract structured lead data from a freeform note using the configured model.
         
         Uses structured outputs to ensure the response matches our schema.
         """
@@ -124,28 +264,39 @@ class OpenAIService:
             role_context=role_context,
         )
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that extracts structured data from lead intake forms. Always respond with valid JSON matching the provided schema."
+        def _complete():
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a helpful assistant that extracts structured data from lead intake forms. Always respond with valid JSON matching the provided schema."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "lead_extraction",
+                        "strict": True,
+                        "schema": EXTRACTION_SCHEMA
+                    }
                 },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "lead_extraction",
-                    "strict": True,
-                    "schema": EXTRACTION_SCHEMA
-                }
-            },
-            temperature=0.1,  # Low temperature for consistent extraction
-        )
+                temperature=0.1,  # Low temperature for consistent extraction
+                timeout=timeout_s or self.timeout_s,
+            )
+
+        async def _call():
+            # A hedged pair shares one limiter slot
+            with track_call("openai", "extraction"):
+                if self.hedge_requests:
+                    return await self.breaker.call(lambda: self.extraction_hedger.run(_complete))
+                return await self.breaker.call(_complete)
+
+        response = await self.limiter.run(_call, PRIORITY_LEAD)
         
         # Parse the response
         content = response.choices[0].message.content
@@ -171,32 +322,206 @@ class OpenAIService:
     
     async def transcribe_audio(
         self,
-        audio_bytes: bytes,
+        audio_file: Union[bytes, IO[bytes]],
         filename: str = "audio.webm",
     ) -> str:
         """
         Transcribe audio using OpenAI Whisper.
         
+        `audio_file` may be raw bytes or a binary file object (e.g. an upload's
+        spooled temp file), which is streamed to the API without being copied
+        into memory.
+
+        PCM WAV input is preprocessed first: downmixed to 16 kHz mono, trimmed
+        of leading/trailing silence and, when long, split at pauses into
+        segments that are transcribed concurrently and joined in order.
+        Preprocessing decodes the clip in memory, so WAVs over
+        `preprocess_max_bytes` and other formats are sent unchanged.
+
+        Transcripts are cached by a hash of the audio bytes and the model, and
+        identical uploads that arrive while one is being transcribed share
+        that call, so retries and double-clicks cost a single Whisper request.
+        Because that call may outlive the request that started it (whose
+        upload is closed when it ends), a file object is copied to a temp
+        file owned by the transcription while it is hashed.
+
         Returns the transcribed text.
         """
-        # Create a file-like object for the API
-        response = await self.client.audio.transcriptions.create(
-            model="whisper-1",
-            file=(filename, audio_bytes),
-            response_format="text",
-        )
-        
+        if isinstance(audio_file, (bytes, bytearray)):
+            key = await asyncio.to_thread(self._transcription_cache_key, audio_file)
+            return await self.transcription_cache.get_or_compute(
+                key,
+                lambda: self._transcribe_audio_uncached(audio_file, filename),
+            )
+
+        key, copy = await asyncio.to_thread(self._spool_audio, audio_file)
+        computing = False
+
+        def _compute():
+            nonlocal computing
+            computing = True
+            return self._transcribe_spooled(copy, filename)
+
+        try:
+            return await self.transcription_cache.get_or_compute(key, _compute)
+        finally:
+            if not computing:
+                # Answered from the cache or by a transcription already in flight
+                copy.close()
+
+    def _transcription_digest(self) -> Any:
+        """SHA-256 seeded with the model and the preprocessing mode."""
+        return hashlib.sha256(f"{TRANSCRIPTION_MODEL}\x1f{int(self.preprocess_wav)}\x1f".encode("utf-8"))
+
+    def _transcription_cache_key(self, audio: Union[bytes, bytearray]) -> str:
+        digest = self._transcription_digest()
+        digest.update(audio)
+        return digest.hexdigest()
+
+    def _spool_audio(self, audio_file: IO[bytes]) -> Tuple[str, IO[bytes]]:
+        """Copy the audio to a temp file while hashing it; returns the cache key and the copy."""
+        digest = self._transcription_digest()
+        copy = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_BYTES)
+        position = audio_file.tell()
+        try:
+            for chunk in iter(lambda: audio_file.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                copy.write(chunk)
+        except BaseException:
+            copy.close()
+            raise
+        audio_file.seek(position)
+        copy.seek(0)
+        return digest.hexdigest(), copy
+
+    async def _transcribe_spooled(self, audio_file: IO[bytes], filename: str) -> str:
+        """Transcribe a copy made by `_spool_audio`, closing it afterwards."""
+        try:
+            return await self._transcribe_audio_uncached(audio_file, filename)
+        finally:
+            audio_file.close()
+
+    async def _transcribe_audio_uncached(self, audio_file: Union[bytes, IO[bytes]], filename: str) -> str:
+        if self._should_preprocess(audio_file):
+            prepared = await asyncio.to_thread(_preprocess, audio_file, self.audio_segment_max_s)
+            if prepared is not None:
+                logger.info(
+                    "Preprocessed %s: %.1fs -> %.1fs in %d segment(s)",
+                    filename,
+                    prepared.input_duration_s,
+                    prepared.output_duration_s,
+                    len(prepared.segments),
+                )
+                return await self._transcribe_segments(prepared, filename)
+        return await self._transcribe_once(audio_file, filename)
+
+    def _should_preprocess(self, audio_file: Union[bytes, IO[bytes]]) -> bool:
+        if not self.preprocess_wav or not _starts_like_wav(audio_file):
+            return False
+        size = _audio_size(audio_file)
+        if size > self.preprocess_max_bytes:
+            logger.info("Sending %d-byte WAV unprocessed (over %d bytes)", size, self.preprocess_max_bytes)
+            return False
+        return True
+
+    async def _transcribe_segments(self, prepared: "PreprocessedAudio", filename: str) -> str:
+        stem = filename.rsplit(".", 1)[0] or "audio"
+        semaphore = asyncio.Semaphore(self.audio_segment_concurrency)
+
+        async def _one(index: int, segment: bytes) -> str:
+            async with semaphore:
+                return await self._transcribe_once(segment, f"{stem}-{index}.wav")
+
+        texts = await asyncio.gather(*(_one(i, segment) for i, segment in enumerate(prepared.segments)))
+        return " ".join(text for text in texts if text)
+
+    async def _transcribe_once(self, audio_file: Union[bytes, IO[bytes]], filename: str) -> str:
+        """One Whisper request for one file."""
+        async def _call():
+            with track_call("openai", "transcription"):
+                return await self.breaker.call(
+                    lambda: self.client.audio.transcriptions.create(
+                        model=TRANSCRIPTION_MODEL,
+                        file=(filename, audio_file),
+                        response_format="text",
+                        timeout=self.timeout_s,
+                    )
+                )
+
+        response = await self.limiter.run(_call, PRIORITY_TRANSCRIPTION)
         return response.strip()
 
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss/eviction counters of the extraction and transcription caches."""
+        return {
+            "extraction": self.extraction_cache.stats(),
+            "transcription": self.transcription_cache.stats(),
+        }
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """Hedged extraction requests sent and won, and the current hedge delay."""
+        return self.extraction_hedger.stats()
+
+    def concurrency_stats(self) -> Dict[str, Any]:
+        """Current adaptive concurrency limit, in-flight and queued requests, queue wait."""
+        return self.limiter.stats()
+
+
+def _is_overload(error: BaseException) -> bool:
+    """Errors that mean OpenAI (or our link to it) is overloaded: 429s and timeouts."""
+    from openai import APITimeoutError, RateLimitError
+
+    return isinstance(error, (RateLimitError, APITimeoutError, TimeoutError))
+
+
+def _starts_like_wav(audio_file: Union[bytes, IO[bytes]]) -> bool:
+    from app.services.audio_preprocessing import is_pcm_wav
+
+    if isinstance(audio_file, (bytes, bytearray)):
+        return is_pcm_wav(bytes(audio_file[:12]))
+    position = audio_file.tell()
+    head = audio_file.read(12)
+    audio_file.seek(position)
+    return is_pcm_wav(head)
+
+
+def _audio_size(audio_file: Union[bytes, IO[bytes]]) -> int:
+    """Bytes of audio from the current position on, without reading them."""
+    if isinstance(audio_file, (bytes, bytearray)):
+        return len(audio_file)
+    position = audio_file.tell()
+    end = audio_file.seek(0, io.SEEK_END)
+    audio_file.seek(position)
+    return end - position
+
+
+def _preprocess(audio_file: Union[bytes, IO[bytes]], max_segment_s: float) -> Optional["PreprocessedAudio"]:
+    """Read (if needed) and preprocess a WAV file; runs in a worker thread."""
+    from app.services.audio_preprocessing import preprocess_wav
+
+    if isinstance(audio_file, (bytes, bytearray)):
+        data = bytes(audio_file)
+    else:
+        position = audio_file.tell()
+        data = audio_file.read()
+        audio_file.seek(position)
+    return preprocess_wav(data, max_segment_s=max_segment_s)
+
 
 # Dependency injection helper
 _openai_service: Optional[OpenAIService] = None
+# Startup warm-up creates the service on a worker thread while requests may arrive
+_openai_service_lock = threading.Lock()
 
 
 def get_openai_service() -> OpenAIService:
     """Get or create the OpenAI service singleton."""
     global _openai_service
-    if _openai_service is None:
+    if _openai_service is not None:
+        return _openai_service
+    with _openai_service_lock:
+        if _openai_service is not None:
+            return _openai_service
         settings = get_settings()
         if not (settings.openai_api_key or "").strip():
             # Fail fast with a clear error instead of sending "Bearer " header.
@@ -204,6 +529,37 @@ def get_openai_service() -> OpenAIService:
         _openai_service = OpenAIService(
             api_key=settings.openai_api_key,
             model=settings.openai_model,
+            timeout_s=settings.openai_timeout_s,
+            max_retries=settings.openai_max_retries,
+            extraction_cache_size=settings.openai_extraction_cache_size,
+            extraction_cache_ttl_s=settings.openai_extraction_cache_ttl_s,
+            preprocess_wav=settings.transcribe_preprocess_wav,
+            preprocess_max_bytes=settings.transcribe_preprocess_max_bytes,
+            audio_segment_max_s=settings.transcribe_segment_max_s,
+            audio_segment_concurrency=settings.transcribe_segment_concurrency,
+            transcription_cache_size=settings.openai_transcription_cache_size,
+            transcription_cache_ttl_s=settings.openai_transcription_cache_ttl_s,
+            local_fast_path=settings.openai_local_fast_path,
+            local_fast_path_max_chars=settings.openai_local_fast_path_max_chars,
+            hedge_requests=settings.openai_hedge_requests,
+            hedge_percentile=settings.openai_hedge_percentile,
+            hedge_min_delay_s=settings.openai_hedge_min_delay_s,
+            concurrency_initial=settings.openai_concurrency_initial,
+            concurrency_min=settings.openai_concurrency_min,
+            concurrency_max=settings.openai_concurrency_max,
+            concurrency_backoff=settings.openai_concurrency_backoff,
+            concurrency_max_queue=settings.openai_concurrency_max_queue,
         )
     return _openai_service
 
+
+def openai_service_stats() -> Optional[Dict[str, Any]]:
+    """Cache, hedging and concurrency stats of the OpenAI service, or None if it has not been created yet."""
+    service = _openai_service
+    if service is None:
+        return None
+    return {
+        "caches": service.cache_stats(),
+        "hedging": service.hedge_stats(),
+        "concurrency": service.concurrency_stats(),
+    }
@@ -1,11 +1,15 @@
 import asyncio
 import logging
-from typing import Optional, Dict, Any, Union
-
-import gspread
-from google.oauth2.service_account import Credentials
+import re
+import threading
+import time
+from typing import Optional, Dict, Any, List, Union
 
+from app.circuit_breaker import CircuitBreaker, get_circuit_breaker
 from app.config import get_settings
+from app.executors import run_blocking
+from app.metrics import track_call
+from app.services.lead_index import LeadIndex
 
 logger = logging.getLogger(__name__)
 
@@ -36,18 +40,188 @@ SHEET_COLUMNS = [
     "status",
 ]
 
+# A lookup miss only triggers an index rebuild if the index is at least this old
+INDEX_MISS_REBUILD_AFTER_S = 10.0
+
+# First row number in an A1 range such as "Sheet1!A12:W14"
+_UPDATED_RANGE_ROW = re.compile(r"![A-Z]+(\d+)")
+
+
+class SheetsBatchWriter:
+    """
+    Coalesces concurrent row appends into single `append_rows` requests.
+
+    Rows submitted within `window_s` of the first pending row (or until
+    `max_rows` are pending) are flushed together, so a burst of leads costs
+    one Sheets write request instead of one per lead. Each caller awaits its
+    own future, which resolves when the batch containing its row is written
+    or fails with the error from that batch. Flushes run one at a time, so
+    rows arriving during a flush are picked up by the next batch.
+    """
+
+    def __init__(
+        self,
+        append_rows_sync,
+        window_s: float = 0.05,
+        max_rows: int = 50,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self._append_rows_sync = append_rows_sync
+        self.breaker = breaker
+        self.window_s = window_s
+        self.max_rows = max(1, max_rows)
+
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_tasks: set = set()
+
+        # Metrics
+        self.batches_flushed = 0
+        self.rows_flushed = 0
+        self.flush_failures = 0
+        self.rows_withdrawn = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_latency_s = 0.0
+        self.total_flush_latency_s = 0.0
+
+    async def submit(self, row: Any) -> None:
+        """
+        Queue a row and wait until the batch containing it is written.
+
+        If the caller is cancelled (e.g. its deadline ran out) before a flush
+        has taken the row, the row is dropped and never written. Once a flush
+        has taken it the write cannot be taken back, so the cancellation is
+        absorbed: the call waits for the batch and reports its outcome, and
+        a caller that stopped waiting does not see "not written" for a row
+        that is in the sheet.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+
+        if len(self._pending) >= self.max_rows:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._schedule_flush)
+
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._withdraw(future):
+                self.rows_withdrawn += 1
+                raise
+            await asyncio.shield(future)
+
+    def _withdraw(self, future: asyncio.Future) -> bool:
+        """Drop a pending row that no flush has taken yet; False if it is already being written."""
+        for position, (_, pending) in enumerate(self._pending):
+            if pending is future:
+                del self._pending[position]
+                future.cancel()
+                if not self._pending and self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                return True
+        return False
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: List[tuple]) -> None:
+        async with self._flush_lock:
+            rows = [row for row, _ in batch]
+            start = time.perf_counter()
+            try:
+                with track_call("sheets", "append_rows"):
+                    if self.breaker is not None:
+                        await self.breaker.call(lambda: run_blocking("sheets", self._append_rows_sync, rows))
+                    else:
+                        await run_blocking("sheets", self._append_rows_sync, rows)
+            except Exception as e:
+                self.flush_failures += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.batches_flushed += 1
+                self.rows_flushed += len(rows)
+                self.last_batch_size = len(rows)
+                self.max_batch_size = max(self.max_batch_size, len(rows))
+                self.last_flush_latency_s = elapsed
+                self.total_flush_latency_s += elapsed
+                logger.debug("Flushed %d row(s) to Sheets in %.3fs", len(rows), elapsed)
+
+    async def flush(self) -> None:
+        """Write any pending rows now and wait for in-flight batches (used on shutdown)."""
+        self._schedule_flush()
+        if self._flush_tasks:
+            await asyncio.gather(*list(self._flush_tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.batches_flushed
+        return {
+            "pending_rows": len(self._pending),
+            "batches_flushed": batches,
+            "rows_flushed": self.rows_flushed,
+            "flush_failures": self.flush_failures,
+            "rows_withdrawn": self.rows_withdrawn,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": (self.rows_flushed / batches) if batches else 0.0,
+            "last_flush_latency_s": self.last_flush_latency_s,
+            "avg_flush_latency_s": (self.total_flush_latency_s / batches) if batches else 0.0,
+        }
+
 
 class SheetsService:
     """Service for Google Sheets interactions."""
     
-    def __init__(self, credentials_dict: dict, sheet_id: str):
+    def __init__(
+        self,
+        credentials_dict: dict,
+        sheet_id: str,
+        batch_window_s: float = 0.05,
+        batch_max_rows: int = 50,
+        header_ttl_s: float = 3600.0,
+        index_reconcile_s: float = 300.0,
+        index_snapshot_path: str = "",
+        http_pool_size: int = 4,
+    ):
         """
         Initialize the Sheets service with credentials.
         
         Args:
             credentials_dict: Parsed Google service account JSON
             sheet_id: The Google Sheet ID to write to
+            batch_window_s: How long to wait for more rows before flushing a batch
+            batch_max_rows: Flush as soon as this many rows are pending
+            header_ttl_s: How long the cached header map is trusted (0 = until a write fails)
+            index_reconcile_s: How often the lead_id index is rebuilt from the sheet
+            index_snapshot_path: Optional SQLite file mirroring the lead_id index
+            http_pool_size: Keep-alive connections to the Sheets API (match the executor size)
         """
+        # gspread and google-auth take a large share of process start-up, so
+        # they are imported when the service is built rather than with the app
+        import gspread
+        from google.auth.transport.requests import AuthorizedSession
+        from google.oauth2.service_account import Credentials
+        from requests.adapters import HTTPAdapter
+
         self.sheet_id = sheet_id
         
         # Set up credentials with the required scopes
@@ -61,8 +235,34 @@ class SheetsService:
             scopes=scopes,
         )
         
-        self.client = gspread.authorize(self.credentials)
+        # One authorized session for all executor threads, with a connection
+        # pool sized so each worker reuses its own TLS connection
+        session = AuthorizedSession(self.credentials)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, http_pool_size))
+        session.mount("https://", adapter)
+        self.client = gspread.authorize(None, session=session)
         self._sheet = None
+
+        # Cached header layout of the live sheet: column name -> 0-based position
+        self.header_ttl_s = header_ttl_s
+        self._header_lock = threading.Lock()
+        self._column_index: Optional[Dict[str, int]] = None
+        self._header_width = 0
+        self._headers_checked_at = 0.0
+
+        self.index = LeadIndex(
+            sheet_id=sheet_id,
+            reconcile_interval_s=index_reconcile_s,
+            snapshot_path=index_snapshot_path,
+        )
+        # Shared by the batch writer and the row update/lookup calls
+        self.breaker = get_circuit_breaker("sheets")
+        self.writer = SheetsBatchWriter(
+            self._append_rows_sync,
+            window_s=batch_window_s,
+            max_rows=batch_max_rows,
+            breaker=self.breaker,
+        )
     
     @property
     def sheet(self):
@@ -72,44 +272,219 @@ class SheetsService:
             self._sheet = spreadsheet.sheet1
         return self._sheet
     
-    def _ensure_headers(self) -> None:
-        """Ensure header row exists (sync operation)."""
-        try:
-            existing_headers = self.sheet.row_values(1)
-            if not existing_headers or existing_headers[0] != SHEET_COLUMNS[0]:
+    def _ensure_headers(self) -> Dict[str, int]:
+        """
+        Ensure the header row has every column in `SHEET_COLUMNS` (sync operation).
+
+        The live header is read once and cached together with its
+        column-to-index map; it is only re-read after `header_ttl_s` or after
+        `invalidate_headers()` (called when a write fails). A sheet with no
+        recognizable header gets `SHEET_COLUMNS` inserted as row 1; a header
+        missing some of our columns has them added on the right.
+        """
+        from gspread.utils import rowcol_to_a1
+
+        with self._header_lock:
+            now = time.monotonic()
+            if self._column_index is not None and (
+                self.header_ttl_s <= 0 or now - self._headers_checked_at < self.header_ttl_s
+            ):
+                return self._column_index
+
+            existing = self.sheet.row_values(1)
+            if not any(name in SHEET_COLUMNS for name in existing):
                 self.sheet.insert_row(SHEET_COLUMNS, 1)
-        except Exception:
-            self.sheet.insert_row(SHEET_COLUMNS, 1)
+                existing = list(SHEET_COLUMNS)
+                # Every data row moved down by one
+                self.index.invalidate()
+            else:
+                missing = [col for col in SHEET_COLUMNS if col not in existing]
+                if missing:
+                    first_col = len(existing) + 1
+                    last_col = len(existing) + len(missing)
+                    if last_col > self.sheet.col_count:
+                        self.sheet.add_cols(last_col - self.sheet.col_count)
+                    self.sheet.update(
+                        range_name=f"{rowcol_to_a1(1, first_col)}:{rowcol_to_a1(1, last_col)}",
+                        values=[missing],
+                    )
+                    logger.warning("Added missing sheet columns: %s", ", ".join(missing))
+                    existing = list(existing) + missing
+
+            column_index: Dict[str, int] = {}
+            for position, name in enumerate(existing):
+                if name:
+                    column_index.setdefault(name, position)
+            self._column_index = column_index
+            self._header_width = len(existing)
+            self._headers_checked_at = now
+            return column_index
+
+    def invalidate_headers(self) -> None:
+        """Force the next write to re-read the header row."""
+        with self._header_lock:
+            self._column_index = None
+
+    def _build_row(self, row_data: Dict[str, Any], column_index: Dict[str, int]) -> List[str]:
+        """Lay out a row in the live sheet's column order."""
+        row = [""] * self._header_width
+        for col in SHEET_COLUMNS:
+            row[column_index[col]] = str(row_data.get(col, ""))
+        return row
+
+    def _row_to_dict(self, values: List[str], column_index: Dict[str, int]) -> Dict[str, Any]:
+        """Map a row read from the sheet back to `SHEET_COLUMNS` keys."""
+        return {
+            col: values[column_index[col]] if column_index[col] < len(values) else ""
+            for col in SHEET_COLUMNS
+        }
     
-    def _append_row_sync(self, row_data: Dict[str, Any]) -> None:
-        """Sync operation to append a row to the sheet."""
-        row = [str(row_data.get(col, "")) for col in SHEET_COLUMNS]
-        self._ensure_headers()
-        self.sheet.append_row(row, value_input_option="USER_ENTERED")
+    def _append_rows_sync(self, rows_data: List[Dict[str, Any]]) -> None:
+        """Sync operation to append a batch of rows to the sheet."""
+        from gspread.exceptions import APIError
+
+        column_index = self._ensure_headers()
+        rows = [self._build_row(row_data, column_index) for row_data in rows_data]
+        try:
+            response = self.sheet.append_rows(rows, value_input_option="USER_ENTERED")
+        except APIError:
+            # The sheet layout may have changed under us; re-read it next time
+            self.invalidate_headers()
+            raise
+
+        updated_range = ((response or {}).get("updates") or {}).get("updatedRange", "")
+        match = _UPDATED_RANGE_ROW.search(updated_range)
+        if match:
+            self.index.record_appends(int(match.group(1)), rows_data)
+        else:
+            logger.warning("Unexpected append range %r; lead index will be rebuilt", updated_range)
+            self.index.invalidate()
+
+    def _ensure_index(self, column_index: Dict[str, int]) -> None:
+        """Rebuild the lead_id index from one bulk column read if it is stale."""
+        if self.index.is_stale:
+            lead_ids = self.sheet.col_values(column_index["lead_id"] + 1)
+            self.index.rebuild(lead_ids)
+
+    def warm_up(self) -> None:
+        """
+        Do the first-request work up front (sync operation): fetch an OAuth
+        token, open the spreadsheet, read the header row and build the
+        lead_id index.
+        """
+        self._ensure_index(self._ensure_headers())
     
     async def append_lead(self, row_data: Dict[str, Any]) -> None:
         """
         Append a lead row to the Google Sheet.
         
-        Uses asyncio.to_thread to run the sync gspread operation
-        without blocking the event loop.
+        The row is handed to the batch writer, which coalesces concurrent
+        appends into one `append_rows` call run on the Sheets executor.
         
         Args:
             row_data: Dictionary with column names as keys
         """
-        await asyncio.to_thread(self._append_row_sync, row_data)
+        await self.writer.submit(dict(row_data))
+
+    async def flush(self) -> None:
+        """Flush any buffered rows (called on shutdown)."""
+        await self.writer.flush()
     
+    def _read_indexed_row(self, lead_id: str, column_index: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Read the row the index points at, if it still holds `lead_id`."""
+        row = self.index.get_row(lead_id)
+        if row is None:
+            return None
+        row_data = self._row_to_dict(self.sheet.row_values(row), column_index)
+        if row_data["lead_id"] != lead_id:
+            return None
+        self.index.cache_row(lead_id, row_data)
+        return row_data
+
     def _find_lead_sync(self, lead_id: str) -> Optional[Dict[str, Any]]:
-        """Sync operation to find a lead by ID."""
+        """
+        Sync operation to find a lead by ID.
+
+        Served from the row cache when possible; otherwise the lead_id index
+        gives the row and a single targeted row read fetches it. If the index
+        points at the wrong row (rows moved) or misses a lead another instance
+        may have written, it is rebuilt and the lookup retried once. Returns
+        None only when the lead is not in the sheet; API and network errors
+        are raised.
+        """
+        from gspread.exceptions import APIError
+
+        cached = self.index.get_cached(lead_id)
+        if cached is not None:
+            return cached
+        column_index = self._ensure_headers()
         try:
-            cell = self.sheet.find(lead_id)
-            if cell:
-                row_data = self.sheet.row_values(cell.row)
-                return dict(zip(SHEET_COLUMNS, row_data))
-        except Exception:
-            pass
-        return None
+            self._ensure_index(column_index)
+            row_data = self._read_indexed_row(lead_id, column_index)
+            if row_data is None and self.index.age_s >= INDEX_MISS_REBUILD_AFTER_S:
+                self.index.invalidate()
+                self._ensure_index(column_index)
+                row_data = self._read_indexed_row(lead_id, column_index)
+        except APIError:
+            # The sheet layout may have changed under us; re-read it next time
+            self.invalidate_headers()
+            raise
+        return row_data
     
+    def _locate_lead_row(self, lead_id: str, column_index: Dict[str, int]) -> Optional[int]:
+        """Return the sheet row holding `lead_id`, verified with a one-cell read."""
+        for attempt in range(2):
+            if attempt:
+                self.index.invalidate()
+            self._ensure_index(column_index)
+            row = self.index.get_row(lead_id)
+            if row is not None and self.sheet.cell(row, column_index["lead_id"] + 1).value == lead_id:
+                return row
+        return None
+
+    def _update_lead_sync(self, lead_id: str, updates: Dict[str, Any]) -> bool:
+        """Sync operation to overwrite some cells of an existing lead's row."""
+        from gspread.exceptions import APIError
+        from gspread.utils import rowcol_to_a1
+
+        column_index = self._ensure_headers()
+        row = self._locate_lead_row(lead_id, column_index)
+        if row is None:
+            return False
+        data = [
+            {"range": rowcol_to_a1(row, column_index[col] + 1), "values": [[str(value)]]}
+            for col, value in updates.items()
+            if col in column_index
+        ]
+        try:
+            self.sheet.batch_update(data, value_input_option="USER_ENTERED")
+        except APIError:
+            self.invalidate_headers()
+            raise
+
+        cached = self.index.get_cached(lead_id)
+        if cached is not None:
+            cached.update(updates)
+            self.index.cache_row(lead_id, cached)
+        return True
+
+    async def update_lead(self, lead_id: str, updates: Dict[str, Any]) -> bool:
+        """
+        Update columns of a lead that was already appended.
+
+        The row is found through the lead_id index and all cells are written
+        with one `batch_update` call on the Sheets executor.
+
+        Args:
+            lead_id: The lead ID to update
+            updates: Dictionary of column names to new values
+
+        Returns:
+            False if the lead could not be found in the sheet
+        """
+        with track_call("sheets", "update_lead"):
+            return await self.breaker.call(lambda: run_blocking("sheets", self._update_lead_sync, lead_id, updates))
+
     async def get_lead_by_id(self, lead_id: str) -> Optional[Dict[str, Any]]:
         """
         Find a lead by its ID.
@@ -118,9 +493,15 @@ class SheetsService:
             lead_id: The lead ID to search for
             
         Returns:
-            Dictionary with lead data, or None if not found
+            Dictionary with lead data, or None if not found. A failed lookup
+            raises instead, so the circuit breaker and metrics record it.
         """
-        return await asyncio.to_thread(self._find_lead_sync, lead_id)
+        with track_call("sheets", "find_lead"):
+            return await self.breaker.call(lambda: run_blocking("sheets", self._find_lead_sync, lead_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch writer counters (for the status endpoint)."""
+        return {"writer": self.writer.stats()}
 
 
 class MockSheetsService:
@@ -132,19 +513,41 @@ class MockSheetsService:
         logger.debug(f"   Company: {row_data.get('company')}")
         logger.debug(f"   Contact: {row_data.get('contact_name')}")
     
+    async def update_lead(self, lead_id: str, updates: Dict[str, Any]) -> bool:
+        """Log the update instead of writing to sheets."""
+        logger.info(f"📊 [MOCK SHEETS] Would update lead: {lead_id} ({', '.join(updates)})")
+        return True
+
     async def get_lead_by_id(self, lead_id: str) -> Optional[Dict[str, Any]]:
         """Mock lookup always returns None."""
         return None
 
+    async def flush(self) -> None:
+        """Nothing is buffered in the mock."""
+        return None
+
+    def warm_up(self) -> None:
+        """Nothing to prepare in the mock."""
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mock": True}
+
 
 # Dependency injection helper
 _sheets_service: Optional[Union[SheetsService, MockSheetsService]] = None
+# Startup warm-up creates the service on a worker thread while requests may arrive
+_sheets_service_lock = threading.Lock()
 
 
 def get_sheets_service() -> Union[SheetsService, MockSheetsService]:
     """Get or create the Sheets service singleton."""
     global _sheets_service
-    if _sheets_service is None:
+    if _sheets_service is not None:
+        return _sheets_service
+    with _sheets_service_lock:
+        if _sheets_service is not None:
+            return _sheets_service
         settings = get_settings()
         credentials = settings.google_credentials_dict
         
@@ -161,5 +564,24 @@ def get_sheets_service() -> Union[SheetsService, MockSheetsService]:
         _sheets_service = SheetsService(
             credentials_dict=credentials,
             sheet_id=settings.google_sheet_id,
+            batch_window_s=settings.sheets_batch_window_ms / 1000.0,
+            batch_max_rows=settings.sheets_batch_max_rows,
+            header_ttl_s=settings.sheets_header_ttl_s,
+            index_reconcile_s=settings.sheets_index_reconcile_s,
+            index_snapshot_path=settings.sheets_index_snapshot_path,
+            http_pool_size=settings.sheets_executor_workers,
         )
     return _sheets_service
+
+
+async def flush_sheets_service() -> None:
+    """Flush buffered rows if the Sheets service was ever created."""
+    if _sheets_service is not None:
+        await _sheets_service.flush()
+
+
+def sheets_service_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the Sheets service, or None if it has not been created yet (never creates it)."""
+    if _sheets_service is None:
+        return None
+    return _sheets_service.stats()
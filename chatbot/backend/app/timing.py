@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# One JSON object per line: {"event": "request" | "lead_delivery", ...}
+timing_logger = logging.getLogger("app.timing")
+
+
+class Timings:
+    """Stage durations (and tags such as lead_id) collected for one request or delivery."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def stage_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000.0, 1) for name, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value, e.g. `sheets;dur=81.2, total;dur=95.0`."""
+        entries = [f"{name};dur={ms}" for name, ms in self.stage_ms().items()]
+        entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+    def log(self, event: str, **fields: Any) -> None:
+        record = {"event": event, **self.fields, **fields, "duration_ms": round(self.elapsed_ms(), 1), "stages_ms": self.stage_ms()}
+        timing_logger.info(json.dumps(record, default=str))
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+
+def start_timings() -> Timings:
+    """Collect timings for the current task (and tasks it starts) from here on."""
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add a stage duration to the current request's timings, if any are being collected."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def annotate(**fields: Any) -> None:
+    """Tag the current request's timing log line (e.g. with its lead_id)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.fields.update(fields)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    Time requests to `paths` stage by stage.
+
+    Stages recorded with `timed`/`record_timing` while the request runs are
+    sent back in a `Server-Timing` header (when `header` is on) and logged
+    as one JSON line per request by the "app.timing" logger.
+    """
+
+    def __init__(self, app, paths: Iterable[str], header: bool = True):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_timings()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timings.log("request", method=scope["method"], path=scope["path"], status=status_code)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import get_settings
+from app.executors import run_blocking
+from app.services.gmail_service import get_gmail_service
+from app.services.openai_service import get_openai_service
+from app.services.sheets_service import get_sheets_service
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Background warm-up of the external service clients at startup.
+
+    Every step runs concurrently; the warm-up is finished once all of them
+    have finished or `timeout_s` has passed (unfinished steps are then
+    abandoned and reported as "timeout"). A failed step is logged but does
+    not stop the others: the request that needs that client will simply
+    retry the work, as it would have without a warm-up.
+    """
+
+    def __init__(self, steps: Dict[str, Callable[[], Awaitable[Any]]], timeout_s: float):
+        self.steps = steps
+        self.timeout_s = timeout_s
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.duration_s: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _step(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            self.results[name] = {"outcome": "error", "error": f"{type(e).__name__}: {e}"[:200]}
+        else:
+            self.results[name] = {"outcome": "ok"}
+        self.results[name]["duration_s"] = round(time.perf_counter() - started, 3)
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        tasks = {name: asyncio.create_task(self._step(name, step)) for name, step in self.steps.items()}
+        _, pending = await asyncio.wait(tasks.values(), timeout=self.timeout_s)
+        for name, task in tasks.items():
+            if task in pending:
+                task.cancel()
+                self.results[name] = {"outcome": "timeout", "duration_s": self.timeout_s}
+        self.duration_s = round(time.perf_counter() - started, 3)
+        logger.info(
+            "Warm-up finished in %.2fs: %s",
+            self.duration_s,
+            ", ".join(f"{name} {result['outcome']}" for name, result in self.results.items()),
+        )
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"finished": self.finished, "duration_s": self.duration_s, "steps": dict(self.results)}
+
+
+async def _warm_sheets() -> None:
+    # Credential parsing, gspread.authorize, token fetch, open_by_key, header row, lead index
+    await run_blocking("sheets", lambda: get_sheets_service().warm_up())
+
+
+async def _warm_gmail() -> None:
+    # Credential parsing, delegated token fetch, Gmail client build
+    await run_blocking("gmail", lambda: get_gmail_service().warm_up())
+
+
+def _load_openai() -> None:
+    get_openai_service()
+    # Loads numpy, so the first WAV upload does not do it on the event loop
+    import app.services.audio_preprocessing  # noqa: F401
+
+
+async def _warm_openai() -> None:
+    # Client construction (and the openai package import), audio preprocessing
+    await asyncio.to_thread(_load_openai)
+
+
+WARM_UP_STEPS: Dict[str, Callable[[], Awaitable[Any]]] = {
+    "sheets": _warm_sheets,
+    "gmail": _warm_gmail,
+    "openai": _warm_openai,
+}
+
+_warm_up: Optional[WarmUp] = None
+
+
+def start_warm_up() -> Optional[WarmUp]:
+    """Start warming the service clients in the background (called from the app lifespan)."""
+    global _warm_up
+    timeout_s = get_settings().startup_warmup_timeout_s
+    if timeout_s <= 0:
+        return None
+    _warm_up = WarmUp(WARM_UP_STEPS, timeout_s=timeout_s)
+    _warm_up.start()
+    return _warm_up
+
+
+async def stop_warm_up() -> None:
+    if _warm_up is not None:
+        await _warm_up.stop()
+
+
+def is_warm() -> bool:
+    """True once the startup warm-up has finished (or when there is none)."""
+    return _warm_up is None or _warm_up.finished
+
+
+def warm_up_stats() -> Optional[Dict[str, Any]]:
+    return _warm_up.stats() if _warm_up is not None else None
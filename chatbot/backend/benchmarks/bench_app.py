@@ -0,0 +1,56 @@
+"""
+The real FastAPI app with OpenAI, Sheets and Gmail replaced by the fakes.
+
+Served by `load_test.py` as:
+    BENCH_PROFILE='{"completion": {"median_ms": 1800, "p95_ms": 4500}}' \\
+        python -m uvicorn benchmarks.bench_app:app --port 8099
+
+BENCH_PROFILE is the JSON form of `FakeProfiles`; anything it omits keeps
+its default. Everything else (caches, hedging, deadlines, breakers,
+executors, the journal) is configured from the environment as usual.
+
+The fakes are installed as the service singletons rather than only as
+dependency overrides, so the journal drainer and /status (which call the
+`get_*_service()` helpers directly) use them too.
+"""
+
+import json
+import os
+import random
+
+from app.config import get_settings
+from app.main import app
+from app.services import gmail_service, openai_service, sheets_service
+from benchmarks.fakes import FakeGmailService, FakeProfiles, FakeSheetsService, fake_openai_service
+
+profiles = FakeProfiles.from_dict(json.loads(os.environ.get("BENCH_PROFILE") or "{}"))
+_rng = random.Random(profiles.seed)
+
+_settings = get_settings()
+openai_service._openai_service = fake_openai_service(
+    profiles,
+    _rng,
+    model=_settings.openai_model,
+    timeout_s=_settings.openai_timeout_s,
+    extraction_cache_size=_settings.openai_extraction_cache_size,
+    extraction_cache_ttl_s=_settings.openai_extraction_cache_ttl_s,
+    preprocess_wav=_settings.transcribe_preprocess_wav,
+    audio_segment_max_s=_settings.transcribe_segment_max_s,
+    audio_segment_concurrency=_settings.transcribe_segment_concurrency,
+    transcription_cache_size=_settings.openai_transcription_cache_size,
+    transcription_cache_ttl_s=_settings.openai_transcription_cache_ttl_s,
+    local_fast_path=_settings.openai_local_fast_path,
+    local_fast_path_max_chars=_settings.openai_local_fast_path_max_chars,
+    hedge_requests=_settings.openai_hedge_requests,
+    hedge_percentile=_settings.openai_hedge_percentile,
+    hedge_min_delay_s=_settings.openai_hedge_min_delay_s,
+    concurrency_initial=_settings.openai_concurrency_initial,
+    concurrency_min=_settings.openai_concurrency_min,
+    concurrency_max=_settings.openai_concurrency_max,
+    concurrency_backoff=_settings.openai_concurrency_backoff,
+    concurrency_max_queue=_settings.openai_concurrency_max_queue,
+)
+sheets_service._sheets_service = FakeSheetsService(profiles, _rng)
+gmail_service._gmail_service = FakeGmailService(profiles, _rng)
+
+__all__ = ["app", "profiles"]
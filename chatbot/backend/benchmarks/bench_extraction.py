@@ -0,0 +1,166 @@
+"""
+Benchmark the local rule-based extractor against a labelled corpus of notes.
+
+Reports per-note latency (p50/p99) and field accuracy for products, markets
+and monthly volume, and how many notes qualify for the LLM fast path. With
+--llm (needs OPENAI_API_KEY), each note is also sent to the LLM to compare
+latency and field agreement between the two.
+
+Usage (from chatbot/backend):
+    python -m benchmarks.bench_extraction
+    python -m benchmarks.bench_extraction --llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.schemas import AIExtraction  # noqa: E402
+from app.services.local_extractor import extract_locally  # noqa: E402
+
+CORPUS = Path(__file__).with_name("extraction_corpus.jsonl")
+
+
+def load_corpus(path: Path) -> List[Dict[str, Any]]:
+    with path.open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _set_score(got: List[str], expected: List[str]) -> float:
+    """Jaccard similarity of two label lists (1.0 when both are empty)."""
+    got_set, expected_set = {g.lower() for g in got}, {e.lower() for e in expected}
+    if not got_set and not expected_set:
+        return 1.0
+    return len(got_set & expected_set) / len(got_set | expected_set)
+
+
+def score(extraction: AIExtraction, expected: Dict[str, Any]) -> Dict[str, float]:
+    return {
+        "products": _set_score(extraction.product_types, expected["product_types"]),
+        "markets": _set_score(extraction.markets, expected["markets"]),
+        "volume": float(extraction.estimated_monthly_volume == expected["estimated_monthly_volume"]),
+    }
+
+
+def bench_local(corpus: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    # Warm up the regex cache before timing
+    for item in corpus:
+        extract_locally(item["note"], item.get("role"))
+
+    latencies_us: List[float] = []
+    for _ in range(rounds):
+        for item in corpus:
+            start = time.perf_counter()
+            extract_locally(item["note"], item.get("role"))
+            latencies_us.append((time.perf_counter() - start) * 1e6)
+
+    scores = []
+    misses = []
+    unambiguous = 0
+    for item in corpus:
+        result = extract_locally(item["note"], item.get("role"))
+        note_score = score(result.extraction, item["expected"])
+        scores.append(note_score)
+        unambiguous += result.unambiguous
+        if min(note_score.values()) < 1.0:
+            misses.append(
+                {
+                    "note": item["note"],
+                    "products": result.extraction.product_types,
+                    "markets": result.extraction.markets,
+                    "volume": result.extraction.estimated_monthly_volume,
+                    "expected": item["expected"],
+                }
+            )
+
+    return {
+        "notes": len(corpus),
+        "latency_us": {
+            "p50": round(percentile(latencies_us, 50), 1),
+            "p99": round(percentile(latencies_us, 99), 1),
+            "mean": round(statistics.fmean(latencies_us), 1),
+        },
+        "accuracy": {field: round(statistics.fmean(s[field] for s in scores), 3) for field in scores[0]},
+        "fast_path_eligible": unambiguous,
+        "misses": misses,
+    }
+
+
+async def bench_llm(corpus: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    from app.services.openai_service import OpenAIService
+
+    api_key = os.environ.get("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        print("OPENAI_API_KEY is not set; skipping the LLM comparison", file=sys.stderr)
+        return None
+
+    service = OpenAIService(
+        api_key=api_key,
+        model=os.environ.get("OPENAI_MODEL", "gpt-4o-mini"),
+        extraction_cache_size=0,
+    )
+    latencies_ms: List[float] = []
+    llm_scores = []
+    agreement = []
+    for item in corpus:
+        start = time.perf_counter()
+        llm = await service.extract_lead_data(item["note"], item.get("role"))
+        latencies_ms.append((time.perf_counter() - start) * 1e3)
+        llm_scores.append(score(llm, item["expected"]))
+        local = extract_locally(item["note"], item.get("role")).extraction
+        agreement.append(
+            score(
+                local,
+                {
+                    "product_types": llm.product_types,
+                    "markets": llm.markets,
+                    "estimated_monthly_volume": llm.estimated_monthly_volume,
+                },
+            )
+        )
+
+    return {
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 1),
+            "p99": round(percentile(latencies_ms, 99), 1),
+            "mean": round(statistics.fmean(latencies_ms), 1),
+        },
+        "accuracy": {field: round(statistics.fmean(s[field] for s in llm_scores), 3) for field in llm_scores[0]},
+        "local_agreement": {field: round(statistics.fmean(s[field] for s in agreement), 3) for field in agreement[0]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=CORPUS, help="JSONL file of notes with expected fields")
+    parser.add_argument("--rounds", type=int, default=200, help="Timing passes over the corpus")
+    parser.add_argument("--llm", action="store_true", help="Also run every note through the LLM")
+    parser.add_argument("--show-misses", action="store_true", help="Include notes the extractor got wrong")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    report: Dict[str, Any] = {"local": bench_local(corpus, args.rounds)}
+    if not args.show_misses:
+        report["local"]["misses"] = len(report["local"]["misses"])
+    if args.llm:
+        report["llm"] = asyncio.run(bench_llm(corpus))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
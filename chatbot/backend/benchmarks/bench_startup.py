@@ -0,0 +1,182 @@
+"""
+Measure process start-up: import time of the app and time to first response.
+
+Two measurements, each repeated --rounds times in fresh processes:
+
+- `python -X importtime -c "import app.main"`: the cumulative import time
+  of app.main, the modules with the largest cumulative times, and which of
+  the heavy client libraries (openai, gspread, googleapiclient, ...) were
+  imported at all; they should only load once a service is built.
+- uvicorn serving `app.main:app` with the mock Sheets and Gmail services:
+  the time from spawning the process to its first HTTP response of any
+  kind, and to the first 200 from /health (the startup warm-up has
+  finished).
+
+The report is written as JSON together with the git revision, so two runs
+can be compared with --compare; --max-import-ms exits non-zero when the
+median import time is over the budget (for CI).
+
+Usage (from chatbot/backend):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --rounds 10 --max-import-ms 800
+    python -m benchmarks.bench_startup --compare benchmarks/results/startup-before.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.load_test import BACKEND_DIR, RESULTS_DIR, _delta, free_port, git_revision
+
+# Imported on first use by the services; none of them should load with the app
+HEAVY_MODULES = ("openai", "gspread", "googleapiclient", "google.oauth2", "google_auth_oauthlib", "httplib2", "numpy")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def server_env() -> Dict[str, str]:
+    return {
+        **os.environ,
+        "API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        # Without Google credentials the mock Sheets and Gmail services are used
+        "GOOGLE_SERVICE_ACCOUNT_JSON": "",
+        "GOOGLE_SERVICE_ACCOUNT_JSON_B64": "",
+        "GOOGLE_SERVICE_ACCOUNT_JSON_PATH": "",
+    }
+
+
+def import_times(module: str = "app.main") -> Dict[str, Any]:
+    """One `-X importtime` run: cumulative import time (ms) per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=server_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2)) / 1000.0
+    return cumulative
+
+
+def first_response(timeout_s: float) -> Dict[str, Optional[float]]:
+    """Spawn uvicorn; seconds until its first HTTP response and its first healthy /health."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=server_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    first: Optional[float] = None
+    ready: Optional[float] = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout_s and server.poll() is None:
+                try:
+                    response = client.get("/health")
+                except httpx.TransportError:
+                    time.sleep(0.005)
+                    continue
+                if first is None:
+                    first = time.perf_counter() - started
+                if response.status_code == 200:
+                    ready = time.perf_counter() - started
+                    break
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"first_response_s": first, "ready_s": ready}
+
+
+def _median(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    runs = [import_times() for _ in range(args.rounds)]
+    # The modules of the last run, ordered by cumulative time
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    startups = [first_response(args.timeout) for _ in range(args.rounds)]
+
+    return {
+        "run_id": datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "rounds": args.rounds,
+        "import_ms": {
+            "median": _median([times.get("app.main") for times in runs]),
+            "min": min(times.get("app.main", 0.0) for times in runs),
+            "max": max(times.get("app.main", 0.0) for times in runs),
+        },
+        "slowest_imports_ms": {name: round(ms, 1) for name, ms in slowest[: args.top]},
+        "heavy_modules_imported": [name for name in HEAVY_MODULES if name in runs[-1]],
+        "startup_s": {
+            "first_response": _median([startup["first_response_s"] for startup in startups]),
+            "ready": _median([startup["ready_s"] for startup in startups]),
+            "failed": sum(1 for startup in startups if startup["ready_s"] is None),
+        },
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Human-readable differences in the headline numbers of two reports."""
+    return [
+        f"{old.get('git_revision')} ({old.get('run_id')}) -> {new.get('git_revision')} ({new.get('run_id')})",
+        f"import ms (median)     {_delta(old['import_ms']['median'], new['import_ms']['median'])}",
+        f"first response s      {_delta(old['startup_s']['first_response'], new['startup_s']['first_response'])}",
+        f"ready s               {_delta(old['startup_s']['ready'], new['startup_s']['ready'])}",
+        f"heavy modules         {old['heavy_modules_imported']} -> {new['heavy_modules_imported']}",
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each server to become ready")
+    parser.add_argument("--max-import-ms", type=float, help="Exit with status 1 if the median import time is higher")
+    parser.add_argument("--output", type=Path, help="Report path (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to print the differences against")
+    args = parser.parse_args()
+    args.rounds = max(1, args.rounds)
+
+    report = run(args)
+    output = args.output or RESULTS_DIR / f"startup-{report['run_id']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print(json.dumps(report, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+    if args.compare:
+        print("\n".join(compare(json.loads(args.compare.read_text()), report)))
+
+    if args.max_import_ms is not None and (report["import_ms"]["median"] or 0.0) > args.max_import_ms:
+        print(f"app.main imports in {report['import_ms']['median']} ms, over the {args.max_import_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
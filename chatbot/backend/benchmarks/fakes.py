@@ -0,0 +1,199 @@
+"""
+In-process stand-ins for OpenAI, Google Sheets and Gmail used by the load test.
+
+Each fake waits for a latency drawn from a log-normal distribution (given as
+median and p95) and fails with a configurable probability. OpenAI is faked at
+the client level, so the real `OpenAIService` still runs its caches, hedging,
+circuit breaker and WAV preprocessing; the Sheets and Gmail fakes sleep on
+the real executors so thread-pool queueing behaves as in production.
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from openai import RateLimitError
+
+from app.executors import run_blocking
+from app.services.local_extractor import extract_locally
+from app.services.openai_service import OpenAIService
+
+
+class InjectedFailure(RuntimeError):
+    """Error raised by a fake to simulate a failing dependency."""
+
+
+@dataclass
+class LatencyProfile:
+    """Log-normal latency with the given median/p95, plus a failure rate."""
+
+    median_ms: float
+    p95_ms: float
+    error_rate: float = 0.0
+
+    def sample_s(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        sigma = math.log(max(self.p95_ms, self.median_ms) / self.median_ms) / 1.645
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000.0
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+@dataclass
+class FakeProfiles:
+    """Latency profiles for every faked call (defaults are typical production numbers)."""
+
+    completion: LatencyProfile = field(default_factory=lambda: LatencyProfile(1800, 4500))
+    transcription: LatencyProfile = field(default_factory=lambda: LatencyProfile(900, 2500))
+    sheets_append: LatencyProfile = field(default_factory=lambda: LatencyProfile(250, 700))
+    sheets_update: LatencyProfile = field(default_factory=lambda: LatencyProfile(300, 800))
+    gmail_send: LatencyProfile = field(default_factory=lambda: LatencyProfile(400, 1200))
+    # Fake OpenAI answers 429 to requests beyond this many in flight (None = no limit)
+    openai_max_concurrency: Optional[int] = None
+    seed: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FakeProfiles":
+        profiles = cls(seed=data.get("seed"), openai_max_concurrency=data.get("openai_max_concurrency"))
+        for name in ("completion", "transcription", "sheets_append", "sheets_update", "gmail_send"):
+            if name in data:
+                setattr(profiles, name, LatencyProfile(**data[name]))
+        return profiles
+
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content: str):
+        self.message = _Message(content)
+
+
+class _Completion:
+    def __init__(self, content: str):
+        self.choices = [_Choice(content)]
+
+
+class FakeAsyncOpenAI:
+    """Just enough of `AsyncOpenAI` for `OpenAIService`: chat completions and transcriptions."""
+
+    def __init__(self, profiles: FakeProfiles, rng: random.Random):
+        self._profiles = profiles
+        self._rng = rng
+        self._in_flight = 0
+        self.rate_limited = 0
+        self.chat = type("Chat", (), {"completions": type("Completions", (), {"create": self._complete})()})()
+        self.audio = type("Audio", (), {"transcriptions": type("Transcriptions", (), {"create": self._transcribe})()})()
+
+    async def _call(self, profile: LatencyProfile, what: str) -> None:
+        limit = self._profiles.openai_max_concurrency
+        if limit is not None and self._in_flight >= limit:
+            self.rate_limited += 1
+            await asyncio.sleep(0.05)
+            response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/fake"))
+            raise RateLimitError("injected 429: too many concurrent requests", response=response, body=None)
+        self._in_flight += 1
+        try:
+            await asyncio.sleep(profile.sample_s(self._rng))
+        finally:
+            self._in_flight -= 1
+        if profile.fails(self._rng):
+            raise InjectedFailure(f"injected {what} failure")
+
+    async def _complete(self, *, messages: List[Dict[str, str]], **_: Any) -> _Completion:
+        await self._call(self._profiles.completion, "completion")
+        # Answer with what the local extractor reads from the note
+        prompt = messages[-1]["content"]
+        note = prompt.split("---", 2)[1].strip() if prompt.count("---") >= 2 else prompt
+        extraction = extract_locally(note).extraction
+        return _Completion(json.dumps(extraction.model_dump(mode="json")))
+
+    async def _transcribe(self, *, file: Tuple[str, Any], **_: Any) -> str:
+        await self._call(self._profiles.transcription, "transcription")
+        return "We need child resistant jars for gummies, about ten thousand a month in Michigan."
+
+
+def fake_openai_service(profiles: FakeProfiles, rng: random.Random, **kwargs: Any) -> OpenAIService:
+    """A real `OpenAIService` whose client is `FakeAsyncOpenAI`."""
+    service = OpenAIService(api_key="bench", **kwargs)
+    service.client = FakeAsyncOpenAI(profiles, rng)
+    return service
+
+
+def _blocking_call(profile: LatencyProfile, rng: random.Random, what: str) -> None:
+    time.sleep(profile.sample_s(rng))
+    if profile.fails(rng):
+        raise InjectedFailure(f"injected {what} failure")
+
+
+class FakeSheetsService:
+    """Sheets stand-in; each call blocks a Sheets executor thread like the real API client."""
+
+    def __init__(self, profiles: FakeProfiles, rng: random.Random):
+        self._profiles = profiles
+        self._rng = rng
+        self.appended = 0
+        self.updated = 0
+
+    async def append_lead(self, row_data: Dict[str, Any]) -> None:
+        await run_blocking("sheets", _blocking_call, self._profiles.sheets_append, self._rng, "Sheets append")
+        self.appended += 1
+
+    async def update_lead(self, lead_id: str, updates: Dict[str, Any]) -> bool:
+        await run_blocking("sheets", _blocking_call, self._profiles.sheets_update, self._rng, "Sheets update")
+        self.updated += 1
+        return True
+
+    async def get_lead_by_id(self, lead_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def flush(self) -> None:
+        return None
+
+    def warm_up(self) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"fake": True, "appended": self.appended, "updated": self.updated}
+
+
+class FakeGmailService:
+    """Gmail stand-in; each message blocks a Gmail executor thread like the real API client."""
+
+    def __init__(self, profiles: FakeProfiles, rng: random.Random):
+        self._profiles = profiles
+        self._rng = rng
+        self.sent = 0
+
+    async def _send(self) -> bool:
+        try:
+            await run_blocking("gmail", _blocking_call, self._profiles.gmail_send, self._rng, "Gmail send")
+        except InjectedFailure:
+            return False
+        self.sent += 1
+        return True
+
+    async def send_notification(self, **_: Any) -> bool:
+        return await self._send()
+
+    async def send_lead_confirmation(self, **_: Any) -> bool:
+        return await self._send()
+
+    def warm_up(self) -> None:
+        return None
+
+    async def send_lead_emails(self, notification: Dict[str, Any], confirmation: Dict[str, Any]) -> Tuple[bool, bool]:
+        notified, confirmed = await asyncio.gather(self._send(), self._send())
+        return notified, confirmed
@@ -0,0 +1,355 @@
+"""
+Load-test /lead-intake and /transcribe against the app with faked dependencies.
+
+Starts `benchmarks.bench_app` under uvicorn in a subprocess, sends requests
+open-loop at a fixed rate (so a slow server builds a backlog instead of
+slowing the client down), and reports per endpoint: status codes, p50/p95/
+p99/max latency and throughput, plus the server's peak RSS. The report is
+written as JSON together with the git revision and the fake latency profile,
+so two runs can be compared with --compare.
+
+Usage (from chatbot/backend):
+    python -m benchmarks.load_test --rps 50 --duration 30
+    python -m benchmarks.load_test --rps 50 --transcribe-share 0.2 \\
+        --profile '{"completion": {"median_ms": 2000, "p95_ms": 6000, "error_rate": 0.05}}'
+    python -m benchmarks.load_test --compare benchmarks/results/load-before.json
+
+Server settings come from the environment as usual (e.g. LEAD_JOURNAL_DIR,
+OPENAI_HEDGE_REQUESTS); --env KEY=VALUE sets them for the server only.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import wave
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).with_name("results")
+CORPUS = Path(__file__).with_name("extraction_corpus.jsonl")
+
+API_KEY = "bench"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_notes() -> List[str]:
+    with CORPUS.open() as f:
+        return [json.loads(line)["note"] for line in f if line.strip()]
+
+
+def lead_payload(notes: List[str], n: int) -> Dict[str, Any]:
+    # Each request gets a unique note so the extraction cache does not hide the AI stage
+    note = f"{notes[n % len(notes)]} (load test request {n})"
+    return {
+        "freeform_note": note.ljust(40, "."),
+        "contact": {"name": "Load Test", "company": "Bench Co", "email": f"bench+{n}@example.com"},
+        "role": "brand",
+        "metadata": {"source": "load-test"},
+    }
+
+
+def wav_clip(n: int, seconds: float = 2.0, rate: int = 16000) -> bytes:
+    """A short mono tone whose pitch depends on `n`, so no two uploads hash alike."""
+    frequency = 220.0 + n % 800
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        sample = int(8000 * math.sin(2 * math.pi * frequency * i / rate))
+        frames += sample.to_bytes(2, "little", signed=True)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(frames))
+    return buf.getvalue()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of a process from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(port: int, profile: str, env_overrides: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "API_KEY": API_KEY,
+        "OPENAI_API_KEY": "bench",
+        "BENCH_PROFILE": profile,
+        # Every request comes from one client here
+        "RATE_LIMIT_ENABLED": "false",
+        **env_overrides,
+    }
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = log_path.open("w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, server: subprocess.Popen, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become healthy")
+
+
+class Results:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Counter] = {}
+
+    def add(self, endpoint: str, status: str, seconds: float) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds * 1000.0)
+        self.statuses.setdefault(endpoint, Counter())[status] += 1
+
+    def summary(self, duration_s: float) -> Dict[str, Any]:
+        report = {}
+        for endpoint, latencies in self.latencies.items():
+            statuses = self.statuses[endpoint]
+            ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+            report[endpoint] = {
+                "requests": len(latencies),
+                "statuses": dict(statuses),
+                "error_rate": round(1 - ok / len(latencies), 4),
+                "throughput_rps": round(ok / duration_s, 2),
+                "latency_ms": {
+                    "p50": round(percentile(latencies, 50), 1),
+                    "p95": round(percentile(latencies, 95), 1),
+                    "p99": round(percentile(latencies, 99), 1),
+                    "max": round(max(latencies), 1),
+                    "mean": round(sum(latencies) / len(latencies), 1),
+                },
+            }
+        return report
+
+
+async def send_one(client: httpx.AsyncClient, n: int, transcribe: bool, notes: List[str], results: Optional[Results]) -> None:
+    started = time.perf_counter()
+    try:
+        if transcribe:
+            endpoint = "/transcribe"
+            response = await client.post(endpoint, files={"audio": (f"clip-{n}.wav", wav_clip(n), "audio/wav")})
+        else:
+            endpoint = "/lead-intake"
+            response = await client.post(endpoint, json=lead_payload(notes, n))
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.TransportError as e:
+        status = type(e).__name__
+    if results is not None:
+        results.add(endpoint, status, time.perf_counter() - started)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    rps: float,
+    duration_s: float,
+    transcribe_share: float,
+    notes: List[str],
+    rng: random.Random,
+    first: int,
+    results: Optional[Results],
+) -> int:
+    """Send requests open-loop at `rps` for `duration_s`; returns the next request number."""
+    tasks = []
+    interval = 1.0 / rps
+    started = time.perf_counter()
+    n = first
+    while True:
+        due = started + (n - first) * interval
+        if due - started >= duration_s:
+            break
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        transcribe = rng.random() < transcribe_share
+        tasks.append(asyncio.create_task(send_one(client, n, transcribe, notes, results)))
+        n += 1
+    await asyncio.gather(*tasks)
+    return n
+
+
+async def sample_rss(pid: int, samples: List[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = rss_kb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    env_overrides = dict(item.split("=", 1) for item in args.env)
+    port = args.port or free_port()
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    server = start_server(port, args.profile, env_overrides, RESULTS_DIR / f"server-{run_id}.log")
+    rng = random.Random(args.seed)
+    notes = load_notes()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            headers={"X-API-KEY": API_KEY},
+            timeout=args.timeout,
+            limits=limits,
+        ) as client:
+            await wait_until_healthy(client, server)
+            rss_before = rss_kb(server.pid)
+
+            next_n = 0
+            if args.warmup > 0:
+                next_n = await drive(client, args.rps, args.warmup, args.transcribe_share, notes, rng, 0, None)
+
+            results = Results()
+            rss_samples: List[int] = []
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample_rss(server.pid, rss_samples, stop))
+            started = time.perf_counter()
+            await drive(client, args.rps, args.duration, args.transcribe_share, notes, rng, next_n, results)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await sampler
+
+            status = (await client.get("/status")).json()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    return {
+        "run_id": run_id,
+        "git_revision": git_revision(),
+        "config": {
+            "rps": args.rps,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "transcribe_share": args.transcribe_share,
+            "seed": args.seed,
+            "profile": json.loads(args.profile or "{}"),
+            "env": env_overrides,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "endpoints": results.summary(elapsed),
+        "server_rss_kb": {
+            "before": rss_before,
+            "peak": max(rss_samples) if rss_samples else None,
+            "end": rss_samples[-1] if rss_samples else None,
+        },
+        "server_status": status,
+    }
+
+
+def _delta(old: Optional[float], new: Optional[float]) -> str:
+    if old is None or new is None:
+        return f"{old} -> {new}"
+    change = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+    return f"{old} -> {new}{change}"
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Human-readable differences in the headline numbers of two reports."""
+    lines = [f"{old.get('git_revision')} ({old.get('run_id')}) -> {new.get('git_revision')} ({new.get('run_id')})"]
+    for endpoint in sorted(set(old["endpoints"]) | set(new["endpoints"])):
+        before, after = old["endpoints"].get(endpoint), new["endpoints"].get(endpoint)
+        if before is None or after is None:
+            lines.append(f"{endpoint}: only in {'new' if before is None else 'old'} report")
+            continue
+        lines.append(f"{endpoint}:")
+        for key in ("p50", "p95", "p99", "max"):
+            lines.append(f"  {key:<4} ms  {_delta(before['latency_ms'][key], after['latency_ms'][key])}")
+        lines.append(f"  throughput  {_delta(before['throughput_rps'], after['throughput_rps'])}")
+        lines.append(f"  error rate  {_delta(before['error_rate'], after['error_rate'])}")
+    lines.append(f"peak RSS kB  {_delta(old['server_rss_kb']['peak'], new['server_rss_kb']['peak'])}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0, help="Requests per second (both endpoints together)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--transcribe-share", type=float, default=0.0, help="Fraction of requests sent to /transcribe")
+    parser.add_argument("--profile", default="", help="JSON latency profile for the fakes (see benchmarks/fakes.py)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra server environment")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the request mix")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--max-connections", type=int, default=200, help="Client connection pool size")
+    parser.add_argument("--port", type=int, default=0, help="Server port (default: a free port)")
+    parser.add_argument("--output", type=Path, help="Report path (default: benchmarks/results/load-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier report to print the differences against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = args.output or RESULTS_DIR / f"load-{report['run_id']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    print(json.dumps({"endpoints": report["endpoints"], "server_rss_kb": report["server_rss_kb"]}, indent=2))
+    print(f"Report written to {output}", file=sys.stderr)
+    if args.compare:
+        print("\n".join(compare(json.loads(args.compare.read_text()), report)))
+
+
+if __name__ == "__main__":
+    main()
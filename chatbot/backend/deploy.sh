@@ -89,9 +89,11 @@ DEPLOY_CMD=(
   --port 8080
   --memory 512Mi
   --cpu 1
+  --no-cpu-throttling
   --min-instances 0
   --max-instances 3
   --timeout 60
+  --startup-probe "httpGet.path=/health,periodSeconds=2,timeoutSeconds=2,failureThreshold=30"
   --quiet
 )
 
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+# Settings are read once per process; keep the tests off any real
+# credentials in the developer's environment or .env file
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+# The rate limiter has tests of its own; app-level tests send many requests
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+for name in (
+    "GOOGLE_SERVICE_ACCOUNT_JSON",
+    "GOOGLE_SERVICE_ACCOUNT_JSON_B64",
+    "GOOGLE_SERVICE_ACCOUNT_JSON_PATH",
+    "GOOGLE_SHEET_ID",
+    "LEAD_JOURNAL_DIR",
+    "API_KEY",
+):
+    os.environ[name] = ""
+
+
+class FakeClock:
+    """Stands in for the `time` module of the code under test; tests move `now`."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(request, monkeypatch) -> FakeClock:
+    """
+    A `FakeClock` patched in as `time` of the modules named by the test's
+    `fake_clock` marker, e.g. `pytestmark = pytest.mark.fake_clock(concurrency)`.
+    """
+    marker = request.node.get_closest_marker("fake_clock")
+    if marker is None or not marker.args:
+        raise pytest.UsageError("the clock fixture needs @pytest.mark.fake_clock(<module>, ...)")
+    clock = FakeClock()
+    for module in marker.args:
+        monkeypatch.setattr(module, "time", clock)
+    return clock
+
+
+async def ok():
+    return "ok"
+
+
+def raising(error: BaseException):
+    """An async call that raises `error`."""
+
+    async def call():
+        raise error
+
+    return call
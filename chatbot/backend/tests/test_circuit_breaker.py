@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from app import circuit_breaker
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.concurrency import LimiterSaturatedError
+from app.executors import ExecutorSaturatedError
+from conftest import ok, raising
+
+pytestmark = pytest.mark.fake_clock(circuit_breaker)
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {"error_rate": 0.5, "min_calls": 4, "window_s": 60.0, "open_s": 30.0}
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def run(breaker: CircuitBreaker, call, **kwargs):
+    return asyncio.run(breaker.call(call, **kwargs))
+
+
+def fail(breaker: CircuitBreaker, error: BaseException = None) -> None:
+    error = error or ConnectionError("refused")
+    with pytest.raises(type(error)):
+        run(breaker, raising(error))
+
+
+def test_opens_once_the_error_rate_is_reached(clock):
+    breaker = make_breaker()
+    run(breaker, ok)
+    fail(breaker)
+    fail(breaker)
+    # 2 of 3 calls failed, but fewer than min_calls outcomes are known
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 1
+    assert breaker.last_error == "ConnectionError: refused"
+
+    with pytest.raises(CircuitOpenError):
+        run(breaker, ok)
+    assert breaker.rejected == 1
+
+
+def test_failures_outside_the_window_are_forgotten(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    fail(breaker)
+    fail(breaker)
+    clock.now += 61
+    run(breaker, ok)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+
+def test_is_failure_results_count_as_failures(clock):
+    breaker = make_breaker(min_calls=2)
+    for _ in range(2):
+        run(breaker, ok, is_failure=lambda result: result == "ok")
+    assert breaker.state == OPEN
+    assert breaker.last_error == "call reported failure"
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ExecutorSaturatedError("sheets executor queue is full"), LimiterSaturatedError("openai queue is full")],
+)
+def test_local_saturation_is_not_a_dependency_failure(clock, error):
+    breaker = make_breaker(min_calls=2)
+    for _ in range(5):
+        fail(breaker, error)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+    assert breaker.last_error is None
+
+
+def test_cancelled_calls_are_not_counted(clock):
+    breaker = make_breaker(min_calls=2)
+    for _ in range(3):
+        fail(breaker, asyncio.CancelledError())
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        fail(breaker)
+    assert breaker.state == OPEN
+
+
+def test_half_open_after_open_s(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 29
+    assert breaker.state == OPEN
+    assert breaker.stats()["open_for_s"] == pytest.approx(1.0)
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    assert run(breaker, ok) == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+    run(breaker, ok)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    fail(breaker)
+    assert breaker.state == OPEN
+    # Reopening after a probe is not counted as a new opening
+    assert breaker.times_opened == 1
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        run(breaker, ok)
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+
+
+def test_only_half_open_max_calls_probes_at_once(clock):
+    breaker = make_breaker(half_open_max_calls=1)
+    open_breaker(breaker)
+    clock.now += 30
+
+    async def _run():
+        release = asyncio.Event()
+
+        async def slow_probe():
+            await release.wait()
+            return "ok"
+
+        probe = asyncio.create_task(breaker.call(slow_probe))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(ok)
+        release.set()
+        return await probe
+
+    assert asyncio.run(_run()) == "ok"
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.parametrize(
+    "error",
+    [asyncio.CancelledError(), ExecutorSaturatedError("sheets executor queue is full")],
+)
+def test_unjudged_probe_releases_its_slot(clock, error):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 30
+    fail(breaker, error)
+    assert breaker.state == HALF_OPEN
+    # The slot is free again for the next probe
+    run(breaker, ok)
+    assert breaker.state == CLOSED
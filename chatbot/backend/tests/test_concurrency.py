@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+
+from app import concurrency
+from app.concurrency import PRIORITY_LEAD, PRIORITY_TRANSCRIPTION, AdaptiveLimiter, LimiterSaturatedError
+from conftest import ok, raising
+
+pytestmark = pytest.mark.fake_clock(concurrency)
+
+
+def make_limiter(**kwargs) -> AdaptiveLimiter:
+    return AdaptiveLimiter("test", **kwargs)
+
+
+async def timeout():
+    raise TimeoutError("upstream timed out")
+
+
+async def settle():
+    """Let every ready task run until it blocks again."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Holders:
+    """Calls that hold a limiter slot until released."""
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.release = asyncio.Event()
+        self.tasks = []
+
+    async def _hold(self):
+        await self.release.wait()
+        return "held"
+
+    async def add(self, count: int = 1, priority: int = PRIORITY_LEAD) -> None:
+        for _ in range(count):
+            self.tasks.append(asyncio.create_task(self.limiter.run(self._hold, priority)))
+        await settle()
+
+    async def finish(self):
+        self.release.set()
+        return await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+def test_limit_grows_by_one_per_limit_successes_while_demand_reaches_it(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=2, max_limit=4)
+        holders = Holders(limiter)
+        # With one slot held, each call brings demand up to the limit of 2
+        await holders.add(1)
+        for _ in range(2):
+            await limiter.run(ok)
+        assert limiter.limit == 2  # 2 -> 2.5 -> 2.9
+        await limiter.run(ok)
+        assert limiter.limit == 3  # -> 3.24
+
+        # Demand (2) is below the limit now, so it stays put
+        for _ in range(5):
+            await limiter.run(ok)
+        assert limiter.limit == 3
+
+        await holders.add(1)
+        for _ in range(10):
+            await limiter.run(ok)
+        assert limiter.limit == 4  # capped at max_limit
+        await holders.finish()
+        return limiter
+
+    limiter = asyncio.run(_run())
+    assert limiter.stats()["completed"] == 20
+
+
+def test_slow_success_holds_the_limit(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=1, latency_tolerance=2.0)
+
+        async def call(duration: float):
+            clock.now += duration
+            return "ok"
+
+        await limiter.run(lambda: call(1.0))
+        assert limiter.limit == 2
+        holders = Holders(limiter)
+        await holders.add(1)
+        await limiter.run(lambda: call(3.0))
+        assert limiter.limit == 2  # 3s is over twice the 1s average
+        await limiter.run(lambda: call(1.0))
+        await holders.finish()
+        return limiter
+
+    assert asyncio.run(_run()).stats()["limit"] == 2
+
+
+def test_overload_cuts_the_limit_multiplicatively(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=8, min_limit=3, backoff=0.5)
+        with pytest.raises(TimeoutError):
+            await limiter.run(timeout)
+        assert limiter.limit == 4
+        clock.now += 1
+        with pytest.raises(TimeoutError):
+            await limiter.run(timeout)
+        assert limiter.limit == 3  # not below min_limit
+        # Other errors say nothing about load
+        with pytest.raises(ValueError):
+            await limiter.run(raising(ValueError("bad request")))
+        return limiter
+
+    stats = asyncio.run(_run()).stats()
+    assert stats["limit"] == 3
+    assert stats["overloads"] == 2
+    assert stats["decreases"] == 2
+
+
+def test_one_burst_of_overloads_cuts_the_limit_once(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=8, backoff=0.5)
+        burst = asyncio.Event()
+
+        async def overloaded():
+            await burst.wait()
+            raise TimeoutError("429")
+
+        tasks = [asyncio.create_task(limiter.run(overloaded)) for _ in range(4)]
+        await settle()
+        clock.now += 1
+        burst.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, TimeoutError) for result in results)
+        assert limiter.limit == 4
+        assert (limiter.overloads, limiter.decreases) == (4, 1)
+
+        # A call started after the cut can cut again
+        clock.now += 1
+        with pytest.raises(TimeoutError):
+            await limiter.run(timeout)
+        assert limiter.limit == 2
+        return limiter
+
+    assert asyncio.run(_run()).decreases == 2
+
+
+def test_waiters_run_by_priority_then_arrival(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=1)
+        holders = Holders(limiter)
+        await holders.add(1)
+        order = []
+
+        def call(name: str):
+            async def _call():
+                order.append(name)
+
+            return _call
+
+        tasks = [
+            asyncio.create_task(limiter.run(call("transcription-1"), PRIORITY_TRANSCRIPTION)),
+            asyncio.create_task(limiter.run(call("lead-1"), PRIORITY_LEAD)),
+            asyncio.create_task(limiter.run(call("lead-2"), PRIORITY_LEAD)),
+        ]
+        await settle()
+        assert limiter.stats()["queued"] == {"transcription": 1, "lead": 2}
+        await holders.finish()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(_run()) == ["lead-1", "lead-2", "transcription-1"]
+
+
+def test_full_queue_displaces_lower_priority_or_rejects(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=1, max_queue=1)
+        holders = Holders(limiter)
+        await holders.add(1)
+
+        transcription = asyncio.create_task(limiter.run(ok, PRIORITY_TRANSCRIPTION))
+        await settle()
+        lead = asyncio.create_task(limiter.run(ok, PRIORITY_LEAD))
+        await settle()
+        # The lead call took the transcription call's place in the queue
+        with pytest.raises(LimiterSaturatedError, match="displaced"):
+            await transcription
+        assert limiter.stats()["queued"] == {"lead": 1}
+
+        # Nothing of a lower priority is left to displace
+        with pytest.raises(LimiterSaturatedError, match="queue full"):
+            await limiter.run(ok, PRIORITY_LEAD)
+        with pytest.raises(LimiterSaturatedError, match="queue full"):
+            await limiter.run(ok, PRIORITY_TRANSCRIPTION)
+
+        await holders.finish()
+        assert await lead == "ok"
+        return limiter
+
+    stats = asyncio.run(_run()).stats()
+    assert stats["rejected"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["queued"] == {}
+
+
+def test_cancelled_waiter_leaves_the_queue(clock):
+    async def _run():
+        limiter = make_limiter(initial_limit=1)
+        holders = Holders(limiter)
+        await holders.add(1)
+        waiter = asyncio.create_task(limiter.run(ok))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.stats()["queued"] == {}
+        await holders.finish()
+        assert await limiter.run(ok) == "ok"
+        return limiter
+
+    assert asyncio.run(_run()).stats()["in_flight"] == 0
@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.gmail_service import MockGmailService, get_gmail_service
+from app.services.openai_service import get_openai_service
+from app.services.sheets_service import MockSheetsService, get_sheets_service
+
+
+class CountingSheets(MockSheetsService):
+    def __init__(self):
+        self.appended = []
+
+    async def append_lead(self, row_data):
+        self.appended.append(row_data["lead_id"])
+
+
+class OfflineOpenAI:
+    async def extract_lead_data(self, freeform_note, role=None, timeout_s=None):
+        raise RuntimeError("offline")
+
+
+@pytest.fixture
+def client():
+    sheets = CountingSheets()
+    app.dependency_overrides[get_openai_service] = OfflineOpenAI
+    app.dependency_overrides[get_sheets_service] = lambda: sheets
+    app.dependency_overrides[get_gmail_service] = MockGmailService
+    try:
+        yield TestClient(app), sheets
+    finally:
+        app.dependency_overrides.clear()
+
+
+def lead(note: str) -> dict:
+    return {
+        "freeform_note": note,
+        "contact": {"name": "Ann Lee", "company": "Acme", "email": "ann@example.com"},
+    }
+
+
+def test_repeat_with_same_body_returns_the_original_response(client):
+    http, sheets = client
+    body = lead("Need 5000 amber dropper bottles a month for tinctures")
+    first = http.post("/lead-intake", json=body, headers={"Idempotency-Key": "same-body"})
+    second = http.post("/lead-intake", json=body, headers={"Idempotency-Key": "same-body"})
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["lead_id"] == second.json()["lead_id"]
+    assert len(sheets.appended) == 1
+
+
+def test_reuse_with_a_different_body_is_rejected(client):
+    http, sheets = client
+    first = http.post(
+        "/lead-intake",
+        json=lead("Need 5000 amber dropper bottles a month for tinctures"),
+        headers={"Idempotency-Key": "changed-body"},
+    )
+    second = http.post(
+        "/lead-intake",
+        json=lead("Need 200 clear glass jars with lids for a new candle line"),
+        headers={"Idempotency-Key": "changed-body"},
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    assert "different request body" in second.json()["detail"]
+    assert len(sheets.appended) == 1
+
+
+def test_different_keys_are_independent(client):
+    http, sheets = client
+    body = lead("Need 5000 amber dropper bottles a month for tinctures")
+    first = http.post("/lead-intake", json=body, headers={"Idempotency-Key": "key-a"})
+    second = http.post("/lead-intake", json=body, headers={"Idempotency-Key": "key-b"})
+
+    assert first.json()["lead_id"] != second.json()["lead_id"]
+    assert len(sheets.appended) == 2
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.main import app
+from app.services.gmail_service import MockGmailService, get_gmail_service
+from app.services.openai_service import get_openai_service
+from app.services.sheets_service import MockSheetsService, SheetsBatchWriter, get_sheets_service
+
+BODY = {
+    "freeform_note": "Need 5000 amber dropper bottles a month for tinctures in Colorado",
+    "contact": {"name": "Ann Lee", "company": "Acme", "email": "ann@example.com"},
+}
+
+
+class OfflineOpenAI:
+    async def extract_lead_data(self, freeform_note, role=None, timeout_s=None):
+        raise RuntimeError("offline")
+
+
+class BatchedSheets(MockSheetsService):
+    """The real batch writer in front of a slow `append_rows`."""
+
+    def __init__(self, window_s: float, write_s: float):
+        self.write_s = write_s
+        self.written = []
+        self.updated = []
+        self.writer = SheetsBatchWriter(self._append_rows_sync, window_s=window_s)
+
+    def _append_rows_sync(self, rows):
+        time.sleep(self.write_s)
+        self.written.extend(row["lead_id"] for row in rows)
+
+    async def append_lead(self, row_data):
+        await self.writer.submit(dict(row_data))
+
+    async def update_lead(self, lead_id, updates):
+        self.updated.append(lead_id)
+        return True
+
+
+@pytest.fixture
+def intake(monkeypatch):
+    monkeypatch.setattr(get_settings(), "lead_intake_deadline_s", 0.2)
+    app.dependency_overrides[get_openai_service] = OfflineOpenAI
+    app.dependency_overrides[get_gmail_service] = MockGmailService
+
+    def _client(sheets):
+        app.dependency_overrides[get_sheets_service] = lambda: sheets
+        return TestClient(app)
+
+    try:
+        yield _client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_deadline_during_the_write_reports_the_written_row(intake):
+    # The flush takes the row at once and is still writing when the deadline passes
+    sheets = BatchedSheets(window_s=0.0, write_s=0.4)
+    response = intake(sheets).post("/lead-intake", json=BODY)
+
+    assert response.status_code == 200
+    lead_id = response.json()["lead_id"]
+    assert sheets.written == [lead_id]
+
+
+def test_deadline_before_the_flush_writes_nothing(intake):
+    # The batch window outlasts the deadline, so the row is still queued
+    sheets = BatchedSheets(window_s=0.5, write_s=0.0)
+    response = intake(sheets).post("/lead-intake", json=BODY)
+
+    assert response.status_code == 504
+    time.sleep(0.7)
+    assert sheets.written == []
+    assert sheets.writer.rows_withdrawn == 1
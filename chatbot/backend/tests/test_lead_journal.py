@@ -0,0 +1,343 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services import lead_delivery
+from app.services.lead_delivery import (
+    STAGE_ENRICHMENT,
+    STAGE_EXTRACTION,
+    STAGE_SHEETS,
+    LeadJournalDrainer,
+    is_permanent_failure,
+)
+from app.services.lead_journal import CHECKPOINT_FILE, DEAD_LETTER_FILE, LeadJournal
+
+
+def lead_record(n: int) -> dict:
+    lead_id = f"lead-{n}"
+    return {
+        "lead_id": lead_id,
+        "row": {"lead_id": lead_id, "company": "Acme", "contact_name": "Ann Lee", "email": "ann@example.com"},
+        "lead": {"freeform_note": "Need 5000 glass dropper bottles a month for CBD tinctures", "role": None},
+    }
+
+
+class HTTPError(Exception):
+    """Stand-in for gspread's APIError: carries the HTTP response."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+class FakeSheets:
+    def __init__(self, failures=None):
+        # lead_id -> exceptions to raise on its next appends, in order
+        self.failures = {key: list(value) for key, value in (failures or {}).items()}
+        self.appended = []
+        self.updated = []
+
+    async def append_lead(self, row):
+        pending = self.failures.get(row["lead_id"])
+        if pending:
+            raise pending.pop(0)
+        self.appended.append(row["lead_id"])
+
+    async def update_lead(self, lead_id, updates):
+        self.updated.append(lead_id)
+        return True
+
+
+class FakeGmail:
+    def __init__(self):
+        self.sent = []
+
+    async def send_lead_emails(self, notification, confirmation):
+        self.sent.append(notification["lead_id"])
+        return True, True
+
+
+@pytest.fixture
+def services(monkeypatch):
+    sheets, gmail = FakeSheets(), FakeGmail()
+    monkeypatch.setattr(lead_delivery, "get_sheets_service", lambda: sheets)
+    monkeypatch.setattr(lead_delivery, "get_gmail_service", lambda: gmail)
+    monkeypatch.setattr(lead_delivery, "_optional_openai_service", lambda: None)
+    return sheets, gmail
+
+
+def drain(journal: LeadJournal, until_seq: int, timeout_s: float = 5.0) -> LeadJournalDrainer:
+    """Run a drainer until `until_seq` is drained (or the timeout passes)."""
+
+    async def _run() -> LeadJournalDrainer:
+        drainer = LeadJournalDrainer(journal, idle_interval_s=0.01, retry_initial_s=0.01, retry_max_s=0.02)
+        drainer.start()
+        deadline = asyncio.get_running_loop().time() + timeout_s
+        while journal.drained_seq < until_seq and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+        await drainer.stop(timeout=1.0)
+        return drainer
+
+    return asyncio.run(_run())
+
+
+def append(journal: LeadJournal, record: dict) -> int:
+    return asyncio.run(journal.append(record))
+
+
+def test_entries_survive_reopening(tmp_path):
+    journal = LeadJournal(str(tmp_path))
+    seqs = [append(journal, lead_record(n)) for n in range(3)]
+    journal.close()
+
+    reopened = LeadJournal(str(tmp_path))
+    assert seqs == [1, 2, 3]
+    assert [entry["lead_id"] for entry in reopened.pending()] == ["lead-0", "lead-1", "lead-2"]
+    # New entries continue the sequence in a fresh segment
+    assert append(reopened, lead_record(3)) == 4
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) == 2
+
+
+def test_torn_tail_is_skipped(tmp_path):
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    journal.close()
+    segment = next(tmp_path.glob("segment-*.jsonl"))
+    with segment.open("a") as f:
+        f.write('{"lead_id": "lead-1", "se')
+
+    reopened = LeadJournal(str(tmp_path))
+    assert [entry["seq"] for entry in reopened.pending()] == [1]
+    assert append(reopened, lead_record(2)) == 2
+
+
+def test_segments_rotate_and_compact(tmp_path):
+    journal = LeadJournal(str(tmp_path), segment_max_bytes=300)
+    for n in range(6):
+        append(journal, lead_record(n))
+    segments = sorted(tmp_path.glob("segment-*.jsonl"))
+    assert len(segments) > 2
+    assert [entry["seq"] for entry in journal.pending()] == [1, 2, 3, 4, 5, 6]
+
+    journal.mark_drained(4)
+    removed = journal.compact()
+    assert removed >= 1
+    assert [entry["seq"] for entry in journal.pending()] == [5, 6]
+    # The active segment is never removed
+    assert journal._active_file is not None and (tmp_path / journal._active_file.name).exists()
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    append(journal, lead_record(1))
+    journal.mark_drained(1)
+    journal.mark_stage_done(2, STAGE_SHEETS)
+    journal.mark_stage_done(2, STAGE_EXTRACTION, {"ai_summary": "x"})
+    journal.close()
+
+    reopened = LeadJournal(str(tmp_path))
+    assert reopened.drained_seq == 1
+    assert [entry["seq"] for entry in reopened.pending()] == [2]
+    assert reopened.completed_stages(2) == [STAGE_SHEETS, STAGE_EXTRACTION]
+    assert reopened.stage_results(2) == {STAGE_EXTRACTION: {"ai_summary": "x"}}
+    assert json.loads((tmp_path / CHECKPOINT_FILE).read_text())["drained_seq"] == 1
+
+
+def test_drainer_delivers_in_order(tmp_path, services):
+    sheets, gmail = services
+    journal = LeadJournal(str(tmp_path))
+    for n in range(3):
+        append(journal, lead_record(n))
+
+    drain(journal, until_seq=3)
+
+    assert sheets.appended == ["lead-0", "lead-1", "lead-2"]
+    assert sheets.updated == ["lead-0", "lead-1", "lead-2"]
+    assert gmail.sent == ["lead-0", "lead-1", "lead-2"]
+    assert journal.pending() == []
+
+
+def test_drainer_retries_transient_failures(tmp_path, services):
+    sheets, _ = services
+    sheets.failures = {"lead-0": [TimeoutError("slow"), HTTPError(503)]}
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    append(journal, lead_record(1))
+
+    drainer = drain(journal, until_seq=2)
+
+    assert sheets.appended == ["lead-0", "lead-1"]
+    assert drainer.dead_lettered == 0
+    assert journal.dead_letters() == []
+
+
+def test_entries_journaled_before_a_crash_are_delivered_on_restart(tmp_path, services):
+    sheets, _ = services
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    append(journal, lead_record(1))
+    # The process dies before the drainer gets to them
+    journal.close()
+
+    reopened = LeadJournal(str(tmp_path))
+    drain(reopened, until_seq=2)
+
+    assert sheets.appended == ["lead-0", "lead-1"]
+    assert reopened.pending() == []
+
+
+def test_replay_after_crash_resumes_from_checkpoint(tmp_path, services):
+    sheets, gmail = services
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    # A previous process appended the row and extracted, then died before
+    # the update and the emails
+    journal.mark_stage_done(1, STAGE_SHEETS)
+    journal.mark_stage_done(1, STAGE_EXTRACTION, lead_delivery.fallback_extraction("note").model_dump(mode="json"))
+    journal.close()
+
+    reopened = LeadJournal(str(tmp_path))
+    drain(reopened, until_seq=1)
+
+    assert sheets.appended == []
+    assert sheets.updated == ["lead-0"]
+    assert gmail.sent == ["lead-0"]
+    assert reopened.drained_seq == 1
+
+
+def test_stage_is_repeated_when_its_checkpoint_is_lost(tmp_path, services, monkeypatch):
+    # At least once: a stage that finished without being checkpointed is repeated
+    sheets, gmail = services
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+
+    mark_stage_done = journal.mark_stage_done
+    lost = []
+
+    def _mark_stage_done(seq, stage, result=None):
+        if stage == STAGE_SHEETS and not lost:
+            lost.append(seq)
+            raise OSError("checkpoint write failed")
+        mark_stage_done(seq, stage, result)
+
+    monkeypatch.setattr(journal, "mark_stage_done", _mark_stage_done)
+    drain(journal, until_seq=1)
+
+    assert sheets.appended == ["lead-0", "lead-0"]
+    assert gmail.sent == ["lead-0"]
+    assert journal.drained_seq == 1
+
+
+def test_permanent_failure_is_dead_lettered(tmp_path, services):
+    sheets, gmail = services
+    sheets.failures = {"lead-0": [HTTPError(400)]}
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+    append(journal, lead_record(1))
+
+    drainer = drain(journal, until_seq=2)
+
+    assert sheets.appended == ["lead-1"]
+    assert gmail.sent == ["lead-1"]
+    assert drainer.dead_lettered == 1
+    dead = journal.dead_letters()
+    assert [entry["lead_id"] for entry in dead] == ["lead-0"]
+    assert "HTTP 400" in dead[0]["error"]
+    assert (tmp_path / DEAD_LETTER_FILE).exists()
+    assert journal.pending() == []
+
+
+def test_malformed_entry_is_dead_lettered(tmp_path, services):
+    sheets, _ = services
+    journal = LeadJournal(str(tmp_path))
+    append(journal, {"lead_id": "broken"})
+    append(journal, lead_record(1))
+
+    drain(journal, until_seq=2)
+
+    assert sheets.appended == ["lead-1"]
+    assert [entry["lead_id"] for entry in journal.dead_letters()] == ["broken"]
+
+
+@pytest.mark.parametrize(
+    "error, permanent",
+    [
+        (HTTPError(400), True),
+        (HTTPError(422), True),
+        (HTTPError(403), False),
+        (HTTPError(429), False),
+        (HTTPError(503), False),
+        (KeyError("row"), True),
+        (TimeoutError(), False),
+        (RuntimeError("circuit open"), False),
+    ],
+)
+def test_is_permanent_failure(error, permanent):
+    assert is_permanent_failure(error) is permanent
+
+
+class SlowGmail(FakeGmail):
+    async def send_lead_emails(self, notification, confirmation):
+        await asyncio.sleep(10)
+        return await super().send_lead_emails(notification, confirmation)
+
+
+def test_interrupted_enrichment_is_journaled_and_resumed(tmp_path, services):
+    sheets, gmail = services
+    journal = LeadJournal(str(tmp_path))
+
+    async def _shutdown():
+        lead_delivery.start_lead_enrichment(lead_record(0), None, sheets, SlowGmail())
+        await asyncio.sleep(0.05)
+        started = asyncio.get_running_loop().time()
+        await lead_delivery.wait_for_lead_enrichment(timeout=0.1, journal=journal)
+        return asyncio.get_running_loop().time() - started
+
+    elapsed = asyncio.run(_shutdown())
+    assert elapsed < 1.0
+    [entry] = journal.pending()
+    assert entry["completed"] == [STAGE_SHEETS, STAGE_EXTRACTION, STAGE_ENRICHMENT]
+    assert STAGE_EXTRACTION in entry["results"]
+
+    # After the restart only the emails are left
+    drain(journal, until_seq=1)
+    assert sheets.appended == []
+    assert sheets.updated == ["lead-0"]
+    assert gmail.sent == ["lead-0"]
+
+
+def test_interrupted_enrichment_without_journal_is_logged(services, caplog):
+    sheets, _ = services
+
+    async def _shutdown():
+        lead_delivery.start_lead_enrichment(lead_record(0), None, sheets, SlowGmail())
+        await asyncio.sleep(0.05)
+        await lead_delivery.wait_for_lead_enrichment(timeout=0.1)
+
+    asyncio.run(_shutdown())
+    errors = [record.getMessage() for record in caplog.records if record.levelname == "ERROR"]
+    assert any("lead-0" in message and "interrupted by shutdown" in message for message in errors)
+
+
+def test_drainer_stop_is_bounded(tmp_path, services, monkeypatch):
+    sheets, _ = services
+
+    async def _hang(row):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(sheets, "append_lead", _hang)
+    journal = LeadJournal(str(tmp_path))
+    append(journal, lead_record(0))
+
+    async def _run():
+        drainer = LeadJournalDrainer(journal, idle_interval_s=0.01)
+        drainer.start()
+        await asyncio.sleep(0.05)
+        started = asyncio.get_running_loop().time()
+        await drainer.stop(timeout=0.1)
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(_run()) < 0.5
+    assert journal.drained_seq == 0
@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.models.schemas import PriorityBand
+from app.services.local_extractor import extract_locally, find_monthly_volumes
+
+CORPUS = Path(__file__).resolve().parent.parent / "benchmarks" / "extraction_corpus.jsonl"
+
+
+@pytest.mark.parametrize(
+    "note",
+    [
+        "Need 10 oz jars a month in Michigan",
+        "We go through 4 oz tins every week for our salve line in Oregon.",
+        "Need 1,000 ml bottles a month in Ohio",
+        "2.5g mylar bags per month for California",
+    ],
+)
+def test_package_size_is_not_a_volume(note):
+    result = extract_locally(note)
+    assert result.extraction.estimated_monthly_volume is None
+    assert "volume_not_stated" in result.extraction.confidence_flags
+    assert result.extraction.priority_band != PriorityBand.LOW
+    assert not result.unambiguous
+
+
+@pytest.mark.parametrize(
+    "note, volumes",
+    [
+        ("Need 10 oz 5000 jars a month in Michigan", [5000]),
+        ("2 oz child resistant jars, 3,000 a month, shipping to Michigan", [3000]),
+        ("60ml dropper bottles, 8,000 units per month", [8000]),
+        ("5 oz jars, about 50k per month", [50000]),
+        ("1.5 million units a year", [125000]),
+        ("Need 10k jars a month", [10000]),
+    ],
+)
+def test_count_next_to_a_size_is_still_found(note, volumes):
+    assert find_monthly_volumes(note) == volumes
+
+
+def test_unambiguous_short_note():
+    result = extract_locally("Need 5000 glass dropper bottles a month for tinctures in Colorado")
+    assert result.unambiguous
+    assert result.extraction.estimated_monthly_volume == 5000
+    assert result.extraction.markets == ["Colorado"]
+
+
+def test_corpus_volumes():
+    with CORPUS.open() as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    size_cases = [case for case in cases if "oz " in case["note"] or "ml " in case["note"]]
+    assert size_cases
+    for case in size_cases:
+        extraction = extract_locally(case["note"], case["role"]).extraction
+        assert extraction.estimated_monthly_volume == case["expected"]["estimated_monthly_volume"], case["note"]
@@ -0,0 +1,62 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.body_limit import BodySizeLimitMiddleware
+from app.metrics import MetricsMiddleware
+from app.rate_limit import RateLimiter, RateLimitMiddleware
+
+
+def make_app() -> FastAPI:
+    """Middleware in the same order as app.main, on routes only this test uses."""
+    app = FastAPI()
+
+    @app.post("/metrics-test/upload")
+    async def upload():
+        return {"ok": True}
+
+    @app.get("/metrics-test/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(BodySizeLimitMiddleware, path_limits={"/metrics-test/upload": 10}, overhead_bytes=0)
+    app.add_middleware(
+        RateLimitMiddleware,
+        path_limiters={"/metrics-test/items/limited": RateLimiter("metrics_test", per_min=1, burst=1)},
+        forwarded_hops=0,
+    )
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def requests_total(method: str, route: str, status: int) -> float:
+    labels = {"method": method, "route": route, "status": str(status)}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+
+def test_responses_from_middleware_are_labelled_with_their_route():
+    client = TestClient(make_app())
+    before_413 = requests_total("POST", "/metrics-test/upload", 413)
+    before_429 = requests_total("GET", "/metrics-test/items/{item_id}", 429)
+
+    assert client.post("/metrics-test/upload", content=b"x" * 100).status_code == 413
+    assert client.get("/metrics-test/items/limited").status_code == 200
+    assert client.get("/metrics-test/items/limited").status_code == 429
+
+    assert requests_total("POST", "/metrics-test/upload", 413) == before_413 + 1
+    assert requests_total("GET", "/metrics-test/items/{item_id}", 429) == before_429 + 1
+
+
+def test_routed_and_unknown_paths():
+    client = TestClient(make_app())
+    before_200 = requests_total("GET", "/metrics-test/items/{item_id}", 200)
+    before_405 = requests_total("GET", "/metrics-test/upload", 405)
+    before_404 = requests_total("GET", "unmatched", 404)
+
+    assert client.get("/metrics-test/items/abc").status_code == 200
+    assert client.get("/metrics-test/upload").status_code == 405
+    assert client.get("/metrics-test/nothing-here").status_code == 404
+
+    assert requests_total("GET", "/metrics-test/items/{item_id}", 200) == before_200 + 1
+    assert requests_total("GET", "/metrics-test/upload", 405) == before_405 + 1
+    assert requests_total("GET", "unmatched", 404) == before_404 + 1
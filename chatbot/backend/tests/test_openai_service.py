@@ -0,0 +1,16 @@
+from app.config import get_settings
+from app.services import openai_service
+
+
+def test_client_does_not_retry_by_default(monkeypatch):
+    monkeypatch.setattr(openai_service, "_openai_service", None)
+    service = openai_service.get_openai_service()
+    assert get_settings().openai_max_retries == 0
+    assert service.client.max_retries == 0
+    assert service.client.timeout == get_settings().openai_timeout_s
+
+
+def test_client_retries_are_configurable(monkeypatch):
+    monkeypatch.setattr(openai_service, "_openai_service", None)
+    monkeypatch.setattr(get_settings(), "openai_max_retries", 2)
+    assert openai_service.get_openai_service().client.max_retries == 2
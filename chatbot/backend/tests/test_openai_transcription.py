@@ -0,0 +1,130 @@
+import asyncio
+import io
+import math
+import struct
+import wave
+
+from app.services.openai_service import OpenAIService
+
+
+class FakeWhisper:
+    """Stands in for `OpenAIService._transcribe_once`: reads the file it was given."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self, audio_file, filename):
+        self.calls += 1
+        await self.release.wait()
+        return audio_file.read().decode("utf-8")
+
+
+class RecordingWhisper:
+    """Stands in for `OpenAIService._transcribe_once`: answers with the file name it was sent."""
+
+    def __init__(self):
+        self.filenames = []
+
+    async def __call__(self, audio_file, filename):
+        self.filenames.append(filename)
+        return filename
+
+
+def make_service(whisper=None, **kwargs) -> OpenAIService:
+    kwargs.setdefault("preprocess_wav", False)
+    service = OpenAIService(api_key="sk-test", **kwargs)
+    service._transcribe_once = whisper or FakeWhisper()
+    return service
+
+
+def tone_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    """A loud 440 Hz tone as 16-bit mono PCM WAV."""
+    frames = b"".join(
+        struct.pack("<h", int(16000 * math.sin(2 * math.pi * 440 * n / rate))) for n in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+async def wait_until(condition, timeout_s: float = 2.0) -> None:
+    # The cache key is computed in a worker thread
+    async def _poll():
+        while not condition():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(_poll(), timeout=timeout_s)
+
+
+def test_shared_transcription_outlives_the_first_callers_upload():
+    async def _run():
+        service = make_service()
+        whisper = service._transcribe_once
+        cache = service.transcription_cache
+        first_upload = io.BytesIO(b"hello there")
+        second_upload = io.BytesIO(b"hello there")
+
+        first = asyncio.create_task(service.transcribe_audio(first_upload, "a.webm"))
+        await wait_until(lambda: whisper.calls == 1)
+        second = asyncio.create_task(service.transcribe_audio(second_upload, "a.webm"))
+        await wait_until(lambda: cache.coalesced == 1)
+
+        # The first client disconnects: its request is cancelled and
+        # Starlette closes its upload
+        first.cancel()
+        first_upload.close()
+        await asyncio.gather(first, return_exceptions=True)
+
+        whisper.release.set()
+        text = await second
+        return service, text
+
+    service, text = asyncio.run(_run())
+    assert text == "hello there"
+    assert service._transcribe_once.calls == 1
+    assert service.transcription_cache.stats()["entries"] == 1
+
+
+def test_cached_transcription_leaves_the_upload_usable():
+    async def _run():
+        service = make_service()
+        service._transcribe_once.release.set()
+        upload = io.BytesIO(b"hello again")
+        upload.seek(6)
+        first = await service.transcribe_audio(upload, "a.webm")
+        second = await service.transcribe_audio(upload, "a.webm")
+        return service, upload, first, second
+
+    service, upload, first, second = asyncio.run(_run())
+    # Only the audio after the upload's position is transcribed
+    assert first == second == "again"
+    assert upload.tell() == 6
+    assert service.transcription_cache.stats()["hits"] == 1
+    assert service._transcribe_once.calls == 1
+
+
+def test_wav_is_preprocessed_up_to_the_size_cap():
+    audio = tone_wav()
+    whisper = RecordingWhisper()
+    service = make_service(whisper, preprocess_wav=True, preprocess_max_bytes=len(audio))
+    assert asyncio.run(service.transcribe_audio(io.BytesIO(audio), "clip.wav")) == "clip-0.wav"
+
+
+def test_wav_over_the_size_cap_is_sent_unprocessed(monkeypatch):
+    from app.services import openai_service
+
+    def _preprocess(*args):
+        raise AssertionError("a WAV over the cap was decoded")
+
+    monkeypatch.setattr(openai_service, "_preprocess", _preprocess)
+    audio = tone_wav()
+    whisper = RecordingWhisper()
+    service = make_service(whisper, preprocess_wav=True, preprocess_max_bytes=len(audio) - 1)
+    assert asyncio.run(service.transcribe_audio(io.BytesIO(audio), "clip.wav")) == "clip.wav"
+    # Raw bytes (streamed segments) too; a longer clip, so it isn't a cache hit
+    assert asyncio.run(service.transcribe_audio(tone_wav(2.0), "bytes.wav")) == "bytes.wav"
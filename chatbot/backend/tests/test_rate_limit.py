@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.rate_limit import RateLimiter, RateLimitMiddleware, client_key
+
+
+def make_client(burst: int = 2) -> TestClient:
+    # app.main is built without the rate limiter in tests (see conftest.py)
+    app = FastAPI()
+
+    @app.post("/limited")
+    async def limited():
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        path_limiters={"/limited": RateLimiter("test", per_min=1, burst=burst)},
+        forwarded_hops=1,
+    )
+    return TestClient(app)
+
+
+def scope(query: bytes = b"", **headers: str) -> dict:
+    return {
+        "type": "http",
+        "client": ("10.0.0.1", 1234),
+        "query_string": query,
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    }
+
+
+def test_rotating_api_keys_does_not_reset_the_budget(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_key", "secret")
+    client = make_client(burst=2)
+    statuses = [
+        client.post("/limited", headers={"X-API-KEY": f"made-up-{n}"}).status_code
+        for n in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    rejected = client.post("/limited?api_key=made-up-query")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+
+
+def test_configured_api_key_gets_its_own_bucket(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_key", "secret")
+    client = make_client(burst=1)
+    assert client.post("/limited").status_code == 200
+    assert client.post("/limited").status_code == 429
+    assert client.post("/limited", headers={"X-API-KEY": "secret"}).status_code == 200
+    assert client.post("/limited", headers={"X-API-KEY": "secret"}).status_code == 429
+
+
+def test_clients_are_keyed_by_forwarded_address():
+    client = make_client(burst=1)
+    assert client.post("/limited", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 200
+    assert client.post("/limited", headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 429
+    # Entries left of the trusted hop are chosen by the client and ignored
+    assert client.post("/limited", headers={"X-Forwarded-For": "1.2.3.4, 203.0.113.1"}).status_code == 429
+    assert client.post("/limited", headers={"X-Forwarded-For": "203.0.113.2"}).status_code == 200
+
+
+def test_client_key(monkeypatch):
+    monkeypatch.setattr(get_settings(), "api_key", "p@ss word")
+    assert client_key(scope(x_api_key="p@ss word"), 0) == "10.0.0.1\x1fp@ss word"
+    # Query values are URL-decoded like the route's `api_key` parameter
+    assert client_key(scope(b"api_key=p%40ss+word"), 0) == "10.0.0.1\x1fp@ss word"
+    assert client_key(scope(b"api_key=p%40ss%20word"), 0) == "10.0.0.1\x1fp@ss word"
+    assert client_key(scope(b"api_key=wrong"), 0) == "10.0.0.1"
+    assert client_key(scope(x_api_key="wrong"), 0) == "10.0.0.1"
+
+    monkeypatch.setattr(get_settings(), "api_key", "")
+    assert client_key(scope(x_api_key="anything"), 0) == "10.0.0.1"
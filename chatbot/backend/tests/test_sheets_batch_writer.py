@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.sheets_service import SheetsBatchWriter
+
+
+class FakeAppendRows:
+    """Stands in for `SheetsService._append_rows_sync`: records each batch."""
+
+    def __init__(self, fail_batches=(), block: threading.Event = None):
+        self.batches = []
+        self.fail_batches = set(fail_batches)
+        self.block = block
+        self.started = threading.Event()
+
+    def __call__(self, rows):
+        self.started.set()
+        if self.block is not None:
+            self.block.wait(5)
+        number = len(self.batches)
+        self.batches.append([row["lead_id"] for row in rows])
+        if number in self.fail_batches:
+            raise RuntimeError(f"batch {number} failed")
+
+
+def row(n: int) -> dict:
+    return {"lead_id": f"lead-{n}"}
+
+
+def test_concurrent_rows_are_coalesced():
+    append_rows = FakeAppendRows()
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=0.02, max_rows=50)
+        await asyncio.gather(*(writer.submit(row(n)) for n in range(5)))
+        return writer.stats()
+
+    stats = asyncio.run(_run())
+    assert append_rows.batches == [[f"lead-{n}" for n in range(5)]]
+    assert stats["batches_flushed"] == 1
+    assert stats["rows_flushed"] == 5
+
+
+def test_full_batches_flush_without_waiting_for_the_window():
+    append_rows = FakeAppendRows()
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=10.0, max_rows=2)
+        await asyncio.wait_for(asyncio.gather(*(writer.submit(row(n)) for n in range(4))), timeout=2)
+
+    asyncio.run(_run())
+    assert append_rows.batches == [["lead-0", "lead-1"], ["lead-2", "lead-3"]]
+
+
+def test_failed_batch_only_fails_its_own_rows():
+    append_rows = FakeAppendRows(fail_batches={0})
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=10.0, max_rows=2)
+        results = await asyncio.gather(*(writer.submit(row(n)) for n in range(4)), return_exceptions=True)
+        return writer, results
+
+    writer, results = asyncio.run(_run())
+    assert [type(result).__name__ for result in results] == ["RuntimeError", "RuntimeError", "NoneType", "NoneType"]
+    assert writer.flush_failures == 1
+    assert append_rows.batches == [["lead-0", "lead-1"], ["lead-2", "lead-3"]]
+
+
+def test_cancelled_before_flush_is_not_written():
+    append_rows = FakeAppendRows()
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=0.05, max_rows=50)
+        cancelled = asyncio.create_task(writer.submit(row(0)))
+        kept = asyncio.create_task(writer.submit(row(1)))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        await kept
+        return writer
+
+    writer = asyncio.run(_run())
+    assert append_rows.batches == [["lead-1"]]
+    assert writer.rows_withdrawn == 1
+
+
+def test_only_pending_row_cancelled_cancels_the_timer():
+    append_rows = FakeAppendRows()
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=0.01, max_rows=50)
+        task = asyncio.create_task(writer.submit(row(0)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)
+        return writer
+
+    writer = asyncio.run(_run())
+    assert append_rows.batches == []
+    assert writer.stats()["pending_rows"] == 0
+    assert writer.batches_flushed == 0
+
+
+def test_cancelled_during_flush_reports_the_write():
+    release = threading.Event()
+    append_rows = FakeAppendRows(block=release)
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=0.0, max_rows=50)
+        task = asyncio.create_task(writer.submit(row(0)))
+        await asyncio.to_thread(append_rows.started.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        return await task
+
+    assert asyncio.run(_run()) is None
+    assert append_rows.batches == [["lead-0"]]
+
+
+def test_timeout_during_flush_is_not_reported_as_a_failure():
+    release = threading.Event()
+    append_rows = FakeAppendRows(block=release)
+
+    async def _run():
+        writer = SheetsBatchWriter(append_rows, window_s=0.0, max_rows=50)
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, release.set)
+        # The timeout fires while the batch is being written
+        await asyncio.wait_for(writer.submit(row(0)), timeout=0.05)
+
+    asyncio.run(_run())
+    assert append_rows.batches == [["lead-0"]]
@@ -0,0 +1,81 @@
+import asyncio
+
+import gspread
+import pytest
+import requests
+from google.oauth2 import service_account
+from gspread.exceptions import APIError
+
+from app.circuit_breaker import OPEN, CircuitBreaker
+from app.services.sheets_service import SHEET_COLUMNS, SheetsService
+
+
+def api_error(code: int) -> APIError:
+    response = requests.Response()
+    response.status_code = code
+    response._content = b'{"error": {"code": %d, "message": "backend error", "status": "UNAVAILABLE"}}' % code
+    return APIError(response)
+
+
+class FakeWorksheet:
+    """Worksheet holding the header and lead rows; `failures` are raised by the next reads."""
+
+    def __init__(self, lead_ids=()):
+        self.rows = [list(SHEET_COLUMNS)]
+        lead_column = SHEET_COLUMNS.index("lead_id")
+        for lead_id in lead_ids:
+            row = [""] * len(SHEET_COLUMNS)
+            row[lead_column] = lead_id
+            self.rows.append(row)
+        self.failures = []
+
+    def _read(self):
+        if self.failures:
+            raise self.failures.pop(0)
+
+    def row_values(self, row):
+        self._read()
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self._read()
+        return [row[col - 1] for row in self.rows]
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    # No Google credentials or client in tests
+    monkeypatch.setattr(service_account.Credentials, "from_service_account_info", lambda *a, **k: None)
+    monkeypatch.setattr(gspread, "authorize", lambda *a, **k: None)
+
+    def _make(worksheet: FakeWorksheet) -> SheetsService:
+        service = SheetsService({}, "sheet-id")
+        service._sheet = worksheet
+        service.breaker = CircuitBreaker("sheets-test", min_calls=2)
+        return service
+
+    return _make
+
+
+def test_lookup_finds_lead_or_returns_none(make_service):
+    service = make_service(FakeWorksheet(["lead-1", "lead-2"]))
+    assert asyncio.run(service.get_lead_by_id("lead-2"))["lead_id"] == "lead-2"
+    assert asyncio.run(service.get_lead_by_id("lead-3")) is None
+    assert service.breaker.stats()["window_failures"] == 0
+
+
+@pytest.mark.parametrize("error", [api_error(503), requests.ConnectionError("connection reset")])
+def test_failed_lookup_is_raised_and_recorded(make_service, error):
+    worksheet = FakeWorksheet(["lead-1"])
+    service = make_service(worksheet)
+    service.warm_up()
+
+    worksheet.failures = [error, error]
+    for _ in range(2):
+        with pytest.raises(type(error)):
+            asyncio.run(service.get_lead_by_id("lead-1"))
+    assert service.breaker.state == OPEN
+
+    if isinstance(error, APIError):
+        # The header row is re-read after an API error
+        assert service._column_index is None
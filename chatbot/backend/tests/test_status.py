@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import openai_service, sheets_service
+
+
+def test_status_does_not_create_services(monkeypatch):
+    monkeypatch.setattr(openai_service, "_openai_service", None)
+    monkeypatch.setattr(sheets_service, "_sheets_service", None)
+    # Without the lifespan, so nothing is warmed up
+    client = TestClient(app)
+
+    body = client.get("/status").json()
+    assert body["openai"] is None
+    assert body["sheets"] is None
+    assert openai_service._openai_service is None
+    assert sheets_service._sheets_service is None
+    assert client.get("/metrics").status_code == 200
+    assert openai_service._openai_service is None
+    assert sheets_service._sheets_service is None
+
+
+def test_status_reports_created_services(monkeypatch):
+    monkeypatch.setattr(openai_service, "_openai_service", None)
+    monkeypatch.setattr(sheets_service, "_sheets_service", None)
+    openai_service.get_openai_service()
+    sheets_service.get_sheets_service()
+
+    body = TestClient(app).get("/status").json()
+    assert set(body["openai"]) == {"caches", "hedging", "concurrency"}
+    assert body["sheets"] == {"mock": True}
@@ -639,7 +639,15 @@
   let isSubmitting = false;
   let isRecording = false;
   let mediaRecorder = null;
-  let audioChunks = [];
+  let recordingStream = null;
+  let recordingMimeType = '';
+  let segmentTimer = null;
+  // Finished recording segments (each a complete audio file) and the live transcription socket
+  let audioSegments = [];
+  let transcriptStream = null;
+  let textBeforeRecording = '';
+  // Idempotency key for the current submission; reused when the same payload is retried
+  let pendingSubmission = null;
 
   // Create floating button
   const button = document.createElement('button');
@@ -802,6 +810,7 @@
     submitBtn.disabled = false;
     submitBtn.innerHTML = 'Send to Sales Team';
     isSubmitting = false;
+    pendingSubmission = null;
     stopRecording();
     
     // Reset modal content if showing success state
@@ -824,6 +833,21 @@
     charCount.classList.toggle('eb-error', length > 0 && length < 40);
   }
 
+  function newIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+      return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+  }
+
+  // Same payload => same key, so a retry after a network error can't create a duplicate lead
+  function idempotencyKeyFor(body) {
+    if (!pendingSubmission || pendingSubmission.body !== body) {
+      pendingSubmission = { body, key: newIdempotencyKey() };
+    }
+    return pendingSubmission.key;
+  }
+
   function showError(message) {
     formError.textContent = message;
     formError.style.display = 'block';
@@ -894,16 +918,20 @@
     };
     
     try {
+      const body = JSON.stringify(payload);
       const headers = {
         'Content-Type': 'application/json',
+        'Idempotency-Key': idempotencyKeyFor(body),
       };
       if (API_KEY) headers['X-API-KEY'] = API_KEY;
 
+      const startedAt = performance.now();
       const response = await fetch(`${BACKEND_URL}/lead-intake`, {
         method: 'POST',
         headers,
-        body: JSON.stringify(payload),
+        body,
       });
+      reportTiming('/lead-intake', response, startedAt);
       
       const data = await response.json();
       
@@ -911,6 +939,7 @@
         throw new Error(data.detail || 'Something went wrong. Please try again.');
       }
       
+      pendingSubmission = null;
       showSuccess();
       
     } catch (error) {
@@ -929,6 +958,99 @@
   }
 
   // Voice recording
+  //
+  // Audio is streamed to /transcribe/stream while the user speaks. The
+  // recorder is restarted every STREAM_SEGMENT_MS so each segment is a
+  // complete file the server can transcribe on its own, and partial text is
+  // shown as segments finish. Segments the socket did not transcribe (no
+  // WebSocket support, connection lost) are posted to /transcribe instead.
+  const STREAM_SEGMENT_MS = 8000;
+  const STREAM_TIMESLICE_MS = 1000;
+  const STREAM_FINAL_TIMEOUT_MS = 30000;
+
+  function transcribeStreamUrl() {
+    const url = new URL('/transcribe/stream', BACKEND_URL);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    if (API_KEY) url.searchParams.set('api_key', API_KEY);
+    return url.toString();
+  }
+
+  function openTranscriptStream(mimeType, onPartial) {
+    if (!('WebSocket' in window)) return null;
+    let socket;
+    try {
+      socket = new WebSocket(transcribeStreamUrl());
+    } catch (error) {
+      console.warn('Streaming transcription unavailable:', error);
+      return null;
+    }
+
+    // Messages sent before the socket opens are queued
+    const queue = [JSON.stringify({ type: 'start', mime_type: mimeType || 'audio/webm' })];
+    const texts = [];
+    let failed = false;
+    let settle = null;
+
+    const fail = () => {
+      failed = true;
+      if (settle) settle(null);
+    };
+
+    socket.onopen = () => {
+      queue.splice(0).forEach((item) => socket.send(item));
+    };
+    socket.onerror = fail;
+    socket.onclose = fail;
+    socket.onmessage = (event) => {
+      let message;
+      try {
+        message = JSON.parse(event.data);
+      } catch (error) {
+        return;
+      }
+      if (message.type === 'partial') {
+        texts[message.segment] = message.text;
+        onPartial(message.transcript);
+      } else if (message.type === 'final') {
+        if (settle) settle(message.text);
+      } else if (message.type === 'error' && message.segment === undefined) {
+        fail();
+      }
+    };
+
+    return {
+      texts,
+      send(data) {
+        if (failed) return;
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(data);
+        } else {
+          queue.push(data);
+        }
+      },
+      // Resolves with the final transcript, or null if the socket failed
+      finish(timeoutMs) {
+        return new Promise((resolve) => {
+          if (failed) {
+            resolve(null);
+            return;
+          }
+          const timer = setTimeout(() => {
+            settle = null;
+            socket.close();
+            resolve(null);
+          }, timeoutMs);
+          settle = (text) => {
+            clearTimeout(timer);
+            settle = null;
+            resolve(text);
+          };
+          this.send(JSON.stringify({ type: 'stop' }));
+        });
+      },
+    };
+  }
+
   async function startRecording() {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
@@ -938,24 +1060,14 @@
         ? 'audio/webm' 
         : (MediaRecorder.isTypeSupported('audio/mp4') ? 'audio/mp4' : '');
       
-      mediaRecorder = mimeType ? new MediaRecorder(stream, { mimeType }) : new MediaRecorder(stream);
-      audioChunks = [];
-      
-      mediaRecorder.ondataavailable = (e) => {
-        if (e.data.size > 0) {
-          audioChunks.push(e.data);
-        }
-      };
-      
-      mediaRecorder.onstop = async () => {
-        stream.getTracks().forEach(track => track.stop());
-        const blobType = mimeType || (audioChunks[0] && audioChunks[0].type) || 'audio/webm';
-        const audioBlob = new Blob(audioChunks, { type: blobType });
-        await transcribeAudio(audioBlob, blobType);
-      };
-      
-      mediaRecorder.start();
+      recordingStream = stream;
+      recordingMimeType = mimeType;
+      audioSegments = [];
+      textBeforeRecording = freeformInput.value.trim();
+      transcriptStream = openTranscriptStream(mimeType, showTranscript);
+
       isRecording = true;
+      startSegment();
       voiceBtn.classList.add('eb-recording');
       voiceBtn.querySelector('span').textContent = 'Recording... tap to stop';
       
@@ -965,15 +1077,55 @@
     }
   }
 
+  function startSegment() {
+    const mimeType = recordingMimeType;
+    const recorder = mimeType
+      ? new MediaRecorder(recordingStream, { mimeType })
+      : new MediaRecorder(recordingStream);
+    const chunks = [];
+
+    recorder.ondataavailable = (e) => {
+      if (e.data.size > 0) {
+        chunks.push(e.data);
+        if (transcriptStream) transcriptStream.send(e.data);
+      }
+    };
+
+    recorder.onstop = () => {
+      const blobType = mimeType || (chunks[0] && chunks[0].type) || 'audio/webm';
+      if (chunks.length) {
+        audioSegments.push(new Blob(chunks, { type: blobType }));
+        if (transcriptStream) transcriptStream.send(JSON.stringify({ type: 'segment' }));
+      }
+      if (isRecording) {
+        startSegment();
+      } else {
+        finishRecording(blobType);
+      }
+    };
+
+    mediaRecorder = recorder;
+    recorder.start(STREAM_TIMESLICE_MS);
+    segmentTimer = setTimeout(() => {
+      if (recorder.state !== 'inactive') recorder.stop();
+    }, STREAM_SEGMENT_MS);
+  }
+
   function stopRecording() {
     if (mediaRecorder && isRecording) {
-      mediaRecorder.stop();
       isRecording = false;
+      clearTimeout(segmentTimer);
+      if (mediaRecorder.state !== 'inactive') mediaRecorder.stop();
       voiceBtn.classList.remove('eb-recording');
       voiceBtn.querySelector('span').textContent = 'Speak instead';
     }
   }
 
+  function showTranscript(transcript) {
+    freeformInput.value = [textBeforeRecording, transcript].filter(Boolean).join(' ');
+    updateCharCount();
+  }
+
   function extForMime(mime) {
     if (!mime) return 'webm';
     if (mime.includes('webm')) return 'webm';
@@ -984,37 +1136,25 @@
     return 'webm';
   }
 
-  async function transcribeAudio(audioBlob, mimeType) {
+  async function finishRecording(mimeType) {
+    recordingStream.getTracks().forEach(track => track.stop());
     voiceBtn.disabled = true;
     voiceBtn.querySelector('span').textContent = 'Transcribing...';
-    
-    try {
-      const formData = new FormData();
-      const filename = `recording.${extForMime(mimeType || audioBlob.type)}`;
-      formData.append('audio', audioBlob, filename);
 
-      const headers = {};
-      if (API_KEY) headers['X-API-KEY'] = API_KEY;
-      
-      const response = await fetch(`${BACKEND_URL}/transcribe`, {
-        method: 'POST',
-        headers,
-        body: formData,
-      });
-      
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.detail || 'Transcription failed');
-      }
-      
-      if (data.text) {
-        const existing = freeformInput.value.trim();
-        freeformInput.value = existing ? `${existing} ${data.text}` : data.text;
-        updateCharCount();
-        freeformInput.focus();
+    const stream = transcriptStream;
+    transcriptStream = null;
+    try {
+      let text = stream ? await stream.finish(STREAM_FINAL_TIMEOUT_MS) : null;
+      if (text === null) {
+        const texts = stream ? stream.texts : [];
+        const parts = [];
+        for (let i = 0; i < audioSegments.length; i++) {
+          parts.push(texts[i] !== undefined ? texts[i] : await transcribeAudio(audioSegments[i], mimeType));
+        }
+        text = parts.filter(Boolean).join(' ');
       }
-      
+      showTranscript(text);
+      freeformInput.focus();
     } catch (error) {
       console.error('Transcription error:', error);
       showError('Unable to transcribe audio. Please try typing instead.');
@@ -1024,6 +1164,43 @@
     }
   }
 
+  // Real-user latency: the host page can listen for this event and forward
+  // the backend's per-stage Server-Timing breakdown to its own monitoring
+  function reportTiming(endpoint, response, startedAt) {
+    window.dispatchEvent(new CustomEvent('ebottles:timing', {
+      detail: {
+        endpoint,
+        status: response.status,
+        clientMs: Math.round(performance.now() - startedAt),
+        serverTiming: response.headers.get('Server-Timing') || '',
+      },
+    }));
+  }
+
+  async function transcribeAudio(audioBlob, mimeType) {
+    const formData = new FormData();
+    const filename = `recording.${extForMime(mimeType || audioBlob.type)}`;
+    formData.append('audio', audioBlob, filename);
+
+    const headers = {};
+    if (API_KEY) headers['X-API-KEY'] = API_KEY;
+    
+    const startedAt = performance.now();
+    const response = await fetch(`${BACKEND_URL}/transcribe`, {
+      method: 'POST',
+      headers,
+      body: formData,
+    });
+    reportTiming('/transcribe', response, startedAt);
+    
+    const data = await response.json();
+    
+    if (!response.ok) {
+      throw new Error(data.detail || 'Transcription failed');
+    }
+    return data.text || '';
+  }
+
   function handleVoiceClick() {
     if (isRecording) {
       stopRecording();